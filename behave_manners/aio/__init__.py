@@ -0,0 +1,18 @@
+# -*- coding: UTF-8 -*-
+"""
+    Asyncio front-end, to drive many browser sessions from one process
+
+    Needs Python 3.7 or later, and is only installed there: import this
+    package explicitly.
+
+    WebDriver commands are sent from the loop, but page-object lookups
+    (`AsyncPageProxy` , `AsyncComponentProxy`) are not rewritten as
+    coroutines: they run the blocking proxies in a thread pool, one
+    thread per lookup in flight. Use `AsyncSession.execute()` where no
+    thread may be spent.
+"""
+
+from .client import AsyncSession
+from .proxies import AsyncPageProxy, AsyncComponentProxy
+
+# eof
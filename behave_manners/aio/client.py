@@ -0,0 +1,238 @@
+# -*- coding: UTF-8 -*-
+""" Async HTTP transport for the W3C WebDriver protocol
+
+    Commands of many browser sessions are multiplexed over one asyncio
+    loop, each session keeping its own persistent connection.
+
+    `AsyncSession.execute()` (and `get()` , `quit()` ...) are coroutines
+    that send their command straight from the loop, holding no thread.
+    Selenium's own API and page-object proxies are blocking, so they run
+    in a thread pool, see `AsyncSession.run()` : each such call in flight
+    holds one thread, up to `AsyncSession.max_threads` .
+"""
+
+import asyncio
+import json
+import string
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlparse
+from selenium import webdriver
+from selenium.webdriver.remote.command import Command
+from selenium.webdriver.remote.remote_connection import RemoteConnection
+from selenium.common.exceptions import WebDriverException
+
+
+class HTTPClient(object):
+    """Minimal HTTP/1.1 client, with one keep-alive connection
+
+        Requests are serialized, as WebDriver sessions process one
+        command at a time anyway. Must be used from a single loop.
+    """
+    logger = logging.getLogger(__name__ + '.HTTPClient')
+
+    def __init__(self, url, timeout=60.0):
+        up = urlparse(url)
+        if up.scheme != 'http':
+            raise ValueError("Only http:// remotes are supported: %s" % url)
+        self.host = up.hostname
+        self.port = up.port or 80
+        self.prefix = up.path.rstrip('/')
+        self.timeout = timeout
+        self._reader = self._writer = None
+        self._lock = None   # created in the loop, at first request
+
+    async def _connect(self):
+        self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+
+    async def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+    async def request(self, method, path, body=None):
+        """Send request, return (status, content_type, body_text)
+
+            A request is only sent again if writing it failed, on a kept-alive
+            connection the server had dropped. Once written, the server may
+            have executed it already.
+        """
+        if self._lock is None:
+            self._lock = asyncio.Lock()
+        async with self._lock:
+            if self._writer is not None and self._reader.at_eof():
+                await self.close()   # closed by server while idle
+            reused = self._writer is not None
+            if not reused:
+                await self._connect()
+            sent = []
+            try:
+                return await asyncio.wait_for(self._roundtrip(method, path, body, sent),
+                                              self.timeout)
+            except (ConnectionError, asyncio.IncompleteReadError) as e:
+                await self.close()
+                if not (reused and not sent):
+                    raise WebDriverException("Connection to %s:%d failed: %s"
+                                             % (self.host, self.port, e))
+            except asyncio.TimeoutError:
+                await self.close()
+                raise WebDriverException("Request to %s:%d timed out"
+                                         % (self.host, self.port))
+            await self._connect()
+            return await asyncio.wait_for(self._roundtrip(method, path, body, []),
+                                          self.timeout)
+
+    async def _roundtrip(self, method, path, body, sent):
+        data = b''
+        if body is not None and method in ('POST', 'PUT'):
+            data = body.encode('utf-8')
+        head = ['%s %s%s HTTP/1.1' % (method, self.prefix, path),
+                'Host: %s:%d' % (self.host, self.port),
+                'Accept: application/json',
+                'Content-Type: application/json;charset=UTF-8',
+                'Content-Length: %d' % len(data),
+                'Connection: keep-alive', '', '']
+        self._writer.write('\r\n'.join(head).encode('latin-1') + data)
+        await self._writer.drain()
+        sent.append(True)
+
+        status_line = await self._reader.readuntil(b'\r\n')
+        status = int(status_line.split()[1])
+        headers = {}
+        while True:
+            line = await self._reader.readuntil(b'\r\n')
+            if line == b'\r\n':
+                break
+            k, v = line.decode('latin-1').split(':', 1)
+            headers[k.strip().lower()] = v.strip()
+
+        if headers.get('transfer-encoding', '').lower() == 'chunked':
+            content = b''
+            while True:
+                size = int((await self._reader.readuntil(b'\r\n')).split(b';')[0], 16)
+                chunk = await self._reader.readexactly(size + 2)
+                if not size:
+                    break
+                content += chunk[:-2]
+        elif 'content-length' in headers:
+            content = await self._reader.readexactly(int(headers['content-length']))
+        else:
+            content = await self._reader.read()
+        if headers.get('connection', '').lower() == 'close' or \
+                ('content-length' not in headers and 'transfer-encoding' not in headers):
+            await self.close()
+        return status, headers.get('content-type', ''), content.decode('utf-8')
+
+
+class LoopConnection(RemoteConnection):
+    """Selenium command executor, sending requests through an asyncio loop
+
+        Selenium calls are blocking, so they must run in another thread
+        than the loop's one, eg. through `AsyncSession.run()` .
+    """
+    def __init__(self, remote_server_addr, loop):
+        super(LoopConnection, self).__init__(remote_server_addr, keep_alive=False,
+                                             resolve_ip=False)
+        self._loop = loop
+        self._loop_thread = threading.get_ident()   # created from the loop
+        self._client = HTTPClient(remote_server_addr)
+
+    def _request(self, method, url, body=None):
+        if threading.get_ident() == self._loop_thread:
+            raise RuntimeError("Blocking WebDriver call from the event loop: "
+                               "use AsyncSession.execute() or run()")
+        path = url[len(self._url):]
+        fut = asyncio.run_coroutine_threadsafe(self._client.request(method, path, body),
+                                               self._loop)
+        return self.decode(*fut.result())
+
+    @staticmethod
+    def decode(status, content_type, data):
+        """Convert HTTP response to a response dict, as `RemoteConnection` does
+        """
+        if 399 < status <= 500:
+            return {'status': status, 'value': data}
+        try:
+            ret = json.loads(data.strip())
+        except ValueError:
+            return {'status': 0 if 199 < status < 300 else 13, 'value': data.strip()}
+        if 'value' not in ret:
+            ret['value'] = None
+        return ret
+
+    def close(self):
+        asyncio.run_coroutine_threadsafe(self._client.close(), self._loop)
+
+
+class AsyncSession(object):
+    """A browser session, driven from asyncio
+
+        Wraps a regular selenium `Remote` , whose commands are sent over
+        the loop. Coroutines like `execute()` need no thread; blocking
+        calls on the `browser` (and on page-object proxies bound to it)
+        go through `run()` , on a thread pool of `max_threads` shared by
+        all sessions.
+    """
+    max_threads = 32
+    _executor = None
+
+    def __init__(self, loop, browser, executor=None):
+        self._loop = loop
+        self.browser = browser
+        self.executor = executor or self.default_executor()
+
+    @classmethod
+    def default_executor(cls):
+        if cls._executor is None:
+            cls._executor = ThreadPoolExecutor(max_workers=cls.max_threads,
+                                               thread_name_prefix='AsyncSession')
+        return cls._executor
+
+    @classmethod
+    async def start(cls, url, capabilities=None, executor=None):
+        """Create a new session on a remote WebDriver at `url`
+        """
+        loop = asyncio.get_running_loop()
+        caps = capabilities or {}
+        conn = LoopConnection(url, loop)
+        executor = executor or cls.default_executor()
+        browser = await loop.run_in_executor(
+                executor,
+                lambda: webdriver.Remote(command_executor=conn, desired_capabilities=caps))
+        return cls(loop, browser, executor)
+
+    async def execute(self, command, params=None):
+        """Send WebDriver `command` from the loop, return its value
+
+            Like `WebDriver.execute()` , elements in the result become
+            `WebElement` objects; their own methods are blocking.
+        """
+        browser = self.browser
+        conn = browser.command_executor
+        params = browser._wrap_value(dict(params or {}, sessionId=browser.session_id))
+        method, path = conn._commands[command]
+        path = string.Template(path).substitute(params)
+        response = LoopConnection.decode(
+                *(await conn._client.request(method, path, json.dumps(params))))
+        browser.error_handler.check_response(response)
+        return browser._unwrap_value(response.get('value', None))
+
+    async def run(self, fn, *args):
+        """Call `fn(browser, *args)` in the thread pool
+        """
+        return await self._loop.run_in_executor(self.executor, fn, self.browser, *args)
+
+    async def get(self, url):
+        await self.execute(Command.GET, {'url': url})
+
+    async def title(self):
+        return await self.execute(Command.GET_TITLE)
+
+    async def quit(self):
+        try:
+            await self.execute(Command.QUIT)
+        finally:
+            await self.browser.command_executor._client.close()
+
+#eof
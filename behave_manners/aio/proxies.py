@@ -0,0 +1,98 @@
+# -*- coding: UTF-8 -*-
+""" Awaitable wrappers of page-object proxies
+
+    The same page templates and `PageProxy` / `ComponentProxy` logic are
+    used; their lookups are blocking, so they run in the thread pool of
+    the session, while the WebDriver commands they issue go over the loop
+    (see `client.AsyncSession`).
+"""
+
+import asyncio
+from ..pagelems.dom_components import PageProxy, ComponentProxy
+
+
+class AsyncComponentProxy(object):
+    """Awaitable view of a `ComponentProxy` (or `PageProxy`)
+
+        Sub-components and attributes are awaited::
+
+            comp = await page['section']['button']
+            title = await comp.title
+            async for name, sub in comp.items(): ...
+            await comp.set('value', 'foo')
+    """
+    __slots__ = ('_proxy', '_loop', '_executor')
+
+    def __init__(self, proxy, loop=None, executor=None):
+        self._proxy = proxy
+        self._loop = loop or asyncio.get_running_loop()
+        self._executor = executor
+
+    def _run(self, fn, *args):
+        return self._loop.run_in_executor(self._executor, fn, *args)
+
+    def _wrap(self, value):
+        if isinstance(value, (PageProxy, ComponentProxy)):
+            return AsyncComponentProxy(value, self._loop, self._executor)
+        return value
+
+    def __repr__(self):
+        return '<%s %r>' % (self.__class__.__name__, self._proxy)
+
+    @property
+    def proxy(self):
+        """The wrapped, synchronous, proxy
+        """
+        return self._proxy
+
+    async def _getitem(self, name):
+        return self._wrap(await self._run(self._proxy.__getitem__, name))
+
+    def __getitem__(self, name):
+        return self._getitem(name)
+
+    async def _getattr(self, name):
+        return self._wrap(await self._run(getattr, self._proxy, name))
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return self._getattr(name)
+
+    async def set(self, name, value):
+        await self._run(setattr, self._proxy, name, value)
+
+    async def keys(self):
+        return await self._run(lambda: list(self._proxy.keys()))
+
+    async def items(self):
+        """Async iterator of (name, component) pairs
+
+            Remote elements are all located in one go, before iterating.
+        """
+        items = await self._run(lambda: list(self._proxy.items()))
+        for name, comp in items:
+            yield name, self._wrap(comp)
+
+    async def call(self, method, *args):
+        """Call a method of the component, eg. `await comp.call('click')`
+        """
+        return await self._run(getattr(self._proxy, method), *args)
+
+
+class AsyncPageProxy(AsyncComponentProxy):
+    """Awaitable view of a `PageProxy`
+    """
+    __slots__ = ()
+
+    @classmethod
+    async def get_root(cls, page, session, parent_scope=None):
+        """Bind `page` template to the browser of an `AsyncSession`
+        """
+        proxy = await session.run(lambda b: page.get_root(b, parent_scope=parent_scope))
+        return cls(proxy, executor=session.executor)
+
+    async def wait_all(self, timeout='short'):
+        await self._run(self._proxy.wait_all, timeout)
+
+#eof
@@ -0,0 +1,267 @@
+# -*- coding: UTF-8 -*-
+""" Pool of warm browsers, recycled between scenarios
+
+    With `launch_on: scenario` , launching a browser (and its driver) for
+    each scenario costs seconds. The pool launches browsers in background
+    threads ahead of time, and resets them after a scenario rather than
+    quitting them.
+
+    Enable in the site config::
+
+        browser:
+            launch_on: scenario
+            pool:
+                size: 2         # browsers in use or kept warm
+                max_uses: 50    # quit a browser after that many scenarios
+"""
+
+from __future__ import absolute_import, division
+import logging
+import threading
+import time
+from six.moves.urllib.parse import urlparse
+from selenium.common.exceptions import WebDriverException
+
+
+class BrowserPool(object):
+    """Keeps up to `size` browsers, in use or idle, launched by `launch_fn()`
+
+        A browser is `acquire()` -d for a scenario and `release()` -d after
+        it, when it is reset: extra windows closed, all cookies cleared and
+        the storage of every origin in the history of its windows. Browsers
+        that fail to reset, or fail the health check when acquired, are
+        discarded.
+
+        That needs the chromium `send_command` and `send_command_and_get_result`
+        endpoints; other browsers are never reused, only launched ahead of time.
+    """
+    _log = logging.getLogger('behave.site.pool')
+
+    reset_js = '''try { window.localStorage.clear(); } catch (e) {}
+        try { window.sessionStorage.clear(); } catch (e) {}'''
+    reset_commands = [
+        ('Network.clearBrowserCookies', {}),
+        ]
+    reset_origin_command = ('Storage.clearDataForOrigin', {'storageTypes': 'all'})
+    reset_endpoints = ('send_command', 'send_command_and_get_result')
+
+    def __init__(self, launch_fn, size=2, max_uses=0):
+        self._launch_fn = launch_fn
+        self.size = size
+        self.max_uses = max_uses
+        self._cond = threading.Condition()
+        self._idle = []
+        self._uses = {}
+        self._launching = 0
+        self._in_use = 0
+        self._threads = []
+        self._closed = False
+        self.num_hits = 0
+        self.num_misses = 0
+        self.num_discarded = 0
+        self.reset_times = []
+        self._warned_reset = False
+
+    def fill(self):
+        """Launch browsers in the background, up to `size` ones
+        """
+        with self._cond:
+            if self._closed:
+                return
+            num = self.size - len(self._idle) - self._launching - self._in_use
+            self._launching += max(num, 0)
+            self._threads = [t for t in self._threads if t.is_alive()]
+        for _i in range(num):
+            thr = threading.Thread(target=self._launch_bg, name='BrowserPool')
+            thr.daemon = True
+            self._threads.append(thr)
+            thr.start()
+
+    def _launch_bg(self):
+        browser = None
+        try:
+            browser = self._launch_fn()
+        except Exception as e:
+            self._log.warning("Could not launch pooled browser: %s", e)
+        with self._cond:
+            self._launching -= 1
+            if browser is not None:
+                if self._closed:
+                    self._quit(browser)
+                else:
+                    self._idle.append(browser)
+            self._cond.notify_all()
+
+    def uses(self, browser):
+        """Number of times `browser` has been acquired
+        """
+        return self._uses.get(id(browser), 0)
+
+    def acquire(self):
+        """Get a browser from the pool, or launch one if none is warm
+        """
+        while True:
+            browser = None
+            with self._cond:
+                if not self._idle and self._launching:
+                    self._cond.wait()
+                    continue
+                if self._idle:
+                    browser = self._idle.pop(0)
+                self._in_use += 1
+
+            if browser is None:
+                self.num_misses += 1
+                try:
+                    browser = self._launch_fn()
+                except Exception:
+                    with self._cond:
+                        self._in_use -= 1
+                    raise
+                break
+            elif self._healthy(browser):
+                self.num_hits += 1
+                break
+            else:
+                with self._cond:
+                    self._in_use -= 1
+                self._discard(browser)
+
+        self._uses[id(browser)] = self.uses(browser) + 1
+        self.fill()
+        return browser
+
+    def release(self, browser):
+        """Reset `browser` and keep it for another scenario, or quit it
+        """
+        with self._cond:
+            self._in_use -= 1
+        if self.max_uses and self.uses(browser) >= self.max_uses:
+            self._quit(browser)
+        elif not self._reset(browser):
+            self._discard(browser)
+        else:
+            with self._cond:
+                if not self._closed and \
+                        len(self._idle) + self._launching + self._in_use < self.size:
+                    self._idle.append(browser)
+                    self._cond.notify_all()
+                    return
+            self._quit(browser)
+        self.fill()
+
+    def _healthy(self, browser):
+        try:
+            return browser.execute_script('return 1;') == 1
+        except Exception as e:
+            self._log.info("Pooled browser is not responding: %s", e)
+            return False
+
+    @classmethod
+    def can_reset(cls, browser):
+        """Tell if `browser` can be reset for all origins
+        """
+        commands = getattr(browser.command_executor, '_commands', {})
+        return all(e in commands for e in cls.reset_endpoints)
+
+    @classmethod
+    def _visited_origins(cls, browser):
+        """Origins in the navigation history of the current window
+        """
+        ret = browser.execute('send_command_and_get_result',
+                              {'cmd': 'Page.getNavigationHistory', 'params': {}})
+        origins = []
+        for entry in (ret.get('value') or {}).get('entries', ()):
+            up = urlparse(entry.get('url', ''))
+            if up.scheme in ('http', 'https') and up.hostname:
+                origin = '%s://%s' % (up.scheme, up.netloc.rsplit('@', 1)[-1])
+                if origin not in origins:
+                    origins.append(origin)
+        return origins
+
+    @classmethod
+    def reset_browser(cls, browser):
+        """Close extra windows, clear cookies and storage, go to a blank page
+
+            Only the current origin is cleared, unless `can_reset()` .
+            Errors are raised.
+        """
+        full = cls.can_reset(browser)
+        handles = browser.window_handles
+        origins = []
+        for handle in reversed(handles):
+            browser.switch_to.window(handle)
+            if full:
+                for origin in cls._visited_origins(browser):
+                    if origin not in origins:
+                        origins.append(origin)
+            if handle != handles[0]:
+                browser.close()
+        try:
+            browser.switch_to.alert.dismiss()
+        except WebDriverException:
+            pass
+        browser.execute_script(cls.reset_js)
+        browser.delete_all_cookies()
+        if full:
+            # all origins, not just the current one
+            cmd, params = cls.reset_origin_command
+            for origin in origins:
+                browser.execute('send_command',
+                                {'cmd': cmd, 'params': dict(params, origin=origin)})
+            for cmd, params in cls.reset_commands:
+                browser.execute('send_command', {'cmd': cmd, 'params': params})
+        browser.get('about:blank')
+
+    def _reset(self, browser):
+        if not self.can_reset(browser):
+            if not self._warned_reset:
+                self._log.warning("Browsers cannot be reset for all origins, "
+                                  "they will not be reused")
+                self._warned_reset = True
+            return False
+        t0 = time.time()
+        try:
+            self.reset_browser(browser)
+            self.reset_times.append(time.time() - t0)
+            return True
+        except Exception as e:
+            self._log.warning("Could not reset browser, discarding: %s", e)
+            return False
+
+    def _discard(self, browser):
+        self.num_discarded += 1
+        self._quit(browser)
+
+    def _quit(self, browser):
+        self._uses.pop(id(browser), None)
+        try:
+            browser.quit()
+        except Exception as e:
+            self._log.debug("Could not quit browser: %s", e)
+
+    def close(self):
+        """Quit all idle browsers, and those still launching
+        """
+        with self._cond:
+            self._closed = True
+            idle = self._idle
+            self._idle = []
+        for browser in idle:
+            self._quit(browser)
+        for thr in self._threads:
+            thr.join()
+        self.report()
+
+    def report(self):
+        total = self.num_hits + self.num_misses
+        if not total:
+            return
+        avg_reset = sum(self.reset_times) / len(self.reset_times) \
+            if self.reset_times else 0.0
+        self._log.info("Browser pool: %d of %d browsers warm (%.0f%%), "
+                       "%d discarded, %.2fsec average reset",
+                       self.num_hits, total, self.num_hits * 100.0 / total,
+                       self.num_discarded, avg_reset)
+
+#eof
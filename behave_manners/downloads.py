@@ -5,10 +5,15 @@
 from __future__ import absolute_import
 import os
 import os.path
+import sys
 import logging
 import time
 import errno
 import fnmatch
+import select
+import struct
+import hashlib
+from collections import OrderedDict
 from .pagelems.exceptions import Timeout
 
 """Implicit tracking of browser downloads
@@ -17,6 +22,138 @@ from .pagelems.exceptions import Timeout
 logger = logging.getLogger(__name__)
 
 
+class Inotify(object):
+    """Minimal watcher of a single directory, through Linux `inotify`
+
+        Uses `ctypes` against libc, so that no extra package is needed.
+        Construction raises `OSError` where inotify is not available.
+    """
+    IN_MODIFY = 0x002
+    IN_CLOSE_WRITE = 0x008
+    IN_MOVED_FROM = 0x040
+    IN_MOVED_TO = 0x080
+    IN_CREATE = 0x100
+    IN_DELETE = 0x200
+    IN_Q_OVERFLOW = 0x4000
+    IN_IGNORED = 0x8000
+    IN_ISDIR = 0x40000000
+    IN_NONBLOCK = 0o4000
+    IN_CLOEXEC = 0o2000000
+
+    _event_hdr = struct.Struct('iIII')
+    _libc = None
+
+    def __init__(self, path):
+        if not sys.platform.startswith('linux'):
+            raise OSError(errno.ENOSYS, "inotify is only available on Linux")
+        libc = self._get_libc()
+        self.fd = libc.inotify_init1(self.IN_NONBLOCK | self.IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(self._errno(), "inotify_init1() failed")
+        mask = self.IN_CLOSE_WRITE | self.IN_MOVED_FROM | self.IN_MOVED_TO \
+            | self.IN_CREATE | self.IN_DELETE | self.IN_MODIFY
+        if libc.inotify_add_watch(self.fd, path.encode(sys.getfilesystemencoding()),
+                                  mask) < 0:
+            err = self._errno()
+            os.close(self.fd)
+            self.fd = None
+            raise OSError(err, "inotify_add_watch() failed for %s" % path)
+
+    @classmethod
+    def _get_libc(cls):
+        if cls._libc is None:
+            import ctypes
+            import ctypes.util
+            libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6',
+                               use_errno=True)
+            if not hasattr(libc, 'inotify_init1'):
+                raise OSError(errno.ENOSYS, "libc does not provide inotify")
+            cls._libc = libc
+        return cls._libc
+
+    @staticmethod
+    def _errno():
+        import ctypes
+        return ctypes.get_errno()
+
+    def read(self, timeout=0.0):
+        """Wait up to `timeout` for events
+
+            :return: list of (mask, name) tuples, possibly empty
+        """
+        if self.fd is None:
+            return []
+        rlist, _w, _x = select.select([self.fd], [], [], max(timeout, 0.0))
+        if not rlist:
+            return []
+        try:
+            buf = os.read(self.fd, 65536)
+        except OSError as e:
+            if e.errno == errno.EAGAIN:
+                return []
+            raise
+        ret = []
+        pos = 0
+        hdr = self._event_hdr
+        while pos + hdr.size <= len(buf):
+            _wd, mask, _cookie, nlen = hdr.unpack_from(buf, pos)
+            pos += hdr.size
+            name = buf[pos:pos + nlen].rstrip(b'\0')
+            pos += nlen
+            ret.append((mask, name.decode(sys.getfilesystemencoding())))
+        return ret
+
+    def close(self):
+        if self.fd is not None:
+            os.close(self.fd)
+            self.fd = None
+
+
+class Digester(object):
+    """Incremental size and hash of a file that is still being written
+
+        Only the bytes appended since the last `update()` are read, so the
+        file is never read twice, even across a rename of its partial name.
+    """
+    chunk_size = 1 << 20
+
+    def __init__(self, algo='sha256'):
+        self.size = 0
+        self.hasher = self.new_hasher(algo)
+
+    @staticmethod
+    def new_hasher(algo):
+        if algo in ('xxhash', 'xxh64'):
+            try:
+                import xxhash
+                return xxhash.xxh64()
+            except ImportError:
+                raise ValueError("xxhash is not installed")
+        return hashlib.new(algo)
+
+    def update(self, fullpath):
+        """Read any new bytes of `fullpath`
+
+            :return: False if the file could not be opened
+        """
+        try:
+            fp = open(fullpath, 'rb')
+        except (IOError, OSError):
+            return False
+        with fp:
+            fp.seek(self.size)
+            while True:
+                data = fp.read(self.chunk_size)
+                if not data:
+                    break
+                self.hasher.update(data)
+                self.size += len(data)
+        return True
+
+    def hexdigest(self):
+        return self.hasher.hexdigest()
+
+
 class DownloadManager(object):
     """Capture downloads that appear on some folder
     
@@ -25,22 +162,125 @@ class DownloadManager(object):
         point most drivers don't have an explicit API for that).
         This manager tries to guess which files may have appeared since
         some UI interaction
+
+        Where possible, the directory is watched with `inotify` and an
+        in-memory index of its files is kept. Otherwise, it is polled.
     """
 
-    def __init__(self, download_dir):
+    partial_suffixes = {'chrome': ('.crdownload',),
+                        'opera': ('.crdownload',),
+                        'edge': ('.crdownload',),
+                        'firefox': ('.part',),
+                        }
+    poll_interval = 1.0
+
+    # index states
+    OPEN = 'open'
+    PARTIAL = 'partial'
+    DONE = 'done'
+    DIR = 'dir'
+
+    def __init__(self, download_dir, engine=None, watch=True):
         self._dir = os.path.abspath(download_dir)
         self._past_files = set()
         self._cur_files = set()
         if not os.path.isdir(self._dir):
             raise IOError(errno.ENOENT, "No such directory")
+        if engine in self.partial_suffixes:
+            self._partials = self.partial_suffixes[engine]
+        else:
+            self._partials = tuple(set(sum(self.partial_suffixes.values(), ())))
+        self._index = None
+        self._watcher = None
+        if watch:
+            try:
+                self._watcher = Inotify(self._dir)
+                self._index = OrderedDict()
+            except OSError as e:
+                logger.info("Cannot watch %s, will poll for downloads: %s", self._dir, e)
+        self._scan()
         self.reset()
 
+    def close(self):
+        """Stop watching the directory
+        """
+        if self._watcher is not None:
+            self._watcher.close()
+            self._watcher = None
+            self._index = None
+
+    def _partial_of(self, path):
+        """Return the final name of a partial download file, or None
+        """
+        for suffix in self._partials:
+            if path.endswith(suffix):
+                return path[:-len(suffix)]
+        return None
+
+    def _scan(self):
+        """(Re)build the index from the directory listing
+        """
+        if self._index is None:
+            return
+        self._index.clear()
+        for path in os.listdir(self._dir):
+            if os.path.isdir(os.path.join(self._dir, path)):
+                self._index[path] = self.DIR
+            elif self._partial_of(path) is not None:
+                self._index[path] = self.PARTIAL
+            else:
+                self._index[path] = self.DONE
+
+    def _process_events(self, timeout=0.0):
+        """Read pending inotify events into the index
+
+            :return: True if any events were read
+        """
+        events = self._watcher.read(timeout)
+        for mask, path in events:
+            if mask & Inotify.IN_Q_OVERFLOW:
+                logger.debug("Download watcher overflowed, rescanning")
+                self._scan()
+                continue
+            elif mask & Inotify.IN_IGNORED:
+                logger.warning("Download directory no longer watched, will poll")
+                self.close()
+                return True
+            elif mask & (Inotify.IN_DELETE | Inotify.IN_MOVED_FROM):
+                self._index.pop(path, None)
+                continue
+
+            if mask & Inotify.IN_MODIFY:
+                self._index.setdefault(path, self.OPEN)
+                continue
+            elif mask & Inotify.IN_ISDIR:
+                self._index[path] = self.DIR
+                continue
+            final = self._partial_of(path)
+            if final is not None:
+                self._index[path] = self.PARTIAL
+                if self._index.get(final) == self.DONE:
+                    # placeholder of that partial, as firefox does
+                    self._index[final] = self.OPEN
+            elif mask & Inotify.IN_CREATE:
+                self._index[path] = self.OPEN
+            elif any(self._index.get(path + s) == self.PARTIAL for s in self._partials):
+                self._index[path] = self.OPEN
+            else:
+                self._index[path] = self.DONE
+        return bool(events)
+
     def reset(self):
         """Scan directory. Consider all files 'past', reset 'current'
         """
         self._past_files.clear()
-        for path in os.listdir(self._dir):
-            self._past_files.add(path)   # even if it is a directory
+        if self._watcher is not None:
+            self._process_events()
+        if self._watcher is not None:
+            self._past_files.update(self._index)
+        else:
+            for path in os.listdir(self._dir):
+                self._past_files.add(path)   # even if it is a directory
         self._cur_files.clear()
 
     def wait_for(self, pattern='*', timeout=10.0):
@@ -49,28 +289,120 @@ class DownloadManager(object):
         deadline = time.time() + timeout
         pending = set()
         last_pending = 0.0
+        while self._watcher is not None:
+            for path, state in self._index.items():
+                if path in self._past_files:
+                    continue
+                if state == self.DONE and fnmatch.fnmatch(path, pattern):
+                    self._past_files.add(path)
+                    return path, os.path.join(self._dir, path)
+                elif state == self.PARTIAL and path not in pending:
+                    logger.info("Download in progress: %s", self._partial_of(path))
+                    pending.add(path)
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise Timeout("No file found within %.1fsec" % timeout)
+            self._process_events(remaining)
+
         while time.time() < deadline:
-            found = False
             for path in os.listdir(self._dir):
                 if path in self._past_files:
                     continue
-                if fnmatch.fnmatch(path, pattern):
+                final = self._partial_of(path)
+                if final is not None:
+                    if path not in pending or (time.time() - last_pending) >= 5.0:
+                        last_pending = time.time()
+                        logger.info("Download in progress: %s", final)
+                        pending.add(path)
+                elif fnmatch.fnmatch(path, pattern):
                     fullpath = os.path.join(self._dir, path)
                     if os.path.isfile(fullpath):
                         self._past_files.add(path)
                         return path, fullpath
-                elif path.endswith('.crdownload'):
-                    if path not in pending or (time.time() - last_pending) >= 5.0:
-                        last_pending = time.time()
-                        logger.info("Download in progress: %s", path[:-11])
-                        pending.add(path)
 
-            if found:
-                break
-            time.sleep(1.0)
+            time.sleep(self.poll_interval)
 
         raise Timeout("No file found within %.1fsec" % timeout)
 
+    def _new_entries(self):
+        """Map of new files (by final name) to their current name and state
+        """
+        if self._watcher is not None:
+            entries = list(self._index.items())
+        else:
+            entries = []
+            for path in os.listdir(self._dir):
+                if os.path.isdir(os.path.join(self._dir, path)):
+                    entries.append((path, self.DIR))
+                elif self._partial_of(path) is not None:
+                    entries.append((path, self.PARTIAL))
+                else:
+                    entries.append((path, self.DONE))
+
+        ret = {}
+        for path, state in entries:
+            if path in self._past_files or state == self.DIR:
+                continue
+            final = self._partial_of(path)
+            if final is not None:
+                ret[final] = (path, self.PARTIAL)
+            elif state == self.DONE and ret.get(path, (None, None))[1] == self.PARTIAL:
+                continue    # placeholder, partial still there
+            else:
+                ret[path] = (path, state)
+        return ret
+
+    def expect(self, pattern='*', size=None, digest=None, algo='sha256', timeout=10.0):
+        """Wait for a download, verifying it while it is being written
+
+            Size and hash are computed incrementally as the file grows, so
+            the check completes when the last byte lands, without a second
+            pass over the file.
+
+            :param size: expected size in bytes, or None
+            :param digest: expected hex digest, or None
+            :param algo: hash algorithm, any of `hashlib` or 'xxhash'
+            :return: (filename, absolute_pathname, Digester)
+        """
+        deadline = time.time() + timeout
+        digesters = {}
+        while True:
+            if self._watcher is not None:
+                self._process_events()
+            for final, (path, state) in self._new_entries().items():
+                if not fnmatch.fnmatch(final, pattern):
+                    continue
+                dig = digesters.get(final)
+                if dig is None:
+                    dig = digesters[final] = Digester(algo)
+                if not dig.update(os.path.join(self._dir, path)):
+                    if path == final or not dig.update(os.path.join(self._dir, final)):
+                        continue
+                    state = self.DONE   # partial has just been renamed
+                if size is not None and dig.size > size:
+                    self._past_files.add(final)
+                    raise AssertionError("Downloaded %s exceeds %d bytes" % (final, size))
+                if state != self.DONE:
+                    continue
+
+                self._past_files.add(final)
+                if size is not None and dig.size != size:
+                    raise AssertionError("Downloaded %s has %d bytes, expected %d"
+                                         % (final, dig.size, size))
+                if digest is not None and dig.hexdigest() != digest.lower():
+                    raise AssertionError("Downloaded %s has %s %s, expected %s"
+                                         % (final, algo, dig.hexdigest(), digest))
+                return final, os.path.join(self._dir, final), dig
+
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                raise Timeout("No file found within %.1fsec" % timeout)
+            if self._watcher is not None:
+                self._process_events(remaining)
+            else:
+                time.sleep(min(self.poll_interval, remaining))
+
     def look_for(self, pattern='*', files_only=True):
         """Look for downloaded file matching pattern, since last reset
 
@@ -78,6 +410,18 @@ class DownloadManager(object):
             :param files_only: only report files, not directories
             :return: iterator of (filename, absolute_pathname) of matching files
         """
+        if self._watcher is not None:
+            self._process_events()
+        if self._watcher is not None:
+            for path, state in list(self._index.items()):
+                if path in self._past_files:
+                    continue
+                if files_only and state == self.DIR:
+                    continue
+                self._cur_files.add(path)
+                if fnmatch.fnmatch(path, pattern):
+                    yield path, os.path.join(self._dir, path)
+            return
 
         for path in os.listdir(self._dir):
             if path in self._past_files:
@@ -43,6 +43,7 @@ def cmdline_main():
             raise RuntimeError("Supplied config must specify browser settings")
 
         config['browser']['headless'] = args.headless
+        config['browser'].pop('attach', None)  # this one is the long-lived browser
 
         browser_cls = 'browser.%s' % config['browser'].get('engine', 'generic')
         context.site = SiteContext[browser_cls](context, config)
@@ -54,6 +55,8 @@ def cmdline_main():
                        'capabilities': context.browser.capabilities,
                        'w3c': context.browser.w3c,
                        'keep_alive': context.browser.command_executor.keep_alive,
+                       'unix_socket': getattr(context.browser.command_executor,
+                                              'unix_socket', None),
                        # Pass those so that validator doesn't need to load the config
                        'base_url': config.get('site', {}).get('base_url', None),
                        'page_objects': config.get('page_objects', {})
@@ -27,6 +27,7 @@ from behave_manners.pagelems.dom_components import ComponentProxy
 from behave_manners.pagelems.scopes import Fresh
 from six.moves.urllib import parse as urlparse
 from behave_manners import screenshots
+from behave_manners.transport import PooledConnection
 try:
     import rlcompleter
     import readline
@@ -38,9 +39,15 @@ HISTORY_FILE = '~/.behave-manners-history'
 
 class ExistingRemote(webdriver.Remote):
     """Remote webdriver that attaches to existing session
+
+        A `command_executor` URL is reached through a `PooledConnection` ,
+        with `transport` options for it, unless `transport` is False.
     """
     def __init__(self, command_executor, session_id, saved_capabilities,
-                 desired_capabilities={}, saved_w3c=None, **kwargs):
+                 desired_capabilities={}, saved_w3c=None, transport=None, **kwargs):
+        if isinstance(command_executor, six.string_types) and transport is not False:
+            command_executor = PooledConnection(command_executor, **(transport or {}))
+            kwargs.pop('keep_alive', None)
         self.__session_id = session_id
         self.__saved_caps = saved_capabilities
         self.__saved_w3c = saved_w3c
@@ -162,6 +169,7 @@ def cmdline_main():
                                 session_id=sdata['session'],
                                 saved_capabilities=sdata.get('capabilities',{}),
                                 saved_w3c=sdata.get('w3c', None),
+                                transport={'unix_socket': sdata.get('unix_socket')},
                                 keep_alive=sdata.get('keep_alive', True))
     else:
         raise RuntimeError("Saved session must have 'url' and 'session' set")
@@ -214,6 +222,8 @@ def cmdline_main():
     def path_str(path):
         return '/'.join([str(x) for x in path])
 
+    missing_parents = []  # marked in a single screenshot, after the walk
+
     def print_enoent(comp, exc, shoot=True):
         e = errors  # transfer from outer to local scope
         e += 1
@@ -221,11 +231,11 @@ def cmdline_main():
         if isinstance(exc, ElementNotFound):
             print("    %s inside %s" % (exc.msg, comp))
             if camera and shoot and args.screenshots:
-                camera.capture_missing_elem(becontext, exc.parent, exc.selector)
+                missing_parents.append(exc.parent)
         elif isinstance(exc, CKeyError):
             print("    Missing %s inside component %s" % (exc, comp))
             if camera and shoot and args.screenshots:
-                camera.capture_missing_elem(becontext, exc.component._remote, exc.args[0])
+                missing_parents.append(exc.component._remote)
         elif isinstance(exc, KeyError):
             print("    Missing '%s' inside component %s" % (exc, comp))
 
@@ -274,6 +284,10 @@ def cmdline_main():
                     print('  '* len(path), ' ' * 20, a, ': ' + exc_first_line)
                     errors_l += 1
 
+        if missing_parents:
+            camera.capture_missing_elems(becontext, missing_parents)
+            del missing_parents[:]
+
         if args.measure_selenium:
             log.info("Used %d calls to walk", ExistingRemote.execute.count)
 
@@ -404,6 +418,9 @@ def cmdline_main():
             log.warning("Received interrupt, exiting")
             break
 
+    if camera is not None:
+        camera.close()  # write pending screenshots
+
     # driver.close()   # should be done by remote
     if errors:
         log.warning("Validation finished, %s errors", errors or 'no')
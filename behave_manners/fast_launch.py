@@ -0,0 +1,171 @@
+# -*- coding: UTF-8 -*-
+""" Launch browsers from a pre-warmed profile template
+
+    A fresh browser profile costs startup time: first-run tasks, creation
+    of databases and caches, and (for Firefox) zipping the profile to send
+    it to geckodriver. With `fast_launch` , each browser starts from a copy
+    of a template profile. The template is made by a blank browser, that
+    is launched and quit right away: never from a profile a scenario has
+    used, so that no logins or site data can leak into it.
+
+    Enable in the site config::
+
+        browser:
+            fast_launch: true   # template kept under the run's temporary dir
+            # or, to reuse it across runs:
+            fast_launch:
+                template: ~/.cache/behave-manners/chrome-profile
+"""
+
+from __future__ import absolute_import
+import os
+import os.path
+import sys
+import errno
+import shutil
+import fnmatch
+import logging
+import tempfile
+import threading
+import subprocess
+
+
+chrome_fast_flags = ('no-first-run', 'no-default-browser-check',
+                     'disable-background-networking', 'disable-component-update',
+                     'disable-default-apps', 'disable-sync', 'disable-extensions',
+                     'metrics-recording-only', 'mute-audio')
+
+firefox_fast_prefs = {
+    'browser.shell.checkDefaultBrowser': False,
+    'browser.startup.homepage_override.mstone': 'ignore',
+    'browser.startup.page': 0,
+    'app.update.auto': False,
+    'app.update.enabled': False,
+    'extensions.update.enabled': False,
+    'datareporting.policy.dataSubmissionEnabled': False,
+    'toolkit.telemetry.reportingpolicy.firstRun': False,
+    'browser.safebrowsing.malware.enabled': False,
+    'browser.safebrowsing.phishing.enabled': False,
+    }
+
+
+def copy_tree(src, dest):
+    """Copy a directory, as copy-on-write reflinks where the filesystem can
+
+        Hard links are not used: browsers modify their databases in place,
+        which would corrupt the template.
+    """
+    if sys.platform.startswith('linux'):
+        try:
+            subprocess.check_call(['cp', '-a', '--reflink=auto', src, dest])
+            return
+        except (OSError, subprocess.CalledProcessError):
+            if os.path.exists(dest):
+                shutil.rmtree(dest)
+    shutil.copytree(src, dest, symlinks=True)
+
+
+class ProfileTemplate(object):
+    """Hands out profile directories, copied from a template
+
+        If the template does not exist, `prepare()` creates it, from a
+        browser that does nothing but start and quit. Until then, profiles
+        start empty.
+    """
+    logger = logging.getLogger(__name__ + '.ProfileTemplate')
+
+    # not to be kept in the template: locks, crash data, and (should
+    # the blank browser have stored any) cookies, storage and caches
+    skip_files = ('Singleton*', 'lock', '.parentlock', 'parent.lock',
+                  'Crash Reports', 'crashes', 'minidumps', 'sessionstore*',
+                  'Cookies', 'Cookies-journal', 'cookies.sqlite*',
+                  'Local Storage', 'Session Storage', 'IndexedDB', 'storage',
+                  'webappsstore.sqlite*', 'Service Worker', 'Cache', 'cache2',
+                  'Code Cache', 'GPUCache', 'startupCache', 'Web Data*',
+                  'Login Data*', 'History*', 'places.sqlite*', 'formhistory.sqlite*')
+
+    def __init__(self, template, base_dir=None):
+        self.template = os.path.abspath(os.path.expanduser(template))
+        self.base_dir = base_dir
+        self._profiles = []
+        self._lock = threading.Lock()
+        self._prepare_lock = threading.Lock()
+
+    @property
+    def warm(self):
+        return os.path.isdir(self.template)
+
+    def new_profile(self):
+        """Create a profile directory for one browser
+
+            :return: path of the new directory
+        """
+        if self.base_dir and not os.path.isdir(self.base_dir):
+            try:
+                os.makedirs(self.base_dir)
+            except OSError as e:
+                if e.errno != errno.EEXIST:
+                    raise
+        pdir = tempfile.mkdtemp(prefix='profile-', dir=self.base_dir)
+        if self.warm:
+            os.rmdir(pdir)
+            copy_tree(self.template, pdir)
+        with self._lock:
+            self._profiles.append(pdir)
+        return pdir
+
+    def prepare(self, launch_fn):
+        """Create the template, unless it exists, with a blank browser
+
+            `launch_fn()` must launch a browser on a `new_profile()` . That
+            browser is quit immediately, and its profile saved.
+        """
+        with self._prepare_lock:
+            if self.warm:
+                return
+            with self._lock:
+                num = len(self._profiles)
+            browser = launch_fn()
+            browser.quit()
+            with self._lock:
+                new = self._profiles[num:num + 1]
+            if not new:
+                self.logger.warning("Blank browser did not use a new profile, "
+                                    "no template saved")
+                return
+            try:
+                self.save(new[0])
+            except Exception as e:
+                self.logger.warning("Could not save profile template: %s", e)
+
+    def _ignore(self, dirname, names):
+        return [n for n in names
+                if any(fnmatch.fnmatch(n, pat) for pat in self.skip_files)]
+
+    def save(self, profile_dir):
+        """Store `profile_dir` as the template, unless one exists
+        """
+        if self.warm:
+            return
+        parent = os.path.dirname(self.template)
+        if not os.path.isdir(parent):
+            os.makedirs(parent)
+        tmpdir = self.template + '.tmp%d' % os.getpid()
+        shutil.copytree(profile_dir, tmpdir, symlinks=True, ignore=self._ignore)
+        try:
+            os.rename(tmpdir, self.template)
+            self.logger.info("Saved browser profile template to %s", self.template)
+        except OSError:
+            # another process got there first
+            shutil.rmtree(tmpdir, ignore_errors=True)
+
+    def close(self):
+        """Remove the profiles (browsers must have quit)
+        """
+        with self._lock:
+            profiles = self._profiles
+            self._profiles = []
+        for pdir in profiles:
+            shutil.rmtree(pdir, ignore_errors=True)
+
+#eof
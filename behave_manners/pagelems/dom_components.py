@@ -30,7 +30,8 @@
     from the remote, each time the Component attribute is read. No caching.
     It is the caller's responsibility to copy the Component attributes to
     some other variable, if caching (rather than multiple WebDriver requests)
-    is desired.
+    is desired. Only the handles of sub-elements, that attributes are read
+    from, are kept per component; and dropped as soon as they go stale.
     
     Unreachable components should be handled graceously. They would still
     raise an exception all the way up, but plugins may help in debugging,
@@ -43,6 +44,7 @@ from __future__ import absolute_import
 import logging
 from selenium.common.exceptions import WebDriverException, StaleElementReferenceException
 from .exceptions import CAttributeError, CKeyError
+from .lookups import restore_wait, origin_chain, locate_chain
 
 
 logger = logging.getLogger(__name__)
@@ -77,17 +79,21 @@ class _SomeProxy(object):
             will ever be attempted
         """
         pr = True
-        while pr:
-            try:
-                for neps in self._pagetmpl.iter_items(self._remote, self._scope, match=match):
-                    pr = False
-                    yield neps
-            except StaleElementReferenceException:
-                if pr and self._recover_stale():
-                    continue
-                else:
-                    raise
-            return
+        try:
+            while pr:
+                try:
+                    for neps in self._pagetmpl.iter_items(self._remote, self._scope, match=match):
+                        pr = False
+                        yield neps
+                except StaleElementReferenceException:
+                    if pr and self._recover_stale():
+                        continue
+                    else:
+                        raise
+                return
+        finally:
+            # optional lookups may have left implicit wait suspended
+            restore_wait(self._remote)
 
     def __getitem__(self, name):
         for iname, ielem, ptmpl, scp in self.__iteritems(name):
@@ -233,6 +239,9 @@ class ComponentProxy(_SomeProxy):
         assert isinstance(parent, _SomeProxy)
         self._name = name
         self._parent = parent
+        self._subelems = {}   # xpath: (own WebElement, sub-WebElement), for descriptors
+        # lookups that led from parent to this, for stale recovery
+        self._locator = origin_chain(webelem, parent._remote)
         # Prepare list of attributes
         # assume that `_pe_class` in some pageelement means that
         # the controller is root for that component.
@@ -339,27 +348,47 @@ class ComponentProxy(_SomeProxy):
         except KeyError:
             raise CAttributeError(name, component=self)
 
+    def __call_descr(self, fn, *args):
+        """Call descriptor getter `fn` , retry once if a memoized sub-element is stale
+        """
+        try:
+            return fn(self, *args)
+        except StaleElementReferenceException:
+            if not self._subelems:
+                raise
+            self._subelems.clear()
+            self._scope.__dict__.pop('_matchid_cache', None)
+            return fn(self, *args)
+
     def __getattr__(self, name):
         if name.startswith('_'):
             raise AttributeError(name)
 
         descr = self.__getdescr(name)
-        return descr.__get__(self)
+        return self.__call_descr(descr.__get__)
 
     def __dir__(self):
         return list(self.__descrs.keys())
 
+    def __fresh_descr(self, name):
+        """Resolve descriptor for an action, dropping its memoized sub-element
+
+            Actions are not retried (they could repeat side effects), so
+            they must not act on a memoized, maybe stale, element.
+        """
+        descr = self.__getdescr(name)
+        self._subelems.pop(getattr(descr, 'xpath', None), None)
+        return descr
+
     def __setattr__(self, name, value):
         if name.startswith('_') or name in ('css', 'path', 'component_name'):
             return super(ComponentProxy, self).__setattr__(name, value)
-        descr = self.__getdescr(name)
-        return descr.__set__(self, value)
+        return self.__fresh_descr(name).__set__(self, value)
 
     def __delattr__(self, name):
         if name.startswith('_') or name in ('css', 'path', 'component_name'):
             raise AttributeError('Attribute %s cannot be deleted' % name)
-        descr = self.__getdescr(name)
-        return descr.__delete__(self)
+        return self.__fresh_descr(name).__delete__(self)
 
     @property
     def path(self):
@@ -372,12 +401,21 @@ class ComponentProxy(_SomeProxy):
     def _recover_stale(self):
         """Return new webelement to amend stale component
 
+            First tries the recorded locator chain, from the nearest
+            ancestor that is not stale. Then falls back to iterating the
+            parent for our name.
+
             :return: whether a new element has been located to recover this
         """
         parent = self._parent
         if not (parent and getattr(parent._scope, 'recover_stale', False)):
             return False
 
+        if self._recover_by_path():
+            return True
+
+        # elements cached by `pe-matchid` may be the stale ones
+        parent._scope.__dict__.pop('_matchid_cache', None)
         for r in (0, 1):
             try:
                 for iname, ielem, p, s in \
@@ -385,11 +423,61 @@ class ComponentProxy(_SomeProxy):
                                                     match=self._name):
                     if iname == self._name:
                         self._remote = ielem
+                        self._subelems.clear()
                         return True
             except StaleElementReferenceException:
                 if r or not parent._recover_stale():
                     raise
         return False
 
+    def _recover_by_path(self):
+        """Re-locate remote element by the locator chain, in one query
+
+            Ancestors that are stale are skipped (not recovered), their
+            chains prepended to ours.
+        """
+        if self._locator is None:
+            return False
+        absolute, steps = self._locator
+        this_fn = getattr(self._pagetmpl, '_this_fn', None)
+        if this_fn is None and any(step[0] is not None for step in steps):
+            # positional, would not be verified below
+            return False
+        anc = self._parent
+        while True:
+            try:
+                elem = locate_chain(anc._remote, steps, absolute=absolute)
+                break
+            except StaleElementReferenceException:
+                alocator = getattr(anc, '_locator', None)
+                if alocator is None:
+                    return False
+                absolute, steps = alocator[0], alocator[1] + steps
+                anc = anc._parent
+            except WebDriverException as e:
+                logger.debug("Cannot locate %s by path: %s", self._name, e)
+                return False
+
+        if elem is None:
+            return False
+        # Positions may have shifted, verify the name. Positional components
+        # have no name to verify, so only an all-`id` chain is trusted
+        if this_fn is None:
+            if any(step[0] is not None for step in steps):
+                logger.debug("Cannot verify %s at its path, not recovering by path",
+                             self._name)
+                return False
+        else:
+            try:
+                if this_fn(0, elem, self._scope, self._name) != self._name:
+                    logger.debug("Element at path of %s is now named differently",
+                                 self._name)
+                    return False
+            except (WebDriverException, CAttributeError):
+                return False
+        self._remote = elem
+        self._subelems.clear()
+        return True
+
 
 # eof
@@ -6,7 +6,9 @@ from abc import abstractmethod
 import copy
 from .exceptions import CAttributeError, CAttributeNoElementError
 from .actions import Action
-# from selenium.webdriver.remote.webdriver import WebElement
+from .lookups import find_element
+from .scripts import Script
+from selenium.webdriver.remote.webdriver import WebElement
 from selenium.common.exceptions import NoSuchElementException, StaleElementReferenceException
 from selenium.webdriver.common.keys import Keys
 import six
@@ -60,20 +62,40 @@ class AttrGetter(DomDescriptor):
             c.optional = True
             return c
 
+    def _cached_elem(self, comp):
+        """Return sub-element handle memoized in component, if any
+
+            A handle is only valid while the component's own element is the
+            one it was found under: re-resolving the component drops it.
+        """
+        if self.xpath:
+            cache = comp.__dict__.get('_subelems', None)
+            if cache:
+                cached = cache.get(self.xpath, None)
+                if cached is not None and cached[0] is comp._remote:
+                    return cached[1]
+        return None
+
     def _elem(self, comp):
         """Locate the web element from given component
+
+            Sub-elements are memoized in the component, per xpath. A stale
+            handle is dropped by the component, which then retries reads.
         """
+        elem = self._cached_elem(comp)
+        if elem is not None:
+            return elem
         try:
             try:
                 elem = comp._remote
                 if self.xpath:
-                    elem = elem.find_element_by_xpath(self.xpath)
+                    elem = find_element(elem, self.xpath, optional=self.optional)
             except StaleElementReferenceException:
                 if not comp._recover_stale():
                     raise
                 elem = comp._remote
                 if self.xpath:
-                    elem = elem.find_element_by_xpath(self.xpath)
+                    elem = find_element(elem, self.xpath, optional=self.optional)
         except NoSuchElementException as e:
             if self.optional:
                 self.logger.debug("Attribute %r.%s could not be found, returning None",
@@ -81,6 +103,10 @@ class AttrGetter(DomDescriptor):
                 return None
             else:
                 raise CAttributeNoElementError(six.text_type(e), component=comp)
+        if self.xpath:
+            cache = comp.__dict__.get('_subelems', None)
+            if cache is not None:
+                cache[self.xpath] = (comp._remote, elem)
         return elem
 
     def __get__(self, comp, type=None):
@@ -202,14 +228,34 @@ class AttrAnyChoiceGetter(AttrGetter):
         # return self._elem(comp).get_attribute(self.name)
 
 
+_text_js = Script.get(r'''
+    let elem = arguments[0];
+    if (arguments[1]) {
+        elem = document.evaluate(arguments[1], elem, null,
+                                 XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+        if (!elem) return null;
+    }
+    let ret = elem.innerText;
+    if (ret === undefined || ret === null) return [''];
+    // innerText has applied CSS white-space rules already (eg. for <pre>),
+    // only nbsp and the surrounding space differ from WebDriver's text
+    return [ret.replace(/\u00a0/g, ' ').trim()];
+    ''')
+
+
 class TextAttrGetter(AttrGetter):
     """Descriptor that returns the text of some DOM element
+
+        Locating the sub-element and reading its text is done in a single
+        script call, when component is backed by a real WebElement.
     """
     def __init__(self, xpath, optional=False, do_strip=False):
         super(TextAttrGetter, self).__init__('text', xpath, optional=optional)
         self._do_strip = do_strip
 
-    def __get__(self, comp, type=None):
+    def _text_slow(self, comp):
+        """Read text with separate lookup and text commands
+        """
         elem = self._elem(comp)
         if elem is None:
             return None
@@ -217,6 +263,38 @@ class TextAttrGetter(AttrGetter):
         ret = elem.text
         if not ret:
             ret = elem.get_attribute('innerText')
+        return ret
+
+    def _text(self, comp):
+        """Resolve sub-element and return its text, in one round-trip
+        """
+        remote = comp._remote
+        if not isinstance(remote, WebElement):
+            return self._text_slow(comp)
+
+        elem = self._cached_elem(comp)
+        if elem is not None:
+            return _text_js.run(elem.parent, elem, None)[0]
+
+        try:
+            ret = _text_js.run(remote.parent, remote, self.xpath or None)
+        except StaleElementReferenceException:
+            if not comp._recover_stale():
+                raise
+            remote = comp._remote
+            ret = _text_js.run(remote.parent, remote, self.xpath or None)
+
+        if ret is None:
+            if self.optional:
+                self.logger.debug("Attribute %r.%s could not be found, returning None",
+                                  comp, self.name)
+                return None
+            # let the regular lookup wait for the element, or report it missing
+            return self._text_slow(comp)
+        return ret[0]
+
+    def __get__(self, comp, type=None):
+        ret = self._text(comp)
         if ret and self._do_strip:
             ret = ret.strip()
         return ret
@@ -232,53 +310,59 @@ class PartialTextAttrGetter(TextAttrGetter):
         super(PartialTextAttrGetter, self).__init__(xpath, **kwargs)
         self._after_elem = after_elem
         self._before_elem = before_elem
+        self._script = self._build_script(after_elem, before_elem)
 
-    def __get__(self, comp, type=None):
-        elem = self._elem(comp)
-        if elem is None:
-            return None
-
+    @staticmethod
+    def _build_script(after_elem, before_elem):
+        """Build JS for given configuration, once. Tag names are passed as arguments
+        """
         js = 'let cnodes = arguments[0].childNodes;\n' \
              'let i = 0; let ret = "";\n'
-        if self._after_elem == '*':
+        if after_elem == '*':
             js += '''
                 for (;i<cnodes.length;i++){
                     if (cnodes[i].nodeType == 3) break;
                 }
                 '''
-        elif self._after_elem:
+        elif after_elem:
             js += '''
                 for (;i<cnodes.length;i++){
                     if ((cnodes[i].nodeType == 1) && (cnodes[i].tagName == arguments[1])) break;
                 }
                 '''
         js += 'for(;i<cnodes.length; i++){ \n'
-        if self._before_elem == '*':
+        if before_elem == '*':
             js += '  if (cnodes[i].nodeType == 1) break; '
-        elif self._before_elem:
+        elif before_elem:
             js += '  if ((cnodes[i].nodeType == 1) && (cnodes[i].tagName == arguments[2])) break;\n'
         js += '  if (cnodes[i].nodeType == 3) { ret += cnodes[i].nodeValue; }\n}\nreturn ret;'
+        return Script.get(js)
 
-        ret = elem.parent.execute_script(js, elem, self._after_elem, self._before_elem)
+    def __get__(self, comp, type=None):
+        elem = self._elem(comp)
+        if elem is None:
+            return None
+
+        ret = self._script.run(elem.parent, elem, self._after_elem, self._before_elem)
         if ret and self._do_strip:
             ret = ret.strip()
         return ret
 
 
-class RegexAttrGetter(AttrGetter):
+class RegexAttrGetter(TextAttrGetter):
     """Obtain text, resolve it with regular expression into attribute
     """
     def __init__(self, regex, xpath, group=None, optional=False):
-        super(RegexAttrGetter, self).__init__('text', xpath, optional=optional)
+        super(RegexAttrGetter, self).__init__(xpath, optional=optional)
         self._regex = regex
         self._group = group
 
     def __get__(self, comp, type=None):
-        elem = self._elem(comp)
-        if elem is None:
+        text = self._text(comp)
+        if text is None:
             return None
 
-        m = self._regex.match(elem.text or '')
+        m = self._regex.match(text)
         if not m:
             return None
 
@@ -314,6 +398,11 @@ class InputCompatDescr(AttrGetter):
         elem.send_keys(value)
 
 
+_set_value_js = Script.get("arguments[0].value = arguments[1];")
+_focus_set_value_js = Script.get("arguments[0].focus(); "
+                                 "arguments[0].value = arguments[1];")
+
+
 class InputValueDescr(InputCompatDescr):
     """Get/set the value of input. Use direct JS setter
 
@@ -326,8 +415,7 @@ class InputValueDescr(InputCompatDescr):
             raise CAttributeError("Cannot set value of missing element", component=comp)
         if isinstance(value, Action):
             return value.act_on_descriptor(self, elem)
-        driver = elem.parent
-        driver.execute_script("arguments[0].value = arguments[1];", elem, value)
+        _set_value_js.run(elem.parent, elem, value)
 
 
 class InputCombiDescr(InputCompatDescr):
@@ -337,10 +425,7 @@ class InputCombiDescr(InputCompatDescr):
             raise CAttributeError("Cannot set value of missing element", component=comp)
         if isinstance(value, Action):
             return value.act_on_descriptor(self, elem)
-        driver = elem.parent
-        driver.execute_script("arguments[0].focus(); "
-                              "arguments[0].value = arguments[1];",
-                              elem, value[:-1])
+        _focus_set_value_js.run(elem.parent, elem, value[:-1])
         elem.send_keys(Keys.END, value[-1])
 
 
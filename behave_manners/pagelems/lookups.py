@@ -0,0 +1,659 @@
+# -*- coding: UTF-8 -*-
+""" Helpers for locating remote elements on behalf of page elements
+
+    All lookups that the pagelems engine performs against the remote DOM
+    should go through the functions of this module, so that policies like
+    the implicit wait can be applied consistently.
+"""
+
+from __future__ import absolute_import
+import logging
+import re
+import weakref
+from contextlib import contextmanager
+from selenium.webdriver.remote.webdriver import WebDriver, WebElement
+from selenium.webdriver.common.by import By
+from selenium.common.exceptions import NoSuchElementException
+from .scripts import Script
+
+
+logger = logging.getLogger(__name__)
+
+
+class ImplicitWait(object):
+    """Tracks the implicit wait of a WebDriver, suspends it around lookups
+
+        When `browser.implicit_wait` is configured, every lookup that matches
+        nothing blocks at the remote for the full duration of that wait. For
+        optional or negative matches, such an empty result is expected and
+        the wait is pointless.
+
+        An `ImplicitWait` is registered per WebDriver with the configured
+        value. Lookups whose absence is an expected outcome then run with
+        the wait set to 0, and the configured value is restored *lazily*,
+        right before the next lookup that does need to wait. So, consecutive
+        optional lookups only cost one extra command to toggle.
+    """
+    _by_driver = weakref.WeakKeyDictionary()
+
+    def __init__(self, driver, timeout):
+        self._driver = weakref.ref(driver)
+        self.timeout = timeout
+        self._applied = timeout
+        self._absent_depth = 0
+        self.num_toggles = 0
+        self.num_skipped = 0
+
+    @classmethod
+    def register(cls, driver, timeout):
+        """Declare the implicit wait (in seconds) set on `driver`
+
+            :return: the new `ImplicitWait` instance, or None if no
+                waiting is configured
+        """
+        if not timeout:
+            cls._by_driver.pop(driver, None)
+            return None
+        iw = cls._by_driver[driver] = cls(driver, timeout)
+        return iw
+
+    @classmethod
+    def get(cls, remote):
+        """Return the `ImplicitWait` of `remote`, or None if not registered
+
+            :param remote: WebDriver or WebElement
+        """
+        if isinstance(remote, WebElement):
+            remote = remote.parent
+        try:
+            return cls._by_driver.get(remote, None)
+        except TypeError:
+            # unhashable, cannot be a registered driver
+            return None
+
+    @property
+    def seconds_saved(self):
+        """Upper bound of remote waiting avoided so far
+        """
+        return self.num_skipped * self.timeout
+
+    def _apply(self, value):
+        if self._applied == value:
+            return
+        driver = self._driver()
+        if driver is None:
+            return
+        driver.implicitly_wait(value)
+        self._applied = value
+        self.num_toggles += 1
+
+    def suspend(self):
+        """Set remote implicit wait to 0, until next `restore()`
+        """
+        self._apply(0)
+
+    def restore(self):
+        """Set remote implicit wait back to the configured value
+        """
+        self._apply(self.timeout)
+
+    @property
+    def expecting_absence(self):
+        return self._absent_depth > 0
+
+    @contextmanager
+    def absence_expected(self):
+        """Context where any lookup may legitimately find nothing
+        """
+        self._absent_depth += 1
+        try:
+            yield self
+        finally:
+            self._absent_depth -= 1
+
+    def report(self):
+        """Log how many waits have been skipped so far
+        """
+        if self.num_skipped:
+            logger.info("Implicit wait skipped for %d empty lookups, "
+                        "saving up to %.1fs (%d toggles)",
+                        self.num_skipped, self.seconds_saved, self.num_toggles)
+
+
+class NotExact(ValueError):
+    """Raised when an xpath has no exact equivalent in other strategies
+    """
+    pass
+
+
+class Locator(object):
+    """Compiled form of some xpath, using the fastest equivalent strategy
+
+        Browsers evaluate CSS selectors or `getElementById()` much faster
+        than XPath. When the xpath of a pagelem node can be translated
+        *exactly* to such a strategy, `by` and `value` hold that, else
+        they remain the original xpath.
+
+        :attribute absolute: the locator refers to the whole document,
+            rather than the element it is applied on
+    """
+    __slots__ = ('xpath', 'by', 'value', 'absolute')
+
+    def __init__(self, xpath, by=By.XPATH, value=None, absolute=False):
+        self.xpath = xpath
+        self.by = by
+        self.value = xpath if value is None else value
+        self.absolute = absolute
+
+    def __repr__(self):
+        return '<Locator %s=%s>' % (self.by, self.value)
+
+    @property
+    def native(self):
+        return self.by != By.XPATH
+
+
+class LocatorCompiler(object):
+    """Translates the xpath locators of pagelem nodes to CSS or ID ones
+
+        Only a strict subset of XPath is translated: steps along the child
+        or descendant axis, matching a tag (or `*`) and predicates that test
+        attributes for existence, equality, `contains()` or `starts-with()`
+        and their negations, combined with `and`. Anything else (text,
+        positions, other axes, `or` ...) keeps the xpath.
+
+        Tag names are compared like HTML does, so this is not exact for
+        elements in foreign (SVG, MathML) namespaces.
+    """
+    enabled = True
+    use_scope = True     # may use `:scope` pseudo-class, not supported by IE
+    max_cache = 2000
+    _cache = {}
+
+    _attr_re = r'@(?P<attr>[a-z_][a-z0-9_\-]*)'
+    _literal_re = r'(?P<lit>\'[^\']*\'|"[^"]*")'
+    _terms = [
+        (re.compile(_attr_re + r'$'), '[{attr}]', False),
+        (re.compile(_attr_re + r'\s*=\s*' + _literal_re + '$'), '[{attr}="{lit}"]', False),
+        (re.compile(r'contains\(\s*' + _attr_re + r'\s*,\s*' + _literal_re + r'\s*\)$'),
+            '[{attr}*="{lit}"]', True),
+        (re.compile(r'starts-with\(\s*' + _attr_re + r'\s*,\s*' + _literal_re + r'\s*\)$'),
+            '[{attr}^="{lit}"]', True),
+        ]
+    _ident_re = re.compile(r'[A-Za-z_][\w\-]*$')
+
+    @classmethod
+    def configure(cls, enabled=None, use_scope=None):
+        """Change translation options, drop any locators compiled so far
+        """
+        if enabled is not None:
+            cls.enabled = enabled
+        if use_scope is not None:
+            cls.use_scope = use_scope
+        cls._cache.clear()
+
+    @classmethod
+    def compile(cls, xpath):
+        """Return a `Locator` for `xpath`, cached
+        """
+        try:
+            return cls._cache[xpath]
+        except KeyError:
+            pass
+        try:
+            loc = cls._compile(xpath)
+        except NotExact:
+            loc = Locator(xpath)
+        if len(cls._cache) >= cls.max_cache:
+            cls._cache.clear()
+        cls._cache[xpath] = loc
+        return loc
+
+    @classmethod
+    def _split(cls, text, sep):
+        """Split `text` at `sep`, outside of brackets or quotes
+        """
+        parts = []
+        depth = 0
+        quote = None
+        i = start = 0
+        while i < len(text):
+            c = text[i]
+            if quote:
+                if c == quote:
+                    quote = None
+            elif c in '\'"':
+                quote = c
+            elif c in '[(':
+                depth += 1
+            elif c in '])':
+                depth -= 1
+                if depth < 0:
+                    raise NotExact(text)
+            elif depth == 0 and text.startswith(sep, i):
+                parts.append(text[start:i])
+                i += len(sep)
+                start = i
+                continue
+            i += 1
+        if depth or quote:
+            raise NotExact(text)
+        parts.append(text[start:])
+        return parts
+
+    @classmethod
+    def _match_bracket(cls, text):
+        """Return position after the bracket closing the one at `text[0]`
+        """
+        depth = 0
+        quote = None
+        for i, c in enumerate(text):
+            if quote:
+                if c == quote:
+                    quote = None
+            elif c in '\'"':
+                quote = c
+            elif c in '[(':
+                depth += 1
+            elif c in '])':
+                depth -= 1
+                if depth == 0:
+                    return i + 1
+        raise NotExact(text)
+
+    @classmethod
+    def _css_string(cls, literal):
+        val = literal[1:-1]
+        return val.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\a ')
+
+    @classmethod
+    def _compile_term(cls, term):
+        term = term.strip()
+        negate = False
+        if term.startswith('not(') and term.endswith(')'):
+            negate = True
+            term = term[4:-1].strip()
+        if term.startswith('boolean(') and term.endswith(')'):
+            if negate:
+                raise NotExact(term)
+            return ''.join([cls._compile_term(t) for t in cls._split(term[8:-1], ' and ')])
+        for regex, fmt, non_empty in cls._terms:
+            m = regex.match(term)
+            if not m:
+                continue
+            gd = m.groupdict()
+            if 'lit' in gd:
+                if non_empty and len(gd['lit']) < 3:
+                    # matches anything in XPath, nothing in CSS
+                    raise NotExact(term)
+                gd['lit'] = cls._css_string(gd['lit'])
+            ret = fmt.format(**gd)
+            if negate:
+                ret = ':not(%s)' % ret
+            return ret
+        raise NotExact(term)
+
+    @classmethod
+    def _compile_step(cls, step):
+        """Compile a single location step into a CSS compound selector
+
+            :return: (tag, predicates) where predicates is a list of
+                    (css, term) tuples
+        """
+        m = re.match(r'\*|[a-z_][\w\-]*', step)
+        if not m or m.group(0) != m.group(0).lower():
+            raise NotExact(step)
+        tag = m.group(0)
+        rest = step[m.end():]
+        preds = []
+        while rest:
+            if not rest.startswith('['):
+                raise NotExact(step)
+            end = cls._match_bracket(rest)
+            pred = rest[1:end-1]
+            for term in cls._split(pred, ' and '):
+                preds.append((cls._compile_term(term), term.strip()))
+            rest = rest[end:]
+        return tag, preds
+
+    @classmethod
+    def _compile(cls, xpath):
+        if not (cls.enabled and xpath):
+            raise NotExact(xpath)
+
+        absolute = False
+        if xpath.startswith('//'):
+            absolute = True
+            first_sep = ' '
+            body = xpath[2:]
+        elif xpath.startswith('.//'):
+            first_sep = ' '
+            body = xpath[3:]
+        elif xpath.startswith('./'):
+            first_sep = '>'
+            body = xpath[2:]
+        elif xpath.startswith(('/', '.', '(')):
+            raise NotExact(xpath)
+        else:
+            first_sep = '>'
+            body = xpath
+
+        steps = []
+        for n, part in enumerate(cls._split(body, '/')):
+            if not part:
+                # a '//' separator, glue next step as descendant
+                if not steps or steps[-1] != ' ':
+                    steps.append(' ')
+                continue
+            if steps and steps[-1] not in (' ', '>'):
+                steps.append('>')
+            steps.append(cls._compile_step(part))
+        if not steps or not isinstance(steps[-1], tuple):
+            raise NotExact(xpath)
+
+        if len(steps) == 1 and not absolute and first_sep == ' ':
+            # a single descendant step can be a context-less CSS
+            absolute = None
+        if len(steps) == 1 and absolute is not False:
+            tag, preds = steps[0]
+            if tag == '*' and len(preds) == 1 and absolute:
+                m = re.match(r'@id\s*=\s*' + cls._literal_re + '$', preds[0][1])
+                if m and not re.search(r'["\\]', m.group('lit')[1:-1]):
+                    return Locator(xpath, By.ID, m.group('lit')[1:-1], absolute=True)
+
+        css = []
+        for st in steps:
+            if isinstance(st, tuple):
+                tag, preds = st
+                sel = '' if (tag == '*' and preds) else tag
+                for pcss, term in preds:
+                    m = re.match(r'\[id="(.*)"\]$', pcss)
+                    if m and cls._ident_re.match(m.group(1)):
+                        pcss = '#' + m.group(1)
+                    sel += pcss
+                css.append(sel)
+            elif st == '>':
+                css.append(' > ')
+            else:
+                css.append(' ')
+        css = ''.join(css)
+
+        if absolute is None:
+            return Locator(xpath, By.CSS_SELECTOR, css)
+        elif absolute:
+            return Locator(xpath, By.CSS_SELECTOR, css, absolute=True)
+        elif not cls.use_scope:
+            raise NotExact(xpath)
+        elif first_sep == '>':
+            return Locator(xpath, By.CSS_SELECTOR, ':scope > ' + css)
+        else:
+            return Locator(xpath, By.CSS_SELECTOR, ':scope ' + css)
+
+
+def compile_locator(xpath):
+    """Return the fastest `Locator` equivalent to `xpath`
+    """
+    return LocatorCompiler.compile(xpath)
+
+
+def _native_target(remote, xpath):
+    """Decide how to run a lookup for `xpath` under `remote`
+
+        :return: (remote, locator) where locator is None if plain xpath
+            lookup is to be used
+    """
+    if isinstance(remote, WebElement):
+        loc = compile_locator(xpath)
+        if not loc.native:
+            return remote, None
+        if loc.absolute:
+            remote = remote.parent
+        return remote, loc
+    elif isinstance(remote, WebDriver):
+        loc = compile_locator(xpath)
+        if not loc.native:
+            return remote, None
+        if loc.absolute is False:
+            # relative to the document node, cannot map to CSS
+            return remote, None
+        return remote, loc
+    else:
+        # not a real remote, ie. a hypothetical one, keep xpath
+        return remote, None
+
+
+def _find_elements(remote, xpath):
+    remote, loc = _native_target(remote, xpath)
+    if loc is None:
+        return remote.find_elements_by_xpath(xpath)
+    return remote.find_elements(loc.by, loc.value)
+
+
+def _find_element(remote, xpath):
+    remote, loc = _native_target(remote, xpath)
+    if loc is None:
+        return remote.find_element_by_xpath(xpath)
+    return remote.find_element(loc.by, loc.value)
+
+
+
+@contextmanager
+def absence_expected(remote):
+    """Context manager, marking all lookups under `remote` as optional
+
+        Use around a lookup that involves several remote commands (like
+        iterating some pagelem and its children), where an empty result is
+        an expected outcome.
+    """
+    iw = ImplicitWait.get(remote)
+    if iw is None:
+        yield None
+    else:
+        with iw.absence_expected():
+            yield iw
+
+
+def iter_absence_expected(remote, iterable):
+    """Iterate over `iterable`, expecting absence while it computes each item
+
+        Unlike the `absence_expected()` context manager, the consumer of
+        this iterator is not affected; lookups it performs between items
+        will still wait normally.
+    """
+    it = iter(iterable)
+    while True:
+        with absence_expected(remote):
+            try:
+                item = next(it)
+            except StopIteration:
+                return
+        yield item
+
+
+def _prepare_wait(remote, optional):
+    """Apply implicit wait policy before some lookup
+
+        :return: the `ImplicitWait` if lookup is going to run suspended
+    """
+    iw = ImplicitWait.get(remote)
+    if iw is None:
+        return None
+    if optional or iw.expecting_absence:
+        iw.suspend()
+        return iw
+    iw.restore()
+    return None
+
+
+def _set_origin(remote, key, elems):
+    """Record, on each of `elems` , where it was found from
+
+        Origins are plain references kept in the local WebElement objects,
+        costing no remote command. They are used by `origin_chain()` .
+    """
+    if isinstance(remote, (WebDriver, WebElement)):
+        for i, elem in enumerate(elems):
+            if isinstance(elem, WebElement):
+                elem._pe_origin = (remote, key, i)
+    return elems
+
+
+def find_elements(remote, xpath, optional=False):
+    """Find elements by xpath, under the implicit wait policy of `remote`
+
+        :param remote: WebDriver or WebElement to search under
+        :param xpath: the locator
+        :param optional: an empty result is expected, do not wait for it
+        :return: list of WebElements
+    """
+    iw = _prepare_wait(remote, optional)
+    ret = _find_elements(remote, xpath)
+    if iw is not None and not ret:
+        iw.num_skipped += 1
+        logger.debug("Skipped implicit wait for: %s", xpath)
+    return _set_origin(remote, xpath, ret)
+
+
+def find_element(remote, xpath, optional=False):
+    """Find a single element by xpath, under implicit wait policy
+
+        Like `find_elements()` , but raises `NoSuchElementException` if
+        nothing is found
+    """
+    iw = _prepare_wait(remote, optional)
+    try:
+        return _set_origin(remote, xpath, [_find_element(remote, xpath)])[0]
+    except NoSuchElementException:
+        if iw is not None:
+            iw.num_skipped += 1
+        raise
+
+
+def find_element_by_id(remote, id_val, optional=False):
+    """Find a single element by `id`, under implicit wait policy
+    """
+    iw = _prepare_wait(remote, optional)
+    try:
+        return _set_origin(remote, (id_val,), [remote.find_element_by_id(id_val)])[0]
+    except NoSuchElementException:
+        if iw is not None:
+            iw.num_skipped += 1
+        raise
+
+
+_ids_js = """
+    let ret = [], missing = [];
+    for (let i = 0; i < arguments[0].length; i++) {
+        let elem = document.getElementById(arguments[0][i]);
+        if (elem) { ret.push(elem); }
+        else { missing.push(arguments[0][i]); }
+    }
+    return [ret, missing];
+    """
+
+
+def find_elements_by_ids(remote, ids):
+    """Resolve many `id` values in one go, at the root of the DOM
+
+        Runs a single script, rather than one lookup per id. Therefore,
+        it does *not* apply any implicit wait.
+
+        :param remote: WebDriver or WebElement (then, its driver is used)
+        :param ids: list of `id` values to look for
+        :return: (found, missing) lists, of elements present (in order
+                of `ids` ) and of ids that were not found
+    """
+    if isinstance(remote, WebElement):
+        remote = remote.parent
+    if not isinstance(remote, WebDriver):
+        found = []
+        missing = []
+        for id_val in ids:
+            try:
+                found.append(remote.find_element_by_id(id_val))
+            except NoSuchElementException:
+                missing.append(id_val)
+        return found, missing
+
+    found, missing = remote.execute_script(_ids_js, list(ids))
+    found = found or []
+    present = [i for i in ids if i not in (missing or ())]
+    for elem, id_val in zip(found, present):
+        _set_origin(remote, (id_val,), [elem])
+    return found, missing or []
+
+
+def origin_chain(welem, context):
+    """Compute the chain of lookups that located `welem` under `context`
+
+        Follows the origins recorded by the lookup functions above, from
+        `welem` up to `context` . No remote command is issued.
+
+        :return: (absolute, steps) or None if the chain is not known. Steps
+            are `[xpath, index]` or `[None, id]` lists, to be applied from
+            `context` (or the document, if `absolute` ) down to `welem`
+    """
+    steps = []
+    node = welem
+    while node is not context:
+        origin = getattr(node, '_pe_origin', None)
+        if origin is None:
+            if isinstance(node, WebDriver):
+                steps.reverse()
+                return True, steps
+            return None
+        node, key, idx = origin
+        if isinstance(key, tuple):
+            steps.append([None, key[0]])
+        else:
+            steps.append([key, idx])
+    steps.reverse()
+    return False, steps
+
+
+_chain_js = Script.get("""
+    let node = arguments[0] || document;
+    let steps = arguments[1];
+    for (let i = 0; i < steps.length; i++) {
+        let step = steps[i];
+        if (step[0] === null) {
+            node = node.querySelector('#' + CSS.escape(step[1]));
+        } else {
+            node = document.evaluate(step[0], node, null,
+                                     XPathResult.ORDERED_NODE_SNAPSHOT_TYPE,
+                                     null).snapshotItem(step[1]);
+        }
+        if (!node) return null;
+    }
+    return node;
+    """)
+
+
+def locate_chain(remote, steps, absolute=False):
+    """Re-locate an element by a chain of steps, from `origin_chain()`
+
+        All steps are resolved in a single script.
+
+        :param remote: WebElement to start from, or WebDriver for the document
+        :param absolute: start from the document, `remote` only gives the driver
+        :return: WebElement or None if any step did not match
+    """
+    if isinstance(remote, WebElement):
+        if absolute:
+            return _chain_js.run(remote.parent, None, steps)
+        return _chain_js.run(remote.parent, remote, steps)
+    elif isinstance(remote, WebDriver):
+        return _chain_js.run(remote, None, steps)
+    else:
+        return None
+
+
+def restore_wait(remote):
+    """Restore implicit wait of `remote`, if suspended by any lookup
+    """
+    iw = ImplicitWait.get(remote)
+    if iw is not None:
+        iw.restore()
+
+
+#eof
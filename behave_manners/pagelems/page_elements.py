@@ -16,6 +16,8 @@ from .exceptions import ElementNotFound, \
 from selenium.webdriver.remote.webdriver import WebElement
 from selenium.common.exceptions import NoSuchElementException
 from . import dom_descriptors
+from .lookups import ImplicitWait, find_elements, find_element_by_id, \
+                     find_elements_by_ids, iter_absence_expected
 import six
 
 
@@ -252,7 +254,7 @@ class AnyElement(DPageElement):
             xpath2 += match.xpath
             match = None
         enoent = True
-        for welem in remote.find_elements_by_xpath(xpath2):
+        for welem in find_elements(remote, xpath2, optional=self._pe_optional):
             # Stop at first 'welem' that yields any children results
             try:
                 nscope = scope
@@ -374,7 +376,7 @@ class PeNotElement(DPageElement):
             xpath2 = 'self::' + self.xpath
         else:
             xpath2 = prepend_xpath(xpath_prefix, self.xpath)
-        if remote.find_elements_by_xpath(xpath2):
+        if find_elements(remote, xpath2, optional=True):
             raise UnwantedElement(parent=remote, selector=xpath2)
         return ()
 
@@ -607,7 +609,7 @@ class NamedElement(DPageElement):
 
         n = 0
         enofound = None
-        for welem in remote.find_elements_by_xpath(xpath):
+        for welem in find_elements(remote, xpath, optional=self._pe_optional):
             try:
                 if self._pe_class is not None:
                     nscope = self._pe_class(parent=scope)
@@ -731,7 +733,7 @@ class InputElement(DPageElement):
         if self.this_name:
             enoent = True
             xpath2 = prepend_xpath(xpath_prefix, self.xpath, glue='/')
-            for welem in remote.find_elements_by_xpath(xpath2):
+            for welem in find_elements(remote, xpath2, optional=self._pe_optional):
                 nscope = scope
                 if self._pe_class is not None:
                     nscope = self._pe_class(parent=scope)
@@ -748,7 +750,7 @@ class InputElement(DPageElement):
             if self.name_attr == '*':
                 # Active remote iteration here, must discover all <input> elements
                 # and yield as many attributes
-                for relem in webelem.find_elements_by_xpath(prepend_xpath(xpath_prefix, self.xpath, glue='/')):
+                for relem in find_elements(webelem, prepend_xpath(xpath_prefix, self.xpath, glue='/')):
                     rname = relem.get_attribute('name')
                     xpath = self._xpath + "[@name=%s]" % textescape(rname)
                     descr_cls = self._get_descr_cls(relem)
@@ -1047,10 +1049,7 @@ class PeChoiceElement(DPageElement):
         else:
             return super(PeChoiceElement, self).reduce(site)
 
-    def _locate_in(self, remote, scope, xpath_prefix, match):
-        enofound = None
-        nfound = 0
-        seen = set()
+    def _iter_choices(self, remote, scope, xpath_prefix, match, seen, errors):
         for ch in self._children:
             # Stop at first 'welem' that yields any children results
             try:
@@ -1059,16 +1058,34 @@ class PeChoiceElement(DPageElement):
                         continue
                     seen.add(welem.id)
                     yield n, welem, p, scp
-                    nfound += 1
             except UnwantedElement:
                 pass
             except ElementNotFound as e:
-                if enofound is None:
-                    enofound = e
+                errors.append(e)
+
+    def _locate_in(self, remote, scope, xpath_prefix, match):
+        errors = []
+        nfound = 0
+        seen = set()
+        if ImplicitWait.get(remote) is not None:
+            # Any of the alternatives is expected to be missing, so first
+            # try them all without waiting. Only if none is there, wait
+            # for them as usual.
+            for y4 in iter_absence_expected(remote,
+                    self._iter_choices(remote, scope, xpath_prefix, match, seen, errors)):
+                yield y4
+                nfound += 1
+            if nfound:
+                return
+            del errors[:]
+
+        for y4 in self._iter_choices(remote, scope, xpath_prefix, match, seen, errors):
+            yield y4
+            nfound += 1
 
         if match is None and not nfound:
-            if enofound is not None:
-                raise enofound
+            if errors:
+                raise errors[0]
             else:
                 locs = []
                 for ch in self._children[:3]:
@@ -1210,6 +1227,7 @@ class PeMatchIDElement(DPageElement):
     """
     _name = 'tag.pe-matchid'
     _inherit = '.domContainer'
+    logger = logging.getLogger(__name__ + '.PeMatchIDElement')
     _attrs_map = {'pe-controller': ('_pe_ctrl', val_default, None),
                   'pe-ctrl': ('_pe_ctrl', val_default, None),
                   'pe-optional': ('_pe_optional', to_bool, None),
@@ -1232,12 +1250,17 @@ class PeMatchIDElement(DPageElement):
 
     def _locate_remote(self, remote, scope):
         """Return list of matching elements
+
+            Resolved elements are cached in `scope` , for as long as the
+            `id` expression keeps evaluating to the same value, but only
+            once all ids have been found. Under `Fresh()` (stale recovery),
+            the cache is dropped and they are looked up again.
         """
         try:
             id_val = eval(self._idc, {}, {'root': scope.root_component})
         except (KeyError, AttributeError) as e:
             if self._pe_optional:
-                return
+                return []
             raise e
         if not id_val:
             ivals = False
@@ -1248,7 +1271,7 @@ class PeMatchIDElement(DPageElement):
 
         if not ivals:
             if self._pe_optional:
-                return
+                return []
             else:
                 raise ElementNotFound(msg='Attribute \'%s\' has no value' % self.attr_id,
                                         parent=scope.root_component)
@@ -1256,16 +1279,31 @@ class PeMatchIDElement(DPageElement):
         if isinstance(remote, WebElement):
             remote = remote.parent   # operate at root of DOM, the page
 
-        found = False
-        for id_val in ivals:
+        cache = scope.__dict__.setdefault('_matchid_cache', {})
+        if getattr(scope, 'recover_stale', False):
+            cache.pop(self, None)
+        cached = cache.get(self, None)
+        if cached is not None and cached[0] == id_val:
+            return cached[1]
+
+        found, missing = find_elements_by_ids(remote, ivals)
+        if not (found or self._pe_optional):
+            # give the page a chance to render the first one, under implicit wait
             try:
-                yield remote.find_element_by_id(id_val)
-                found = True
-            except NoSuchElementException as e:
+                found = [find_element_by_id(remote, ivals[0])]
+                missing = missing[1:]
+            except NoSuchElementException:
                 pass
+        if missing:
+            self.logger.debug("ids not found: %s", ', '.join(missing))
 
         if not (found or self._pe_optional):
-            raise ElementNotFound(msg=str(e), selector='@id=%s' % id_val)
+            raise ElementNotFound(msg='No element with id: %s' % ', '.join(missing),
+                                  selector='@id=%s' % missing[0], parent=remote)
+        if found and not missing:
+            # late or optional ids must be looked up again, next time
+            cache[self] = (id_val, found)
+        return found
 
     def _locate_in(self, remote, scope, xpath_prefix, match):
         if self.this_name and match is not None:
@@ -4,18 +4,68 @@ from __future__ import division, absolute_import, print_function
 import time
 import logging
 import six
+from contextlib import contextmanager
 
 from .base_parsers import DOMScope
 from .dom_components import ComponentProxy
 from .exceptions import PageNotReady, Timeout
+from .scripts import Script
 from selenium.webdriver.remote.webdriver import WebElement
-from selenium.common.exceptions import UnexpectedAlertPresentException, NoAlertPresentException
+from selenium.common.exceptions import UnexpectedAlertPresentException, NoAlertPresentException, \
+                                       JavascriptException, TimeoutException
 from selenium.webdriver.common.alert import Alert
 
 
 logger = logging.getLogger('behave.scopes')
 
 
+_wait_async_js = '''
+    let done = arguments[arguments.length - 1];
+    let tend = Date.now() + arguments[0];
+    let check = function() {
+%s
+    };
+    let last = 'all', pending = false, finished = false, observer = null;
+    function finish(ret) {
+        if (finished) return;
+        finished = true;
+        if (observer) observer.disconnect();
+        done(ret);
+    }
+    function tick() {
+        let r;
+        try {
+            r = check();
+        } catch (e) {
+            finish({error: String(e)});
+            return;
+        }
+        if (!r) {
+            finish(null);
+        } else {
+            last = r;
+            if (Date.now() > tend) { finish({reason: last}); }
+            else { schedule(); }
+        }
+    }
+    function schedule() {
+        if (pending || finished) return;
+        pending = true;
+        let run = function() { if (pending) { pending = false; tick(); } };
+        if (window.requestAnimationFrame && document.visibilityState != 'hidden') {
+            window.requestAnimationFrame(run);
+        }
+        setTimeout(run, 100);
+    }
+    if (window.MutationObserver && document.documentElement) {
+        observer = new MutationObserver(schedule);
+        observer.observe(document.documentElement,
+                         {childList: true, subtree: true, attributes: true});
+    }
+    tick();
+    '''
+
+
 class WaitScope(DOMScope):
     _name = 'wait.base'
 
@@ -28,12 +78,20 @@ class WaitScope(DOMScope):
                  'long': 60.0
                 }
 
+    wait_mode = 'async'     # or 'poll', also overriden by `site_config`
+    script_timeout = 30     # driver's own, restored after async waits
+
+    def _js_conditions(self):
+        # readiness providers register theirs on the root scope, see `NetworkIdle`
+        return '\n'.join(self.wait_js_conditions +
+                         list(getattr(self, 'provider_js_conditions', ())))
+
     def isready_js(self, driver):
         """One-off check that JS is settled
 
             :param driver: WebDriver instance
         """
-        r = driver.execute_script('\n'.join(self.wait_js_conditions))
+        r = Script.get(self._js_conditions()).run(driver)
         if r:
             raise PageNotReady(r)
 
@@ -50,11 +108,59 @@ class WaitScope(DOMScope):
         return self.wait(timeout=timeout, welem=welem, webdriver=webdriver,
                          ready_fn=self.isready_all)
 
+    def _can_wait_async(self, ready_fn):
+        """Tell if `ready_fn` is only the JS conditions, that can run in browser
+        """
+        if self.site_config.get('wait_mode', self.wait_mode) != 'async':
+            return False
+        if ready_fn == self.isready_js:
+            return True
+        return ready_fn == self.isready_all \
+            and getattr(type(self).isready_all, '__func__', type(self).isready_all) \
+            is getattr(WaitScope.isready_all, '__func__', WaitScope.isready_all)
+
+    @classmethod
+    @contextmanager
+    def _script_timeout(cls, driver, secs):
+        """Let async scripts run for `secs` , within this context only
+
+            The driver is then set back to `script_timeout` , which other
+            async scripts of the test may rely on.
+        """
+        if secs == cls.script_timeout:
+            yield
+            return
+        driver.set_script_timeout(secs)
+        try:
+            yield
+        finally:
+            driver.set_script_timeout(cls.script_timeout)
+
+    def wait_js(self, driver, tend):
+        """Wait in-browser for JS conditions, until `tend` timestamp
+
+            Conditions are checked on animation frames or DOM mutations,
+            with a slow timer as fallback, inside a single async script.
+
+            :return: None if ready, or the last reason of not being ready
+        """
+        tleft = max(tend - time.time(), 0.0)
+        with self._script_timeout(driver, int(tleft + 5.0)):
+            ret = driver.execute_async_script(_wait_async_js % self._js_conditions(),
+                                              int(tleft * 1000))
+        if not ret:
+            return None
+        if 'error' in ret:
+            raise JavascriptException(ret['error'])
+        return ret['reason']
+
     def wait(self, timeout='short', ready_fn=None, welem=None, webdriver=None):
         """Waits until 'ready_fn()` signals completion, times out otherwise
         """
         tstart = time.time()
-        tend = tstart + self.resolve_timeout(timeout)
+        budget, limit = self._resolve_budget(timeout)
+        tend = tstart + budget
+        tlimit = tstart + limit
         lastmsg = 'all'
         pause = 0.05
         if webdriver is None:
@@ -68,11 +174,33 @@ class WaitScope(DOMScope):
         if ready_fn is None:
             ready_fn = self.isready_all
 
+        while self._can_wait_async(ready_fn):
+            try:
+                lastmsg = self.wait_js(webdriver, tend)
+                if lastmsg is None:
+                    self._record_timing(timeout, time.time() - tstart)
+                    return
+                if tend < tlimit:
+                    tend = self._extend_wait(timeout, tstart, tend, tlimit, lastmsg)
+                    continue
+                self._timed_out(timeout, tstart, lastmsg)
+            except UnexpectedAlertPresentException as e:
+                logger.debug("Alert during wait: %s", e.alert_text)
+                ual = Alert(webdriver)
+                if not self.handle_alert(ual):
+                    raise e
+            except (JavascriptException, TimeoutException) as e:
+                # ie. page navigated away, while script was waiting
+                logger.debug("In-browser wait interrupted, polling: %s", e.msg)
+                lastmsg = 'all'
+                break
+
         while True:
             tnow = time.time()
-            if tnow > tend:
-                raise Timeout("Timed out after %.2fs waiting for %s" %
-                              (tnow - tstart, lastmsg))
+            if tnow > tend and tend < tlimit:
+                tend = self._extend_wait(timeout, tstart, tend, tlimit, lastmsg)
+            elif tnow > tend:
+                self._timed_out(timeout, tstart, lastmsg)
 
             try:
                 ready_fn(webdriver)
@@ -89,17 +217,72 @@ class WaitScope(DOMScope):
             if pause < 0.8:
                 pause *= 2.0
 
+        self._record_timing(timeout, time.time() - tstart)
+
+    def _timing_store(self, timeout):
+        """Return the `TimingStore` and page key, if `timeout` is adaptive
+        """
+        if not isinstance(timeout, six.string_types):
+            return None, None
+        store = getattr(self, 'timing_store', None)
+        page = getattr(self, 'timing_page', None)
+        if store is None or page is None:
+            return None, None
+        return store, page
+
+    def _extend_wait(self, timeout, tstart, tend, tlimit, lastmsg):
+        """Learned budget was exceeded: keep waiting for the store's grace time
+
+            The (longer) time it then takes is recorded, so that the budget
+            grows back.
+        """
+        logger.info("Wait '%s' for %s exceeded learned budget of %.2fs, "
+                    "extending to %.2fs", timeout, lastmsg, tend - tstart, tlimit - tstart)
+        return tlimit
+
+    def _timed_out(self, timeout, tstart, lastmsg):
+        """Record the time waited in vain, then raise `Timeout`
+
+            That time being above the learned budget, later runs wait longer.
+        """
+        secs = time.time() - tstart
+        self._record_timing(timeout, secs)
+        raise Timeout("Timed out after %.2fs waiting for %s" % (secs, lastmsg))
+
+    def _record_timing(self, timeout, secs):
+        store, page = self._timing_store(timeout)
+        if store is not None:
+            store.record(page, timeout, secs)
+
     def resolve_timeout(self, timeout):
+        """Compute timeout in seconds, for a number or name like 'short'
+
+            Named timeouts are taken from `site_config` or `timeouts` .
+            If a timing store is attached to the scopes, it may shorten them
+            according to the history of that wait on this page.
+        """
+        return self._resolve_budget(timeout)[0]
+
+    def _resolve_budget(self, timeout):
+        """Return (learned budget, limit) seconds for `timeout`
+
+            The limit is where the wait fails: the budget plus the timing
+            store's `grace` , never above the configured value.
+        """
         factor = self.site_config.get('time_factor', 1.0)  # global multiplier for timeouts
         if isinstance(timeout, (int, float)):
-            return timeout * factor
+            return timeout * factor, timeout * factor
         else:
             num = self.site_config.get('timeouts', {}).get(timeout, None)
             if num is None:
                 num = self.timeouts.get(timeout, None)
             if num is None:
                 raise KeyError("Unknown timeout '%s'" % timeout)
-            return num * factor
+            store, page = self._timing_store(timeout)
+            if store is not None:
+                budget = store.budget(page, timeout, num * factor)
+                return budget, min(budget + store.grace, num * factor)
+            return num * factor, num * factor
 
     class Page(object):
         def wait_all(self, timeout):
@@ -107,6 +290,86 @@ class WaitScope(DOMScope):
             self._scope.wait_all(timeout, webdriver=self._remote)
 
 
+class NetworkIdle(object):
+    """Readiness provider: wait until no fetch/XHR requests are in flight
+
+        A counter is injected in the page, wrapping `fetch()` and
+        `XMLHttpRequest` . Network is considered idle once no request
+        has been pending for `quiet` seconds.
+
+        Once registered on a root scope, this adds its condition to the
+        waits of all `WaitScope` under it.
+    """
+    logger = logging.getLogger(__name__ + '.NetworkIdle')
+
+    condition = "if (window.__manners_net && (window.__manners_net.inflight > 0 ||" \
+                " Date.now() - window.__manners_net.last < window.__manners_net.quiet))" \
+                " { return 'network'; }"
+
+    counter_js = '''(function(quiet) {
+        if (window.__manners_net) return;
+        let net = window.__manners_net = {inflight: 0, last: Date.now(), quiet: quiet};
+        function start() { net.inflight++; }
+        function end() { net.inflight = Math.max(net.inflight - 1, 0); net.last = Date.now(); }
+        if (window.fetch) {
+            let ofetch = window.fetch;
+            window.fetch = function() {
+                start();
+                try {
+                    return ofetch.apply(this, arguments).then(
+                        function(r) { end(); return r; },
+                        function(e) { end(); throw e; });
+                } catch (e) { end(); throw e; }
+            };
+        }
+        if (window.XMLHttpRequest) {
+            let osend = XMLHttpRequest.prototype.send;
+            XMLHttpRequest.prototype.send = function() {
+                start();
+                this.addEventListener('loadend', end);
+                try { return osend.apply(this, arguments); }
+                catch (e) { end(); throw e; }
+            };
+        }
+    })(%d);'''
+
+    def __init__(self, quiet=0.5):
+        self.quiet = quiet
+        self._installed = set()     # session ids
+        self._on_new_docs = set()
+
+    def register(self, root_scope):
+        conditions = list(getattr(root_scope, 'provider_js_conditions', ()))
+        if self.condition not in conditions:
+            root_scope.provider_js_conditions = conditions + [self.condition]
+
+    def install(self, driver):
+        """Install counter in `driver` , on every new document if possible
+
+            Works on every new document with Chromium's `send_command` ,
+            otherwise needs `ensure()` after each page load. Done once per
+            browser session, which may be reused by many scenarios.
+        """
+        if driver.session_id in self._installed:
+            return
+        self._installed.add(driver.session_id)
+        js = self.counter_js % int(self.quiet * 1000)
+        try:
+            driver.execute('send_command',
+                           {'cmd': 'Page.addScriptToEvaluateOnNewDocument',
+                            'params': {'source': js}})
+            self._on_new_docs.add(driver.session_id)
+        except Exception as e:
+            self.logger.debug("Cannot inject on new documents, will do after load: %s", e)
+        driver.execute_script(js)
+
+    def ensure(self, driver):
+        """Install counter in current document, if not already done for all
+        """
+        if driver.session_id not in self._on_new_docs:
+            driver.execute_script(self.counter_js % int(self.quiet * 1000))
+
+
 class RootDOMScope(DOMScope):
     """Default scope to be used as parent of all scopes
     
@@ -0,0 +1,111 @@
+# -*- coding: UTF-8 -*-
+""" Registry of JavaScript snippets that are executed on the remote
+
+    Descriptors and scopes that need to run JS should build their script
+    *once* and register it here, then run it through `Script.run()` .
+
+    By default, that is plain `execute_script()` , sending the full body
+    each time. But on browsers that support it (Chromium, through the
+    `send_command` endpoint), a driver can be *pinned* : each script is then
+    installed as a function in every document loaded, and subsequent calls
+    only send a short stub with the script id and the arguments.
+"""
+
+from __future__ import absolute_import
+import logging
+import weakref
+from selenium.common.exceptions import WebDriverException
+
+
+logger = logging.getLogger(__name__)
+
+_fns_var = 'window.__manners_fns'
+_unpinned_key = '__manners_unpinned'
+
+
+class Script(object):
+    """A JS function body, like the ones passed to `execute_script()`
+
+        Body may use `arguments` and `return` a value. Instances are
+        obtained through `Script.get()` , so that the same body is only
+        registered once.
+    """
+    __slots__ = ('id', 'body', '_stub', '_define')
+    _registry = {}
+    _pinned = weakref.WeakKeyDictionary()  # driver: set of installed ids
+
+    def __init__(self, sid, body):
+        self.id = sid
+        self.body = body
+        self._stub = 'let f = %s && %s["%s"]; ' \
+                     'return f ? f.apply(null, arguments) : {"%s": true};' \
+                     % (_fns_var, _fns_var, sid, _unpinned_key)
+        self._define = '(%s = %s || {})["%s"] = function() {\n%s\n};' \
+                       % (_fns_var, _fns_var, sid, body)
+
+    def __repr__(self):
+        return '<Script %s>' % self.id
+
+    @classmethod
+    def get(cls, body):
+        """Return the registered `Script` for that body, creating it if needed
+        """
+        try:
+            return cls._registry[body]
+        except KeyError:
+            scr = cls._registry[body] = cls('s%d' % len(cls._registry), body)
+            return scr
+
+    @classmethod
+    def pin(cls, driver):
+        """Enable pinned scripts on `driver`
+
+            Driver must support the chromium `send_command` endpoint
+        """
+        cls._pinned[driver] = set()
+
+    @classmethod
+    def unpin(cls, driver):
+        cls._pinned.pop(driver, None)
+
+    def _install(self, driver, installed):
+        """Have the browser define this script on every new document
+        """
+        try:
+            driver.execute('send_command',
+                           {'cmd': 'Page.addScriptToEvaluateOnNewDocument',
+                            'params': {'source': self._define}})
+            installed.add(self.id)
+        except WebDriverException as e:
+            logger.warning("Cannot pin scripts, falling back to plain ones: %s", e)
+            self.unpin(driver)
+
+    def run(self, driver, *args):
+        """Execute this script on `driver` with `args`
+        """
+        try:
+            installed = self._pinned.get(driver, None)
+        except TypeError:
+            installed = None
+        if installed is None:
+            return driver.execute_script(self.body, *args)
+
+        if self.id in installed:
+            ret = driver.execute_script(self._stub, *args)
+            if not (isinstance(ret, dict) and ret.get(_unpinned_key)):
+                return ret
+            # document was loaded before install, define it there too
+        else:
+            self._install(driver, installed)
+
+        return driver.execute_script(self._define + '\nreturn %s["%s"].apply(null, arguments);'
+                                     % (_fns_var, self.id), *args)
+
+
+def run_script(driver, body, *args):
+    """Execute a script through the registry, by its body
+    """
+    return Script.get(body).run(driver, *args)
+
+
+#eof
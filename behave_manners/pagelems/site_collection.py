@@ -5,6 +5,7 @@ import posixpath as pp
 import fnmatch
 import logging
 import re
+from collections import OrderedDict
 from .base_parsers import DPageElement, DOMScope, DBaseLinkElement, HTMLParseError
 from .loaders import BaseLoader
 
@@ -17,6 +18,7 @@ class DSiteCollection(DPageElement):
     """
     _name = '.siteCollection'
     logger = logging.getLogger('site_collection')
+    url_cache_size = 256
 
     def __init__(self, loader, config=None):
         super(DSiteCollection, self).__init__()
@@ -32,6 +34,7 @@ class DSiteCollection(DPageElement):
         self._loaded_gallery = set()   # mark already loaded files
         self._templates = {}
         self._site_config = config or {}
+        self._url_cache = OrderedDict()  # url to (target, title, params), LRU
 
     def consume(self, element):
         from .page_elements import DHtmlObject
@@ -62,6 +65,7 @@ class DSiteCollection(DPageElement):
             if link.url is not None:
                 link_re = fnmatch.translate(link.pattern or link.url)   # TODO nio-style matching
                 self.urls.append((link.url, re.compile(link_re), target))
+                self._url_cache.clear()
             if link.title:
                 self.page_dir[link.title] = target
                 if link.url is not None:
@@ -173,22 +177,36 @@ class DSiteCollection(DPageElement):
         """Find the page template that matches url (path) of browser
 
             returns (page, title, params)
+
+            Resolutions (and misses) of the latest `url_cache_size` urls
+            are cached.
         """
 
         # TODO: decode fragments
+        try:
+            ret = self._url_cache.pop(url)
+        except KeyError:
+            ret = self._resolve_url(url)
+            if len(self._url_cache) >= self.url_cache_size:
+                self._url_cache.popitem(last=False)
+        self._url_cache[url] = ret
+
+        if ret is None:
+            raise KeyError("No match for url: %s" % url)
+        target, title, params = ret
+        return self.get_by_file(target), title, params
 
+    def _resolve_url(self, url):
         for fnpat, expr, target in self.urls:
             m = expr.match(url)
             if m:
-                page = self.get_by_file(target)
                 title = None
                 for t, u in self.url_dir.items():
                     if u == fnpat:
                         title = t
                         break
-                return page, title, m.groups()[1:]
-        else:
-            raise KeyError("No match for url: %s" % url)
+                return target, title, m.groups()[1:]
+        return None
 
     def get_by_file(self, fname):
         """Get page by template filename
@@ -215,6 +233,17 @@ class DSiteCollection(DPageElement):
         url = self.url_dir.get(title, None)
         return self.get_by_file(fname), url
 
+    def get_title(self, page):
+        """Reverse of `get_by_title()` : title (or filename) of loaded page
+        """
+        for fname, pelem in self.file_dir.items():
+            if pelem is page:
+                for title, tfname in self.page_dir.items():
+                    if tfname == fname:
+                        return title
+                return fname
+        return None
+
     def get_root_scope(self):
         """Return new DOMScope bound to self
 
@@ -0,0 +1,317 @@
+# -*- coding: UTF-8 -*-
+""" Run behave features in parallel worker processes
+
+    Features are split into work units: whole features when tagged
+    `@serial` (or with `--by feature`), single scenarios otherwise. Units
+    are balanced across workers by their duration in previous runs.
+
+    Each worker is a separate `behave` process, thus gets its own site
+    context, browser and output folder: through `{pid}` in `output.dir` ,
+    or else a `worker-N` sub-folder of it.
+    JSON and JUnit results of all workers are merged into one report::
+
+        behave-parallel -j 4 -r report/ features/ -- --tags=~@wip
+"""
+
+from __future__ import absolute_import, division, print_function
+import os
+import os.path
+import sys
+import glob
+import json
+import time
+import shutil
+import logging
+import argparse
+import subprocess
+import multiprocessing
+import xml.etree.ElementTree as ET
+
+
+log = logging.getLogger(__name__)
+
+
+class WorkUnit(object):
+    """One or more scenarios that are run within one worker
+
+        :param key: stable name, for the durations history
+        :param locations: arguments to `behave` , like `path:line`
+    """
+    def __init__(self, key, locations):
+        self.key = key
+        self.locations = locations
+        self.duration = None
+
+    def __repr__(self):
+        return '<WorkUnit %s>' % self.key
+
+
+def collect_units(paths, by='scenario'):
+    """Parse feature files under `paths` into work units
+    """
+    from behave.parser import parse_file
+    from . import alt_parser  # noqa, for extended feature syntax
+
+    fnames = []
+    for path in paths:
+        if os.path.isdir(path):
+            for dirpath, _dirnames, filenames in os.walk(path):
+                fnames += [os.path.join(dirpath, f) for f in filenames
+                           if f.endswith('.feature')]
+        else:
+            fnames.append(path)
+
+    units = []
+    for fname in sorted(fnames):
+        feature = parse_file(fname)
+        if feature is None:
+            continue
+        if by == 'feature' or 'serial' in feature.tags:
+            units.append(WorkUnit(fname, [fname]))
+            continue
+        for scenario in feature.scenarios:
+            units.append(WorkUnit('%s::%s' % (fname, scenario.name),
+                                  ['%s:%d' % (fname, scenario.line)]))
+    return units
+
+
+def balance(units, num_workers, durations):
+    """Distribute `units` to workers, longest first to the least loaded
+
+        Units without history are assumed to take the average duration.
+
+        :return: list of `num_workers` lists of units
+    """
+    known = [durations[u.key] for u in units if u.key in durations]
+    default = (sum(known) / len(known)) if known else 1.0
+    for u in units:
+        u.duration = durations.get(u.key, default)
+
+    shards = [[] for _i in range(num_workers)]
+    loads = [0.0] * num_workers
+    for u in sorted(units, key=lambda u: u.duration, reverse=True):
+        i = loads.index(min(loads))
+        shards[i].append(u)
+        loads[i] += u.duration
+    return [s for s in shards if s]
+
+
+def json_durations(features):
+    """Durations per work unit key, from behave's JSON output
+    """
+    ret = {}
+    for feature in features:
+        fname = feature.get('location', '').rsplit(':', 1)[0]
+        for scenario in feature.get('elements', []):
+            if scenario.get('type') == 'background':
+                continue
+            secs = sum(step.get('result', {}).get('duration', 0.0)
+                       for step in scenario.get('steps', []))
+            key = '%s::%s' % (fname, scenario.get('name'))
+            ret[key] = ret.get(key, 0.0) + secs
+            ret[fname] = ret.get(fname, 0.0) + secs
+    return ret
+
+
+def _merged_status(elements):
+    statuses = set(e.get('status') for e in elements if e.get('type') != 'background')
+    if statuses - {'passed', 'skipped', None}:
+        return 'failed'
+    elif 'passed' in statuses:
+        return 'passed'
+    return 'skipped'
+
+
+def merge_json(results):
+    """Merge features of many JSON outputs, dropping scenarios skipped there
+
+        Each worker reports all scenarios of a feature, but runs only some
+        of them; the others are 'skipped' . Feature status is computed
+        again from the merged scenarios.
+    """
+    merged = {}
+    for feature in results:
+        elements = [e for e in feature.get('elements', [])
+                    if e.get('type') == 'background' or e.get('status') != 'skipped']
+        dest = merged.get(feature.get('location'))
+        if dest is None:
+            feature = dict(feature, elements=elements)
+            merged[feature.get('location')] = feature
+        else:
+            dest['elements'] += [e for e in elements if e.get('type') != 'background']
+    for feature in merged.values():
+        feature['status'] = _merged_status(feature['elements'])
+    return list(merged.values())
+
+
+def merge_junit(src_dirs, dest_dir):
+    """Merge JUnit files, combining suites of the same feature
+
+        A test case skipped in one worker is replaced by the same case,
+        where it has run.
+    """
+    suites = {}
+    cases = {}
+    for src in src_dirs:
+        for fname in sorted(glob.glob(os.path.join(src, '*.xml'))):
+            suite = ET.parse(fname).getroot()
+            base = os.path.basename(fname)
+            suites.setdefault(base, suite)
+            bcases = cases.setdefault(base, {})
+            for case in suite.findall('testcase'):
+                key = (case.get('classname'), case.get('name'))
+                if key not in bcases or bcases[key].find('skipped') is not None:
+                    bcases[key] = case
+
+    if not os.path.isdir(dest_dir):
+        os.makedirs(dest_dir)
+    for base, suite in suites.items():
+        for case in suite.findall('testcase'):
+            suite.remove(case)
+        bcases = list(cases[base].values())
+        for case in bcases:
+            suite.append(case)
+        suite.set('tests', str(len(bcases)))
+        for attr, tag in (('failures', 'failure'), ('errors', 'error'),
+                          ('skipped', 'skipped')):
+            suite.set(attr, str(len([c for c in bcases if c.find(tag) is not None])))
+        suite.set('time', '%.6f' % sum(float(c.get('time', 0)) for c in bcases))
+        ET.ElementTree(suite).write(os.path.join(dest_dir, base),
+                                    encoding='UTF-8', xml_declaration=True)
+
+
+class Worker(object):
+    """A `behave` process, running a shard of units
+    """
+    env_var = 'BEHAVE_MANNERS_WORKER'
+
+    def __init__(self, num, units, report_dir, behave_args):
+        self.num = num
+        self.units = units
+        self.name = 'worker-%d' % num
+        self.json_file = os.path.join(report_dir, self.name + '.json')
+        self.junit_dir = os.path.join(report_dir, self.name + '-junit')
+        self.log_file = os.path.join(report_dir, self.name + '.log')
+        self.cmd = [sys.executable, '-m', 'behave',
+                    '--junit', '--junit-directory', self.junit_dir,
+                    '-f', 'json', '-o', self.json_file,
+                    '-f', 'progress'] + behave_args
+        for u in units:
+            self.cmd += u.locations
+        self.proc = None
+
+    def start(self):
+        log.debug("Starting %s: %s", self.name, ' '.join(self.cmd))
+        env = dict(os.environ)
+        env[self.env_var] = self.name   # separates output, see `SiteContext`
+        with open(self.log_file, 'wb') as fp:
+            self.proc = subprocess.Popen(self.cmd, stdout=fp, stderr=subprocess.STDOUT,
+                                         env=env)
+
+    def results(self):
+        try:
+            with open(self.json_file, 'rt') as fp:
+                return json.load(fp)
+        except (IOError, ValueError) as e:
+            log.warning("No results from %s: %s", self.name, e)
+            return []
+
+
+def collect_screenshots(config_file, workers, dest_dir, userdata=None):
+    """Copy screenshots from each worker's `output.dir` into `dest_dir`
+    """
+    from .site import SiteContext
+    from .pagelems import FSLoader
+
+    config = SiteContext._load_config(config_file, loader=FSLoader('.'))
+    out_tmpl = config.get('output', {}).get('dir', '.')
+    shots_cfg = config.get('browser', {}).get('screenshots')
+    if not shots_cfg:
+        return
+    for worker in workers:
+        out_glob = out_tmpl.format(pid=worker.proc.pid, timestamp='*',
+                                   userdata=userdata or {})
+        if '{pid}' not in out_tmpl:
+            out_glob = os.path.join(out_glob, worker.name)
+        for shots_dir in glob.glob(os.path.join(out_glob, shots_cfg.get('dir', '.'))):
+            wdest = os.path.join(dest_dir, worker.name)
+            for fname in glob.glob(os.path.join(shots_dir, '*.png')):
+                if not os.path.isdir(wdest):
+                    os.makedirs(wdest)
+                shutil.copy2(fname, wdest)
+
+
+def cmdline_main():
+    """Entry point for the parallel runner
+    """
+    parser = argparse.ArgumentParser(description='Run behave features in parallel')
+    parser.add_argument('-j', '--jobs', type=int, default=multiprocessing.cpu_count(),
+                        help="Number of worker processes")
+    parser.add_argument('-r', '--report-dir', default='parallel-report',
+                        help="Folder for merged results")
+    parser.add_argument('-c', '--config', default='config.yaml',
+                        help="Site config, to locate screenshots")
+    parser.add_argument('--by', choices=('scenario', 'feature'), default='scenario',
+                        help="Split work by scenario (unless @serial) or by feature")
+    parser.add_argument('--durations', default='.behave-durations.json',
+                        help="History of durations, to balance workers")
+    parser.add_argument('paths', nargs='*', default=['features'],
+                        help="Feature files or folders")
+
+    # arguments after '--' are passed to behave
+    argv = sys.argv[1:]
+    behave_args = []
+    if '--' in argv:
+        behave_args = argv[argv.index('--') + 1:]
+        argv = argv[:argv.index('--')]
+    args = parser.parse_args(argv)
+    logging.basicConfig(level=logging.INFO)
+
+    durations = {}
+    if os.path.exists(args.durations):
+        with open(args.durations, 'rt') as fp:
+            durations = json.load(fp)
+
+    units = collect_units(args.paths, by=args.by)
+    shards = balance(units, args.jobs, durations)
+    if not os.path.isdir(args.report_dir):
+        os.makedirs(args.report_dir)
+
+    workers = [Worker(i, shard, args.report_dir, behave_args)
+               for i, shard in enumerate(shards)]
+    log.info("Running %d units on %d workers", len(units), len(workers))
+    t0 = time.time()
+    for worker in workers:
+        worker.start()
+    ret = 0
+    for worker in workers:
+        code = worker.proc.wait()
+        if code:
+            log.warning("%s exited with %d, see %s", worker.name, code, worker.log_file)
+            ret = max(ret, code)
+    log.info("All workers finished in %.1fsec", time.time() - t0)
+
+    all_results = []
+    for worker in workers:
+        all_results += worker.results()
+    all_results = merge_json(all_results)
+    with open(os.path.join(args.report_dir, 'results.json'), 'wt') as fp:
+        json.dump(all_results, fp, indent=1)
+    merge_junit([w.junit_dir for w in workers], os.path.join(args.report_dir, 'junit'))
+
+    durations.update(json_durations(all_results))
+    with open(args.durations, 'wt') as fp:
+        json.dump(durations, fp, indent=1, sort_keys=True)
+
+    if os.path.exists(args.config):
+        userdata = dict(d.split('=', 1) for o, d in zip(behave_args, behave_args[1:])
+                        if o in ('-D', '--define') and '=' in d)
+        collect_screenshots(args.config, workers,
+                            os.path.join(args.report_dir, 'screenshots'), userdata)
+    return ret
+
+
+if __name__ == '__main__':
+    sys.exit(cmdline_main())
+
+#eof
@@ -7,10 +7,137 @@ import os
 import os.path
 import logging
 import time
+import base64
+import shutil
+import hashlib
+import threading
+import io
 from contextlib import contextmanager
+from six.moves import queue
 from behave.model_core import Status, BasicStatement
 from selenium.common.exceptions import WebDriverException
 from selenium.webdriver.common.action_chains import ActionChains
+from .pagelems.scripts import Script
+try:
+    from PIL import Image, ImageDraw
+except ImportError:
+    Image = ImageDraw = None
+
+
+def draw_marks(png_data, marks, crop=False, margin=50):
+    """Draw highlight rectangles over a PNG screenshot, locally
+
+        :param png_data: bytes of the PNG image
+        :param marks: list of (x, y, width, height) , in image pixels
+        :param crop: crop image around the marks, plus `margin`
+        :return: bytes of new PNG image
+
+        Needs the `PIL` (Pillow) package
+    """
+    img = Image.open(io.BytesIO(png_data)).convert('RGBA')
+    overlay = Image.new('RGBA', img.size, (0, 0, 0, 0))
+    draw = ImageDraw.Draw(overlay)
+    for x, y, w, h in marks:
+        draw.rectangle([x, y, x + w, y + h], fill=(255, 64, 64, 76))
+        for i in range(2):
+            draw.rectangle([x + i, y + i, x + w - i, y + h - i], outline=(255, 0, 0, 255))
+    img = Image.alpha_composite(img, overlay)
+    if crop and marks:
+        x0 = max(min(m[0] for m in marks) - margin, 0)
+        y0 = max(min(m[1] for m in marks) - margin, 0)
+        x1 = min(max(m[0] + m[2] for m in marks) + margin, img.size[0])
+        y1 = min(max(m[1] + m[3] for m in marks) + margin, img.size[1])
+        if x1 > x0 and y1 > y0:
+            img = img.crop((x0, y0, x1, y1))
+    out = io.BytesIO()
+    img.save(out, 'PNG')
+    return out.getvalue()
+
+
+class ShotWriter(object):
+    """Background writer of screenshot files
+
+        Screenshots are queued as base64 data, then decoded and written by
+        a worker thread, so that steps do not wait for disk I/O. A frame
+        identical to the previous one is not encoded and written again, but
+        linked (or copied) from that previous file.
+
+        If not `threaded` , shots are written immediately instead.
+    """
+    _log = logging.getLogger('behave.site.shots')
+
+    def __init__(self, maxsize=8, threaded=True):
+        self._queue = queue.Queue(maxsize=maxsize)
+        self._last_hash = None
+        self._last_fname = None
+        self.num_written = 0
+        self.num_dups = 0
+        self._thread = None
+        if threaded:
+            self._thread = threading.Thread(target=self._run, name='ShotWriter')
+            self._thread.daemon = True
+            self._thread.start()
+
+    def put(self, fname, b64data, marks=None, crop=False):
+        """Queue `b64data` to be written as `fname` , blocks if queue is full
+
+            :param marks: rectangles to highlight, see `draw_marks()`
+        """
+        if self._thread is None:
+            self.write(fname, b64data, marks, crop)
+        else:
+            self._queue.put((fname, b64data, marks, crop))
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            try:
+                if item is None:
+                    return
+                self.write(*item)
+            except Exception as e:
+                self._log.warning("Could not write screenshot %s: %s", item[0], e)
+            finally:
+                self._queue.task_done()
+
+    def write(self, fname, b64data, marks=None, crop=False):
+        """Decode and write one shot (synchronously), unless it is a duplicate
+        """
+        if not isinstance(b64data, bytes):
+            b64data = b64data.encode('ascii')
+        digest = hashlib.sha1(b64data)
+        if marks:
+            digest.update(repr((marks, crop)).encode('ascii'))
+        digest = digest.hexdigest()
+        if digest == self._last_hash:
+            self.num_dups += 1
+            self._log.info("Screenshot %s is identical to %s, linking to it",
+                           os.path.basename(fname), os.path.basename(self._last_fname))
+            try:
+                os.link(self._last_fname, fname)
+            except (AttributeError, OSError):
+                shutil.copyfile(self._last_fname, fname)
+            return
+        data = base64.b64decode(b64data)
+        if marks:
+            data = draw_marks(data, marks, crop=crop)
+        with open(fname, 'wb') as fp:
+            fp.write(data)
+        self._last_hash = digest
+        self._last_fname = fname
+        self.num_written += 1
+
+    def flush(self):
+        """Wait until all queued shots are written
+        """
+        self._queue.join()
+
+    def close(self):
+        """Flush and stop the worker thread
+        """
+        if self._thread is not None and self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
 
 
 class Camera(object):
@@ -21,25 +148,77 @@ class Camera(object):
         wants a screenshot, or the hooks implicitly catching some failure.
     """
     _log = logging.getLogger('behave.site')
-    highlight_js = '''
-        var highlight = document.createElement('div');
+    highlight_js = Script.get('''
+        let r = arguments[0];
+        let highlight = document.createElement('div');
         highlight.setAttribute('style',
-            'border: {border}; ' +
+            'border: ' + r.border + '; ' +
             'border-radius: 1px; ' +
-            'background-color: {color}; ' +
+            'background-color: ' + r.color + '; ' +
             'z-index: 9999; ' +
             'position: absolute; ' +
-            'left: {x}px; top: {y}px; ' +
-            'width: {width}px; height: {height}px;');
+            'left: ' + r.x + 'px; top: ' + r.y + 'px; ' +
+            'width: ' + r.width + 'px; height: ' + r.height + 'px;');
         document.body.appendChild(highlight);
         return highlight;
-        '''
+        ''')
+    remove_js = Script.get('arguments[0].remove()')
+    remove_js_ie = Script.get('arguments[0].parentNode.removeChild(arguments[0])')
+
+    rects_js = Script.get('''
+        let elems = arguments[0], ret = [];
+        if (arguments[1] && elems.length) {
+            let r = elems[0].getBoundingClientRect();
+            if (r.bottom < 0 || r.top > window.innerHeight
+                    || r.right < 0 || r.left > window.innerWidth) {
+                elems[0].scrollIntoView({block: 'center', inline: 'center'});
+            }
+        }
+        for (let i = 0; i < elems.length; i++) {
+            let r = elems[i].getBoundingClientRect();
+            ret.push({x: r.left, y: r.top, width: r.width, height: r.height});
+        }
+        return [ret, window.devicePixelRatio || 1];
+        ''')
+    highlights_js = Script.get('''
+        let ret = [];
+        for (let i = 0; i < arguments[0].length; i++) {
+            let r = arguments[0][i];
+            let highlight = document.createElement('div');
+            highlight.setAttribute('style',
+                'border: ' + arguments[1] + '; ' +
+                'border-radius: 1px; ' +
+                'background-color: ' + arguments[2] + '; ' +
+                'z-index: 9999; ' +
+                'position: fixed; ' +
+                'left: ' + r.x + 'px; top: ' + r.y + 'px; ' +
+                'width: ' + r.width + 'px; height: ' + r.height + 'px;');
+            document.body.appendChild(highlight);
+            ret.push(highlight);
+        }
+        return ret;
+        ''')
+    remove_all_js = Script.get('''
+        for (let i = 0; i < arguments[0].length; i++) {
+            let e = arguments[0][i];
+            if (e.parentNode) { e.parentNode.removeChild(e); }
+        }
+        ''')
 
-    def __init__(self, base_dir='.'):
+    def __init__(self, base_dir='.', async_write=True):
         self.count = 0
         self.base_dir = os.path.abspath(base_dir)
         if not os.path.isdir(self.base_dir):
             os.makedirs(self.base_dir)
+        self._writer = ShotWriter(threaded=async_write)
+
+    def flush(self):
+        """Ensure all screenshots taken so far are written to disk
+        """
+        self._writer.flush()
+
+    def close(self):
+        self._writer.close()
 
     _name_pattern = 'shot{mode}-{pid}-{num}-{timestamp}.png'
 
@@ -63,7 +242,56 @@ class Camera(object):
         """
         fname = self._make_name(mode)
         self._log.warning("Taking screenshot to \"%s\"", fname)
-        context.browser.get_screenshot_as_file(os.path.join(self.base_dir, fname))
+        self._writer.put(os.path.join(self.base_dir, fname),
+                         context.browser.get_screenshot_as_base64())
+
+    def highlight_shot(self, context, webelems, mode='highlight', crop=False,
+                       color=None, border=None):
+        """Capture the browser viewport, with many elements highlighted
+
+            Rectangles of all `webelems` are fetched in one script, then
+            drawn locally over a single screenshot (needs Pillow). Without
+            Pillow, highlights are placed in the DOM around that screenshot.
+
+            :param webelems: list of WebElements, `None` items are skipped
+            :param crop: keep only the area around the elements
+        """
+        webdriver = context.browser
+        webelems = [w for w in webelems if w is not None]
+        rects = []
+        ratio = 1
+        if webelems:
+            try:
+                rects, ratio = self.rects_js.run(webdriver, webelems, len(webelems) == 1)
+            except WebDriverException as e:
+                self._log.info("Could not locate elements to highlight: %s", e)
+        rects = [self._grow_rect(r) for r in rects]
+
+        fname = os.path.join(self.base_dir, self._make_name(mode))
+        self._log.warning("Taking screenshot to \"%s\"", os.path.basename(fname))
+        if Image is not None:
+            marks = [tuple(int(round(r[k] * ratio)) for k in ('x', 'y', 'width', 'height'))
+                     for r in rects]
+            self._writer.put(fname, webdriver.get_screenshot_as_base64(),
+                             marks=marks, crop=crop)
+            return
+
+        highlights = None
+        if rects:
+            try:
+                highlights = self.highlights_js.run(webdriver, rects,
+                                                    border or '2px solid red',
+                                                    color or 'rgba(255, 64, 64, 0.3)')
+            except WebDriverException as e:
+                self._log.info("Could not highlight: %s", e)
+        try:
+            self._writer.put(fname, webdriver.get_screenshot_as_base64())
+        finally:
+            if highlights:
+                try:
+                    self.remove_all_js.run(webdriver, highlights)
+                except WebDriverException as e:
+                    self._log.info("Could not remove highlights: %s", e)
 
     def snap_success(self, context, *args):
         if args and getattr(args[0], 'status', False) == Status.passed:
@@ -80,6 +308,22 @@ class Camera(object):
 
         return rect
 
+    def _grow_rect(self, rect):
+        """Grow the rectangle to least 30x30 or +2px than original
+        """
+        rect = dict(rect)
+        dw = 30 - rect['width']
+        dh = 30 - rect['height']
+        if dw < 2:
+            dw = 2
+        if dh < 2:
+            dh = 2
+        rect['x'] -= dw // 2
+        rect['y'] -= dh // 2
+        rect['width'] += dw
+        rect['height'] += dh
+        return rect
+
     @contextmanager
     def highlight_element(self, context, component=None, webelem=None,
                           color=None, border=None):
@@ -105,23 +349,11 @@ class Camera(object):
         try:
             webdriver = webelem.parent   # safer than using 'context.webdriver'
             ActionChains(webdriver).move_to_element(webelem).perform()
-            rect = self._get_elem_rect(webelem)
-
-            # grow the rectangle to least 30x30 or +2px than original
-            dw = 30 - rect['width']
-            dh = 30 - rect['height']
-            if dw < 2:
-                dw = 2
-            if dh < 2:
-                dh = 2
-            rect['x'] -= dw // 2
-            rect['y'] -= dh // 2
-            rect['width'] += dw
-            rect['height'] += dh
+            rect = self._grow_rect(self._get_elem_rect(webelem))
             rect['border'] = border or '2px solid red'
             rect['color'] = color or 'rgba(255, 64, 64, 0.3)'
 
-            highlight = webdriver.execute_script(self.highlight_js.format(**rect))
+            highlight = self.highlight_js.run(webdriver, rect)
         except AttributeError as e:
             pass
         except Exception as e:
@@ -133,10 +365,9 @@ class Camera(object):
             if highlight is not None:
                 try:
                     if webdriver.name == 'internet explorer':
-                        js = 'arguments[0].parentNode.removeChild(arguments[0])'
+                        self.remove_js_ie.run(webdriver, highlight)
                     else:
-                        js = 'arguments[0].remove()'
-                    webdriver.execute_script(js, highlight)
+                        self.remove_js.run(webdriver, highlight)
                 except Exception as e:
                     self._log.info("Could not remove highlight: %s", e)
 
@@ -153,8 +384,9 @@ class Camera(object):
         except AttributeError:
             pass
 
-        with self.highlight_element(context, failed_comp, failed_elem):
-            self.take_shot(context, 'failure')
+        if failed_elem is None and failed_comp is not None:
+            failed_elem = getattr(failed_comp, '_remote', None)
+        self.highlight_shot(context, [failed_elem], 'failure')
 
     def capture_missing_elem(self, context, parent, missing_path):
         """Screenshot of browser when some element is missing
@@ -163,8 +395,12 @@ class Camera(object):
             :param parent: selenium.WebElement under which other was not found
             :param missing_path: string of XPath missing
         """
-        with self.highlight_element(context, webelem=parent):
-            self.take_shot(context, 'missing-elem')
+        self.highlight_shot(context, [parent], 'missing-elem')
+
+    def capture_missing_elems(self, context, parents):
+        """Single screenshot, marking all elements under which others are missing
+        """
+        self.highlight_shot(context, parents, 'missing-elems')
 
 
 # eof
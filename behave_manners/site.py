@@ -4,6 +4,7 @@
 
 from __future__ import absolute_import, print_function
 import errno
+import json
 import logging
 import os
 import os.path
@@ -29,7 +30,7 @@ def _noop_fn(context, *args):
     pass
 
 
-seconds_re = re.compile(r'([1-9]\d+)(m?)s(?:ec)?$')
+seconds_re = re.compile(r'([1-9]\d*)(m?)s(?:ec)?$')
 
 
 def current_context():
@@ -92,24 +93,33 @@ class SiteContext(object):
         self.events.push()
         context.add_cleanup(self.__cleanup_site, context)
         self._collection = None
-        self.output_dir = '.'
+        self.output_dir = self._output_path(config.get('output', {}).get('dir', '.'),
+                                            context)
         self.tempdir = None
         if 'output' in config:
             if 'dir' in config['output']:
-                self.output_dir = config['output']['dir']\
-                        .format(pid=os.getpid(), timestamp=int(time.time()),
-                                userdata=context.config.userdata)
                 self._log.info("Storing all output under: %s", self.output_dir)
             if 'tempdir' in config['output']:
-                self.tempdir = config['output']['tempdir']\
-                        .format(pid=os.getpid(), timestamp=int(time.time()),
-                                userdata=context.config.userdata)
+                self.tempdir = self._output_path(config['output']['tempdir'], context)
                 self._log.debug("Using temporary dir: %s", self.output_dir)
                 self.tempdir = os.path.abspath(self.tempdir)
                 if os.path.exists(self.tempdir):
                     raise IOError(errno.EEXIST, "Temporary directory already exists: %s" % self.tempdir)
                 os.makedirs(self.tempdir)
 
+    def _output_path(self, tmpl, context):
+        """Format output folder template, like `out-{pid}`
+
+            Under `behave-parallel` , a template without `{pid}` gets the
+            worker name appended, to keep workers apart.
+        """
+        ret = tmpl.format(pid=os.getpid(), timestamp=int(time.time()),
+                          userdata=context.config.userdata)
+        worker = os.environ.get('BEHAVE_MANNERS_WORKER')
+        if worker and '{pid}' not in tmpl:
+            ret = os.path.join(ret, worker)
+        return ret
+
     def __setup_hook(self, htime, hevent, context):
         hkey = htime + '_' + hevent
         rhooks = context._runner.hooks
@@ -219,6 +229,7 @@ class WebContext(SiteContext):
                     }
 
     fourOfours = ('/favicon.ico',)  # paths where a 404 is expected
+    _log_decoders = {}
 
 
     def __init__(self, context, config=None):
@@ -232,6 +243,59 @@ class WebContext(SiteContext):
         self.events.push()
         self._config.setdefault('browser', {})
         self._implicit_sec = 0
+        self._network_idle = None
+        self._timing_store = None
+        self._browser_pool = None
+        self._session_states = {}
+        self._run_id = '%d-%d' % (os.getpid(), int(time.time() * 1000))
+        self._attached = None
+        self._warned_attach_reset = False
+        self._url_blocker = None
+        self._last_page_url = (None, None)   # url and page at last update
+        self._pending_state = None
+        # fetch browser logs after each 'step' or only at end of 'scenario'
+        # (and failed steps)
+        self._log_collect = self._config['browser'].get('collect_logs', 'scenario')
+        self._log_combined = {}
+        adaptive = self._config['browser'].get('adaptive_timeouts', False)
+        if adaptive:
+            from .timings import TimingStore
+            if not isinstance(adaptive, dict):
+                adaptive = {}
+            else:
+                adaptive = adaptive.copy()
+            fname = os.path.join(self.output_dir, adaptive.pop('file', 'timings.json'))
+            self._timing_store = TimingStore(fname, **adaptive)
+            context.add_cleanup(self._timing_store.save)
+        self._fast_launch = None
+        fast_launch = self._config['browser'].get('fast_launch', False)
+        if fast_launch:
+            from .fast_launch import ProfileTemplate
+            if not isinstance(fast_launch, dict):
+                fast_launch = {}
+            base_dir = os.path.join(self.tempdir or self.output_dir, 'profiles')
+            template = fast_launch.get('template', os.path.join(base_dir, 'template'))
+            self._fast_launch = ProfileTemplate(template, base_dir=base_dir)
+            # after all browsers have quit
+            context.add_cleanup(self._fast_launch.close)
+        self._transport = None
+        self._command_stats = None
+        transport = self._config['browser'].get('transport', False)
+        if transport not in (False, None):
+            if not isinstance(transport, dict):
+                transport = {}
+            else:
+                transport = transport.copy()
+            if transport.pop('stats', True):
+                from .transport import CommandStats
+                self._command_stats = CommandStats()
+                context.add_cleanup(self._command_stats.report)
+            transport['stats'] = self._command_stats
+            self._transport = transport
+            from .transport import close_pools
+            # after pooled browsers have quit
+            context.add_cleanup(close_pools)
+        context.add_cleanup(self._close_pool)
         context.add_cleanup(self.events.pop)
 
     def _setup_downloads(self, context):
@@ -250,7 +314,10 @@ class WebContext(SiteContext):
                     if not os.path.exists(download_dir):
                         os.makedirs(download_dir)
                     context.download_dir = download_dir
-                context.downloads = DownloadManager(context.download_dir)
+                context.downloads = DownloadManager(
+                        context.download_dir, engine=browser_opts.get('engine'),
+                        watch=browser_opts['downloads'].get('watch', True))
+                context.add_cleanup(context.downloads.close)
                 return download_dir
         return None
 
@@ -264,21 +331,54 @@ class WebContext(SiteContext):
         caps['take_snapshot'] = 'true'
 
         dwdir = self._setup_downloads(context)
-        context.browser = self._launch_browser2(caps, download_dir=dwdir)
-        context.add_cleanup(context.browser.quit)
+        if 'native_locators' in browser_opts:
+            from .pagelems.lookups import LocatorCompiler
+            LocatorCompiler.configure(enabled=browser_opts['native_locators'])
+        pool_opts = browser_opts.get('pool')
+        attached = None
+        if browser_opts.get('attach'):
+            attached = self._attach_browser(browser_opts['attach'])
+        if attached is not None:
+            # long-lived browser, never quit by this run, reset for next scenario
+            context.browser = attached
+            context.add_cleanup(self._reset_attached, attached)
+        elif pool_opts and browser_opts.get('launch_on') == 'scenario':
+            if self._browser_pool is None:
+                from .browser_pool import BrowserPool
+                if not isinstance(pool_opts, dict):
+                    pool_opts = {'size': int(pool_opts)}
+                self._browser_pool = BrowserPool(
+                        lambda: self._timed_launch(caps, dwdir),
+                        **pool_opts)
+            context.browser = self._browser_pool.acquire()
+            context.add_cleanup(self._browser_pool.release, context.browser)
+        else:
+            context.browser = self._timed_launch(caps, dwdir)
+            context.add_cleanup(context.browser.quit)
 
         if browser_opts.get('implicit_wait'):
-            m = seconds_re.match(browser_opts['implicit_wait'])
-            if not m:
-                raise ValueError("Invalid implicit wait: %s" % browser_opts['implicit_wait'])
-            self._implicit_sec = float(int(m.group(1)))
-            if not m.group(2):
-                pass
-            elif m.group(2) == 'm':
-                self._implicit_sec /= 1000.0
-            else:
-                raise ValueError("Unknown multiplier: %s" % m.group(2))
+            self._implicit_sec = self._decode_seconds(browser_opts['implicit_wait'],
+                                                      'implicit wait')
             context.browser.implicitly_wait(self._implicit_sec)
+            from .pagelems.lookups import ImplicitWait
+            iwait = ImplicitWait.register(context.browser, self._implicit_sec)
+            if iwait is not None:
+                context.add_cleanup(iwait.report)
+
+        if browser_opts.get('network_idle'):
+            if self._network_idle is None:
+                from .pagelems.scopes import NetworkIdle
+                self._network_idle = NetworkIdle(
+                        self._decode_seconds(browser_opts['network_idle'], 'network idle'))
+            # once per session, recycled browsers have it on new documents
+            self._network_idle.install(context.browser)
+
+        if browser_opts.get('block_urls') or browser_opts.get('block_resource_types'):
+            if self._url_blocker is None:
+                from .url_blocking import URLBlocker
+                self._url_blocker = URLBlocker(browser_opts.get('block_urls', ()),
+                                               browser_opts.get('block_resource_types', ()))
+            self._url_blocker.ensure(context.browser)
 
         if browser_opts.get('startup_url'):
             url = browser_opts['startup_url']
@@ -288,10 +388,105 @@ class WebContext(SiteContext):
                 url = self.base_url + url
             context.browser.get(url)
 
+    def _attach_browser(self, session_file):
+        """Attach to the browser session saved in `session_file`
+
+            Such a session is kept alive by `behave-run-browser` .
+
+            :return: the browser, or None if that session is not alive
+        """
+        if self._attached is not None:
+            return self._attached
+        from .dpo_validator import ExistingRemote
+        session_file = os.path.expanduser(session_file)
+        try:
+            with open(session_file, 'rt') as fp:
+                sdata = json.load(fp)
+            browser = ExistingRemote(command_executor=sdata['url'],
+                                     session_id=sdata['session'],
+                                     saved_capabilities=sdata.get('capabilities', {}),
+                                     saved_w3c=sdata.get('w3c', None),
+                                     transport=self._attach_transport(sdata),
+                                     keep_alive=sdata.get('keep_alive', True))
+            browser.current_url    # validate that session responds
+            if browser.capabilities.get('browserName') == 'chrome':
+                self._add_chromium_commands(browser)
+        except IOError as e:
+            self._log.info("No browser session to attach to: %s", e)
+            return None
+        except Exception as e:
+            self._log.warning("Cannot attach to browser session of %s: %s", session_file, e)
+            return None
+
+        self._log.info("Attached to browser session %s", sdata['session'])
+        self._attached = browser
+        return browser
+
+    def _attach_transport(self, sdata):
+        if self._transport is None:
+            return False
+        ret = self._transport.copy()
+        if sdata.get('unix_socket'):
+            ret['unix_socket'] = sdata['unix_socket']
+        return ret
+
+    def _reset_attached(self, browser):
+        """Reset attached browser after a scenario, like pooled ones are
+
+            If that fails, the session is attached (and checked) again for
+            the next scenario.
+        """
+        from .browser_pool import BrowserPool
+        if not BrowserPool.can_reset(browser) and not self._warned_attach_reset:
+            self._log.warning("Attached browser can only be reset for its current origin")
+            self._warned_attach_reset = True
+        try:
+            BrowserPool.reset_browser(browser)
+        except Exception as e:
+            self._log.warning("Could not reset attached browser: %s", e)
+            self._attached = None
+
+    def _close_pool(self):
+        if self._browser_pool is not None:
+            self._browser_pool.close()
+            self._browser_pool = None
+
+    def _timed_launch(self, caps, download_dir):
+        """Launch browser through `_launch_browser2()` , log the time it took
+        """
+        profile = 'default'
+        if self._fast_launch is not None:
+            self._fast_launch.prepare(lambda: self._launch_browser2(caps, download_dir))
+            profile = 'templated' if self._fast_launch.warm else 'cold'
+        t0 = time.time()
+        browser = self._launch_browser2(caps, download_dir=download_dir)
+        if self._transport is not None:
+            from .transport import PooledConnection
+            PooledConnection.install(browser, **self._transport)
+        self._log.info("Launched %s browser in %.2fsec, %s profile",
+                       self._config['browser'].get('engine', 'generic'),
+                       time.time() - t0, profile)
+        return browser
+
     @abstractmethod
     def _launch_browser2(self, caps):
         raise NotImplementedError('Unsupported engine')
 
+    def _decode_seconds(self, value, what='time'):
+        """Decode "500ms" or "10s" like value into float seconds
+        """
+        m = seconds_re.match(value)
+        if not m:
+            raise ValueError("Invalid %s: %s" % (what, value))
+        secs = float(int(m.group(1)))
+        if not m.group(2):
+            pass
+        elif m.group(2) == 'm':
+            secs /= 1000.0
+        else:
+            raise ValueError("Unknown multiplier: %s" % m.group(2))
+        return secs
+
     _pixel_size_re = re.compile(r'(\d+)x(\d+)$')
 
     def _decode_win_size(self, size_str):
@@ -315,12 +510,16 @@ class WebContext(SiteContext):
             self.launch_browser(context)
 
     def _event_before_scenario(self, context, scenario):
+        self._pending_state = None
         browser_launch = self._config['browser'].get('launch_on', False)
         if browser_launch == 'scenario' and 'serial' not in scenario.feature.tags:
             self.launch_browser(context)
         if hasattr(context, 'downloads'):
             self._log.debug("Resetting downloads")
             context.downloads.reset()
+        if self._log_collect != 'step':
+            # runs before the browser (if per-scenario) is closed
+            context.add_cleanup(self._drain_logs, context)
 
     def _event_after_step(self, context, step):
         from selenium.webdriver.common.alert import Alert
@@ -348,6 +547,20 @@ class WebContext(SiteContext):
             self._log.warning("Step: \"%s\" failed.\n%s%s", step.name,
                               msg_url, step.exception or "no exception")
             self.events.after_step_failed(context, step)
+        try:
+            # steps shall not see implicit wait suspended by optional lookups
+            from .pagelems.lookups import restore_wait
+            restore_wait(context.browser)
+        except Exception as e:
+            self._log.debug("Could not restore implicit wait: %s", e)
+        if step.status == Status.failed or self._log_collect == 'step':
+            self._drain_logs(context)
+
+    def _drain_logs(self, context):
+        """Fetch and process pending browser logs, never raise
+        """
+        if getattr(context, 'browser', None) is None:
+            return
         try:
             self.process_logs(context)
         except urllib3.exceptions.RequestError as e:
@@ -383,20 +596,56 @@ class WebContext(SiteContext):
                 rec.created = ct
                 rec.msecs = (ct - int(ct)) * 1000
 
-                patterns = self._log_decoders.get(log_name, {}).get(level, [])
-                for pat in patterns:
-                    # decode fields of that message into extra log-record attributes
-                    m = pat.match(entry['message'])
+                # decode fields of that message into extra log-record attributes
+                for decoder in self._get_log_decoders(log_name, level):
+                    m = decoder.match(entry['message'])
                     if m:
-                        rec.__dict__.update(m.groupdict())
+                        prefix = '_%s_' % m.lastgroup
+                        rec.__dict__.update((k[len(prefix):], v)
+                                            for k, v in m.groupdict().items()
+                                            if k.startswith(prefix))
+                        break
                 yield rec
 
+    _group_name_re = re.compile(r'\(\?P([<=])(\w+)')
+
+    def _get_log_decoders(self, log_name, level):
+        """Return regexes that combine the decoder patterns of `log_name`
+
+            Each pattern becomes an alternative, in order, wrapped in
+            a group named like `a0` . Its own groups are renamed like
+            `_a0_url` , since names cannot repeat across alternatives.
+            Consecutive patterns are only combined while their flags are
+            the same, so usually there is a single regex.
+        """
+        key = (log_name, level)
+        try:
+            return self._log_combined[key]
+        except KeyError:
+            pass
+        patterns = self._log_decoders.get(log_name, {}).get(level, [])
+        combined = []
+        alts = []
+        for i, pat in enumerate(patterns):
+            if alts and pat.flags != patterns[i - 1].flags:
+                combined.append(re.compile('|'.join(alts), patterns[i - 1].flags))
+                alts = []
+            src = self._group_name_re.sub(r'(?P\1_a%d_\2' % i, pat.pattern)
+            # close the alternative group *after* inner groups, for `lastgroup`
+            alts.append('(?P<a%d>%s)' % (i, src))
+        if alts:
+            combined.append(re.compile('|'.join(alts), patterns[-1].flags))
+        self._log_combined[key] = combined
+        return combined
+
     def _consume_log(self, rec):
         """Handle some log record emitted by the browser
 
             Override this to affect state of the browser according to log
             messages received.
         """
+        if self._url_blocker is not None and self._url_blocker.consume(rec):
+            return
         rec.name = 'behave.site.' + rec.name
         log = logging.getLogger(rec.name)
         log.handle(rec)
@@ -410,10 +659,24 @@ class WebContext(SiteContext):
             return context.pagelems_scope
         except AttributeError:
             new_scope = self._collection.get_root_scope()
+            if self._timing_store is not None:
+                new_scope.timing_store = self._timing_store
+            if self._network_idle is not None:
+                self._network_idle.register(new_scope)
             if do_set:
                 context.pagelems_scope = new_scope
             return new_scope
 
+    def _get_page_root(self, context, page, scp, title=None):
+        """Create `PageProxy` of `page` , on the browser, under scope `scp`
+        """
+        cur_page = page.get_root(context.browser, parent_scope=scp)
+        if self._timing_store is not None:
+            if title is None:
+                title = self._collection.get_title(page)
+            cur_page._scope.timing_page = title
+        return cur_page
+
     def navigate_by_title(self, context, title, **kwargs):
         """Open a URL, by pretty title
         """
@@ -435,10 +698,22 @@ class WebContext(SiteContext):
             It may not always work: some race conditions with pending scripts
             also trying to set the location may contend with this one.
             So, perform a few retries to do that.
+
+            Completion is awaited through page events (`load` , or same
+            document changes), rather than by polling the URL.
         """
         if soft is None:
             soft = self._config['browser'].get('soft_change', False)
 
+        if self._pending_state is not None:
+            self._apply_session_state(context, self._pending_state)
+            self._pending_state = None
+            force = True
+        if self._url_blocker is not None:
+            # also covers windows opened since last load
+            self._url_blocker.ensure(context.browser)
+            self._url_blocker.start_page()
+
         if force:
             cur_url = False
         else:
@@ -463,24 +738,153 @@ class WebContext(SiteContext):
         for x in range(self._config['browser'].get('change_retries', 3)):
             if cur_url == url:
                 break
+            old_url = cur_url
             if soft:
-                r = context.browser.execute_script('window.location = arguments[0];', url)
+                context.browser.execute_script(self._nav_soft_js, url)
+                cur_url = self._settle_navigation(context.browser)
             else:
-                r = context.browser.get(url)
-            self._log.debug("Load url response: %r", r)
-            self.process_logs(context, consumer=consume_message)
-            old_url = cur_url
-            cur_url = context.browser.current_url
+                # returns after the 'load' event of the new document
+                context.browser.get(url)
+                cur_url = context.browser.current_url
             if cur_url != old_url:
                 # something changed, may still not be `url`
                 break
-            time.sleep(0.5)
+        self.process_logs(context, consumer=consume_message)
 
+        if self._url_blocker is not None and self._url_blocker.num_blocked:
+            self._log.info("Blocked %d requests loading %s",
+                           self._url_blocker.num_blocked, url)
+        if self._network_idle is not None:
+            self._network_idle.ensure(context.browser)
         scp = self._root_scope(context)
-        context.cur_page = page.get_root(context.browser, parent_scope=scp)
+        context.cur_page = self._get_page_root(context, page, scp)
         if wait:
             context.cur_page.wait_all(wait)
 
+    # mark the document being left, so that settling waits for the next one
+    _nav_soft_js = '''
+        window.__manners_leaving = window.location.href;
+        window.location = arguments[0];
+        '''
+
+    _nav_settle_js = '''
+        let done = arguments[arguments.length - 1];
+        function ret() {
+            window.__manners_leaving = null;
+            done(window.location.href);
+        }
+        if (window.__manners_leaving && window.location.href == window.__manners_leaving) {
+            // navigation has not committed yet: this script will end with the
+            // document, unless the change is within it or gets cancelled
+            window.addEventListener('hashchange', ret);
+            window.addEventListener('popstate', ret);
+            setTimeout(ret, arguments[0]);
+        } else if (document.readyState == 'complete') {
+            ret();
+        } else {
+            window.addEventListener('load', ret);
+        }
+        '''
+
+    def _settle_navigation(self, browser):
+        """Wait until a navigation has committed and loaded
+
+            :return: the URL of the browser then
+        """
+        from .pagelems.scopes import WaitScope
+        from selenium.common.exceptions import JavascriptException, TimeoutException
+        timeout = self._config['browser'].get('navigation_timeout', 30)
+        for x in range(5):
+            try:
+                with WaitScope._script_timeout(browser, timeout):
+                    return browser.execute_async_script(self._nav_settle_js, 2000)
+            except JavascriptException as e:
+                # the document was unloaded while waiting in it
+                self._log.debug("Navigation committed: %s", e)
+            except TimeoutException as e:
+                self._log.warning("Navigation did not settle: %s", e)
+                break
+        return browser.current_url
+
+    _get_storage_js = '''
+        function dump(storage) {
+            let ret = {};
+            for (let i = 0; i < storage.length; i++) {
+                ret[storage.key(i)] = storage.getItem(storage.key(i));
+            }
+            return ret;
+        }
+        return {origin: window.location.origin,
+                local: dump(window.localStorage),
+                session: dump(window.sessionStorage)};
+        '''
+
+    _set_storage_js = '''
+        window.localStorage.clear();
+        window.sessionStorage.clear();
+        for (let k in arguments[0]) { window.localStorage.setItem(k, arguments[0][k]); }
+        for (let k in arguments[1]) { window.sessionStorage.setItem(k, arguments[1][k]); }
+        '''
+
+    def _session_state_file(self, name):
+        """Path of state file `name` , under the run's `tempdir` , or None
+        """
+        if not self.tempdir:
+            return None
+        dname = os.path.join(self.tempdir, 'session-states')
+        if not os.path.isdir(dname):
+            os.makedirs(dname)
+        return os.path.join(dname, re.sub(r'[^\w.-]', '_', name) + '.json')
+
+    def save_session_state(self, context, name):
+        """Capture cookies and storage of the current page's origin, as `name`
+
+            States are kept in memory, and in the `tempdir` of this run.
+        """
+        state = context.browser.execute_script(self._get_storage_js)
+        state['cookies'] = context.browser.get_cookies()
+        state['run'] = self._run_id
+        self._session_states[name] = state
+        fname = self._session_state_file(name)
+        if fname is not None:
+            with open(fname, 'wt') as fp:
+                json.dump(state, fp)
+        self._log.debug("Saved session state \"%s\" of %s", name, state['origin'])
+
+    def restore_session_state(self, context, name):
+        """Restore session state `name` into the browser, on next navigation
+
+            :return: False if no such state has been saved by this run
+        """
+        state = self._session_states.get(name)
+        if state is None:
+            fname = self._session_state_file(name)
+            if fname is None or not os.path.exists(fname):
+                return False
+            with open(fname, 'rt') as fp:
+                state = json.load(fp)
+        if state.get('run') != self._run_id:
+            self._log.warning("Not restoring session state \"%s\", saved by another run",
+                              name)
+            return False
+        self._session_states[name] = state
+        self._pending_state = state
+        return True
+
+    def _apply_session_state(self, context, state):
+        browser = context.browser
+        origin = state['origin']
+        if not browser.current_url.startswith(origin + '/'):
+            # cookies and storage can only be set within that origin
+            browser.get(origin + '/favicon.ico')
+        browser.delete_all_cookies()
+        for cookie in state['cookies']:
+            cookie = dict(cookie)
+            if 'expiry' in cookie:
+                cookie['expiry'] = int(cookie['expiry'])
+            browser.add_cookie(cookie)
+        browser.execute_script(self._set_storage_js, state['local'], state['session'])
+
     def get_cur_title(self, context):
         """Return pretty title of page currently loaded on the browser
         """
@@ -543,7 +947,7 @@ class WebContext(SiteContext):
         elif cur_page is None and page is not None:
             # create new Proxy
             scp = self._root_scope(context, do_set=False)
-            cur_page = page.get_root(context.browser, parent_scope=scp)
+            cur_page = self._get_page_root(context, page, scp, title)
             cur_page.wait_all('medium')
         elif cur_page is None and page is None:
             raise AssertionError("No current page found, no resolution from URL either")
@@ -577,7 +981,11 @@ class WebContext(SiteContext):
     def update_cur_page(self, context):
         """Update `context.cur_page` when URL may have changed
         """
-        cur_url = context.browser.current_url
+        cur_url = full_url = context.browser.current_url
+        cur_page = getattr(context, 'cur_page', None)
+        if cur_page is not None and full_url == self._last_page_url[0] \
+                and cur_page is self._last_page_url[1]:
+            return  # URL unchanged since last check
         if not cur_url.startswith(self.base_url):
             raise AssertionError("Browser at %s, not under base url" % cur_url)
         cur_url = cur_url[len(self.base_url):].split('?', 1)[0]
@@ -588,9 +996,9 @@ class WebContext(SiteContext):
         except KeyError:
             self._log.warning("Browser is no longer at a known page: %s", cur_url)
             page = None
-        cur_page = getattr(context, 'cur_page', None)
         if cur_page is not None and page is not None:
             if page is cur_page._pagetmpl:
+                self._last_page_url = (full_url, cur_page)
                 return  # still on the same page
 
         if page is None:
@@ -599,8 +1007,9 @@ class WebContext(SiteContext):
 
         self._log.info('Page changed to %s', title or cur_url)
         scp = self._root_scope(context)
-        context.cur_page = page.get_root(context.browser, parent_scope=scp)
+        context.cur_page = self._get_page_root(context, page, scp, title)
         context.cur_page.wait_all('medium')
+        self._last_page_url = (full_url, context.cur_page)
         return title
 
 
@@ -644,6 +1053,11 @@ class ChromeWebContext(SiteContext):
         if 'window' in browser_opts:
             w, h = self._decode_win_size(browser_opts['window'])
             options.add_argument('window-size=%d,%d' % (w, h))
+        if self._fast_launch is not None:
+            from .fast_launch import chrome_fast_flags
+            for flag in chrome_fast_flags:
+                options.add_argument(flag)
+            options.add_argument('user-data-dir=%s' % self._fast_launch.new_profile())
 
         prefs = {}
         if download_dir is not None:
@@ -687,9 +1101,11 @@ class ChromeWebContext(SiteContext):
         except Exception as e:
             self._log.warning("Could not retrieve browser log types: %s", e)
 
-        # add missing support for chrome "send_command"  to selenium webdriver
-        browser.command_executor._commands["send_command"] = \
-                ("POST", '/session/$sessionId/chromium/send_command')
+        self._add_chromium_commands(browser)
+
+        if browser_opts.get('pin_scripts', True):
+            from .pagelems.scripts import Script
+            Script.pin(browser)
 
         if download_dir is not None and browser_opts.get('headless', True):
             params = {'cmd': 'Page.setDownloadBehavior',
@@ -697,6 +1113,14 @@ class ChromeWebContext(SiteContext):
             browser.execute("send_command", params)
         return browser
 
+    @staticmethod
+    def _add_chromium_commands(browser):
+        # add missing support for chrome "send_command"  to selenium webdriver
+        browser.command_executor._commands["send_command"] = \
+                ("POST", '/session/$sessionId/chromium/send_command')
+        browser.command_executor._commands["send_command_and_get_result"] = \
+                ("POST", '/session/$sessionId/chromium/send_command_and_get_result')
+
     def _launch_browser_chrome(self, options, dcaps, **kwargs):
         """Launch the browser with specified options, desired_capabilities
 
@@ -741,15 +1165,30 @@ class FirefoxWebContext(SiteContext):
         if 'binary_location' in browser_opts:
             options.binary_location = browser_opts['binary_location']
         options.headless = browser_opts.get('headless', True)
-        profile = webdriver.FirefoxProfile()
-
+        prefs = {}
         if download_dir is not None:
-            profile.set_preference("browser.download.folderList", 2)
-            profile.set_preference("browser.download.manager.showWhenStarting", False)
-            profile.set_preference("browser.download.dir", download_dir)
-            profile.set_preference("browser.download.loglevel", "Info")
-            profile.set_preference("browser.download.forbid_open_with", True)
-            # profile.set_preference("browser.helperApps.neverAsk.saveToDisk", "application/x-gzip")
+            prefs["browser.download.folderList"] = 2
+            prefs["browser.download.manager.showWhenStarting"] = False
+            prefs["browser.download.dir"] = download_dir
+            prefs["browser.download.loglevel"] = "Info"
+            prefs["browser.download.forbid_open_with"] = True
+            # prefs["browser.helperApps.neverAsk.saveToDisk"] = "application/x-gzip"
+
+        if self._fast_launch is not None:
+            # use profile dir in place, rather than zipping it to geckodriver
+            from .fast_launch import firefox_fast_prefs
+            prefs.update(firefox_fast_prefs)
+            profile = None
+            profile_dir = self._fast_launch.new_profile()
+            with open(os.path.join(profile_dir, 'user.js'), 'wt') as fp:
+                for k, v in prefs.items():
+                    fp.write('user_pref(%s, %s);\n' % (json.dumps(k), json.dumps(v)))
+            options.add_argument('-profile')
+            options.add_argument(profile_dir)
+        else:
+            profile = webdriver.FirefoxProfile()
+            for k, v in prefs.items():
+                profile.set_preference(k, v)
 
         browser = self._launch_browser_ff(profile, options, dcaps,
                                           service_args=browser_opts.get('geckodriver_args', []))
@@ -786,6 +1225,8 @@ class IExploderWebContext(SiteContext):
         dcaps.update(caps)
         if 'binary_location' in browser_opts:
             options.binary_location = browser_opts['binary_location']
+        from .pagelems.lookups import LocatorCompiler
+        LocatorCompiler.configure(use_scope=False)   # no `:scope` in IE
         browser = self._launch_browser_ie(options, dcaps)
         if 'window' in browser_opts:
             w, h = self._decode_win_size(browser_opts['window'])
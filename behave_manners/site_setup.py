@@ -44,7 +44,10 @@ def site_setup(context, config=None, extra_conf=None, loader=None):
         from .screenshots import Camera
         shots_cfg = config['browser']['screenshots']
         shots_dir = os.path.join(context.site.output_dir, shots_cfg.get('dir', '.'))
-        camera = context.site_camera = Camera(base_dir=shots_dir)
+        camera = context.site_camera = Camera(base_dir=shots_dir,
+                                              async_write=shots_cfg.get('async_write', True))
+        # all pending shots must be on disk when the site is done
+        context.add_cleanup(camera.close)
         events = context.site.events
 
         if shots_cfg.get('on_failure', False):
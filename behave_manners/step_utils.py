@@ -1,5 +1,6 @@
 from __future__ import print_function
 #from functools import wraps
+from inspect import getcallargs
 
 
 class _StepImplies(object):
@@ -44,4 +45,50 @@ def implies(step_text):
 
     return _wrap_step
 
+
+class _StepSessionState(object):
+    def __init__(self, step_fn, name_fmt):
+        assert callable(step_fn)
+        self._step_fn = step_fn
+        self._name_fmt = name_fmt
+        self.__name__ = step_fn.__name__
+        self.__doc__ = step_fn.__doc__
+
+    def __call__(self, context, *args, **kwargs):
+        name = self._name_fmt.format(**getcallargs(self._step_fn, context,
+                                                   *args, **kwargs))
+        if context.site.restore_session_state(context, name):
+            return
+        ret = self._step_fn(context, *args, **kwargs)
+        context.site.save_session_state(context, name)
+        return ret
+
+    @property
+    def func_code(self):
+        return self._step_fn.__code__
+
+    @property
+    def __code__(self):
+        return self._step_fn.__code__
+
+
+def session_state(name_fmt):
+    """Run the decorated step once, then restore the browser state it left
+
+        The first time, the step runs (eg. UI clicks to log in) and the
+        cookies and storage are saved under name `name_fmt` , formatted
+        with the step arguments. Next times, that state is restored on
+        the next navigation, instead of running the step::
+
+            @given(u'I am logged in as {user}')
+            @session_state('login-{user}')
+            def login(context, user):
+                ...
+    """
+
+    def _wrap_step(step_fn):
+        return _StepSessionState(step_fn, name_fmt)
+
+    return _wrap_step
+
 #eof
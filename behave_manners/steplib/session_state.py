@@ -0,0 +1,22 @@
+# -*- coding: utf-8 -*
+""" Steps to save and restore browser session state
+
+    State (cookies, localStorage, sessionStorage) is kept by the site
+    context, for the current run only.
+"""
+from __future__ import print_function
+from __future__ import absolute_import
+from behave import given, when
+
+
+@when(u'I save the browser state as "{name}"')
+def _save_session_state(context, name):
+    context.site.save_session_state(context, name)
+
+
+@given(u'the browser state "{name}"')
+def _restore_session_state(context, name):
+    if not context.site.restore_session_state(context, name):
+        raise KeyError("No browser state saved as \"%s\"" % name)
+
+# eof
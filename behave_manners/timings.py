@@ -0,0 +1,137 @@
+# -*- coding: UTF-8 -*-
+""" History of page settle times, for adaptive wait timeouts
+
+    Each successful `WaitScope.wait()` records how long the page took to
+    settle, per page title and named timeout ('short', 'medium' ...).
+    Subsequent runs derive their timeout from a percentile of that history,
+    never exceeding the configured value. A wait that overruns it is given
+    `grace` seconds more, then fails; the time it waited is recorded too,
+    so that the timeout grows on later runs.
+
+    Enable in the site config::
+
+        browser:
+            adaptive_timeouts:
+                file: timings.json      # under output dir
+                percentile: 95
+                factor: 2.0
+                min_samples: 5
+                grace: 1.0
+
+    and use `behave-timings-report <file>` to list the slowest waits.
+"""
+
+from __future__ import absolute_import, division, print_function
+import os
+import json
+import logging
+import argparse
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of numbers
+    """
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    rank = int(round(pct / 100.0 * (len(ordered) - 1)))
+    return ordered[rank]
+
+
+class TimingStore(object):
+    """Persistent record of wait durations, in a JSON file
+
+        Data is kept like `{page: {wait_name: [seconds, ...]}}` , bounded
+        to the latest `max_samples` per key.
+    """
+    logger = logging.getLogger(__name__ + '.TimingStore')
+
+    def __init__(self, fname, percentile=95, factor=2.0, min_samples=5,
+                 max_samples=100, min_budget=0.5, grace=1.0):
+        self.fname = fname
+        self.percentile = percentile
+        self.factor = factor
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.min_budget = min_budget
+        self.grace = grace
+        self._data = {}
+        self._dirty = False
+        self.load()
+
+    def load(self):
+        if not os.path.exists(self.fname):
+            return
+        try:
+            with open(self.fname, 'rt') as fp:
+                self._data = json.load(fp)
+        except ValueError as e:
+            self.logger.warning("Ignoring invalid timings file %s: %s", self.fname, e)
+            self._data = {}
+
+    def save(self):
+        """Write timings back to file, if any have been recorded
+        """
+        if not self._dirty:
+            return
+        dname = os.path.dirname(self.fname)
+        if dname and not os.path.exists(dname):
+            os.makedirs(dname)
+        tmpname = self.fname + '.tmp'
+        with open(tmpname, 'wt') as fp:
+            json.dump(self._data, fp, indent=1, sort_keys=True)
+        os.rename(tmpname, self.fname)
+        self._dirty = False
+
+    def record(self, page, wait_name, secs):
+        samples = self._data.setdefault(page, {}).setdefault(wait_name, [])
+        samples.append(round(secs, 3))
+        del samples[:-self.max_samples]
+        self._dirty = True
+
+    def budget(self, page, wait_name, configured):
+        """Timeout for that wait, derived from history and bounded by `configured`
+        """
+        samples = self._data.get(page, {}).get(wait_name, [])
+        if len(samples) < self.min_samples:
+            return configured
+        ret = max(percentile(samples, self.percentile) * self.factor, self.min_budget)
+        return min(ret, configured)
+
+    def report(self):
+        """Statistics of all waits, slowest first
+
+            :return: list of (page, wait_name, count, median, pctl, max)
+        """
+        ret = []
+        for page, waits in self._data.items():
+            for wait_name, samples in waits.items():
+                if not samples:
+                    continue
+                ret.append((page, wait_name, len(samples), percentile(samples, 50),
+                            percentile(samples, self.percentile), max(samples)))
+        ret.sort(key=lambda r: r[4], reverse=True)
+        return ret
+
+
+def cmdline_main():
+    """Entry point for the timings report
+    """
+    parser = argparse.ArgumentParser(description='List slowest page waits')
+    parser.add_argument('-n', '--num', type=int, default=20,
+                        help="Number of waits to list")
+    parser.add_argument('-p', '--percentile', type=int, default=95)
+    parser.add_argument('fname', help="Timings file, from the output dir")
+
+    args = parser.parse_args()
+    store = TimingStore(args.fname, percentile=args.percentile)
+    print("%-40s %-8s %6s %8s %8s %8s" % ('page', 'wait', 'count', 'median',
+                                          'p%d' % args.percentile, 'max'))
+    for row in store.report()[:args.num]:
+        print("%-40s %-8s %6d %8.2f %8.2f %8.2f" % row)
+
+
+if __name__ == '__main__':
+    cmdline_main()
+
+#eof
@@ -0,0 +1,271 @@
+# -*- coding: UTF-8 -*-
+""" Persistent, pooled HTTP transport for WebDriver commands
+
+    Every WebDriver command (`find_element` , `get_attribute` ...) is an
+    HTTP request to the driver. `PooledConnection` sends those over
+    keep-alive connections, with TCP_NODELAY set, taken from one pool per
+    remote URL that all browsers of the process share. It can also reach
+    the driver through a Unix socket, when one is exposed for it.
+
+    Per-command latencies are recorded, and reported at the end of the run.
+
+    Selenium's own connection handling is kept, unless enabled in the site
+    config (defaults shown)::
+
+        browser:
+            transport:
+                pool_size: 4
+                unix_socket: /run/chromedriver.sock   # optional
+                stats: true
+
+    or just `transport: true` . A command is sent again, on a new connection,
+    only if writing it failed because the driver had dropped the kept-alive
+    connection; never once it has been written.
+"""
+
+from __future__ import absolute_import, division
+import time
+import json
+import errno
+import socket
+import logging
+import threading
+import urllib3
+from urllib3.connection import HTTPConnection
+from urllib3.connectionpool import HTTPConnectionPool
+from urllib3.exceptions import ProtocolError
+from six.moves.urllib.parse import urlparse
+from selenium.webdriver.remote.remote_connection import RemoteConnection
+from selenium.webdriver.remote.errorhandler import ErrorCode
+from selenium.common.exceptions import WebDriverException
+
+from .timings import percentile
+
+
+_send_state = threading.local()
+_unsent_errnos = (errno.EPIPE, errno.ECONNRESET, errno.ECONNABORTED)
+
+socket_options = HTTPConnection.default_socket_options + [
+    (socket.SOL_SOCKET, socket.SO_KEEPALIVE, 1),
+    ]
+if (socket.IPPROTO_TCP, socket.TCP_NODELAY, 1) not in socket_options:
+    socket_options.append((socket.IPPROTO_TCP, socket.TCP_NODELAY, 1))
+
+
+class SendTracking(object):
+    """Connection mixin, flags (per thread) a request that failed while written
+
+        urllib3 swallows such errors and goes on to read a response, so
+        they could not be told apart from the driver dropping a request
+        it had received.
+    """
+    def request(self, *args, **kwargs):
+        try:
+            return super(SendTracking, self).request(*args, **kwargs)
+        except (IOError, OSError) as e:
+            if e.errno in _unsent_errnos:
+                _send_state.failed = True
+            raise
+
+
+class TrackedHTTPConnection(SendTracking, HTTPConnection):
+    pass
+
+
+class TrackedHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = TrackedHTTPConnection
+
+
+class UnixHTTPConnection(SendTracking, HTTPConnection):
+    """HTTP connection over a Unix socket, at `socket_path`
+    """
+    def __init__(self, *args, **kwargs):
+        self.socket_path = kwargs.pop('socket_path')
+        kwargs.pop('socket_options', None)
+        super(UnixHTTPConnection, self).__init__(*args, **kwargs)
+
+    def _new_conn(self):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        if isinstance(self.timeout, (int, float)):
+            sock.settimeout(self.timeout)
+        sock.connect(self.socket_path)
+        return sock
+
+
+class UnixHTTPConnectionPool(HTTPConnectionPool):
+    ConnectionCls = UnixHTTPConnection
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(url, unix_socket=None, pool_size=4, timeout=None):
+    """Return the connection pool for `url` (or `unix_socket`), shared
+
+        Pool size only bounds the idle connections kept; more are opened
+        if that many requests are in flight.
+    """
+    up = urlparse(url)
+    key = (unix_socket or up.netloc, up.scheme)
+    with _pools_lock:
+        pool = _pools.get(key)
+        if pool is None:
+            if unix_socket:
+                pool = UnixHTTPConnectionPool(up.hostname or 'localhost', up.port,
+                                              maxsize=pool_size, timeout=timeout,
+                                              socket_path=unix_socket)
+            elif up.scheme == 'http':
+                pool = TrackedHTTPConnectionPool(up.hostname, up.port, maxsize=pool_size,
+                                                 timeout=timeout,
+                                                 socket_options=socket_options)
+            else:
+                pool = urllib3.connection_from_url(url, maxsize=pool_size,
+                                                   timeout=timeout,
+                                                   socket_options=socket_options)
+            _pools[key] = pool
+    return pool
+
+
+def close_pools():
+    """Close all connections of shared pools
+    """
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+    for pool in pools:
+        pool.close()
+
+
+class CommandStats(object):
+    """Latencies of WebDriver commands, per command name
+
+        Only the latest `max_samples` per command are kept for percentiles,
+        counts and totals cover all of them.
+    """
+    logger = logging.getLogger(__name__ + '.CommandStats')
+
+    def __init__(self, max_samples=1000):
+        self.max_samples = max_samples
+        self._samples = {}
+        self._totals = {}
+        self._lock = threading.Lock()
+
+    def record(self, command, secs):
+        with self._lock:
+            samples = self._samples.setdefault(command, [])
+            samples.append(secs)
+            if len(samples) > self.max_samples:
+                del samples[:-self.max_samples]
+            count, total = self._totals.get(command, (0, 0.0))
+            self._totals[command] = (count + 1, total + secs)
+
+    def summary(self, pct=95):
+        """Return [(command, count, total, p50, p<pct>, max), ...], slowest total first
+        """
+        ret = []
+        with self._lock:
+            for command, samples in self._samples.items():
+                count, total = self._totals[command]
+                ret.append((command, count, total, percentile(samples, 50),
+                            percentile(samples, pct), max(samples)))
+        ret.sort(key=lambda r: r[2], reverse=True)
+        return ret
+
+    def report(self, limit=10):
+        rows = self.summary()
+        if not rows:
+            return
+        self.logger.info("WebDriver commands: %d calls, %.2fsec total",
+                         sum(r[1] for r in rows), sum(r[2] for r in rows))
+        for row in rows[:limit]:
+            self.logger.info("    %-28s %6d calls %8.2fsec  p50 %.1fms  p95 %.1fms  max %.1fms",
+                             row[0], row[1], row[2], row[3] * 1000, row[4] * 1000,
+                             row[5] * 1000)
+
+
+class PooledConnection(RemoteConnection):
+    """Selenium command executor, over shared keep-alive connection pools
+
+        :param remote_server_addr: URL of the driver, as for `RemoteConnection`
+        :param unix_socket: path of socket to reach the driver through,
+                            instead of the host and port of that URL
+        :param stats: `CommandStats` to record latencies into
+    """
+    def __init__(self, remote_server_addr, unix_socket=None, stats=None,
+                 pool_size=4, resolve_ip=False):
+        super(PooledConnection, self).__init__(remote_server_addr, keep_alive=False,
+                                               resolve_ip=resolve_ip)
+        self.keep_alive = True   # only affects the headers we send
+        self.unix_socket = unix_socket
+        self.stats = stats
+        timeout = self._timeout
+        if timeout is socket._GLOBAL_DEFAULT_TIMEOUT:
+            timeout = None
+        self._pool = get_pool(self._url, unix_socket=unix_socket,
+                              pool_size=pool_size, timeout=timeout)
+
+    @classmethod
+    def install(cls, browser, **kwargs):
+        """Replace the command executor of a launched `browser`
+
+            Commands registered on the previous executor are kept.
+        """
+        old = browser.command_executor
+        conn = cls(old._url, **kwargs)
+        conn._commands = old._commands
+        browser.command_executor = conn
+        if old.keep_alive and getattr(old, '_conn', None) is not None:
+            old._conn.clear()
+        return conn
+
+    def execute(self, command, params):
+        if self.stats is None:
+            return super(PooledConnection, self).execute(command, params)
+        t0 = time.time()
+        try:
+            return super(PooledConnection, self).execute(command, params)
+        finally:
+            self.stats.record(command, time.time() - t0)
+
+    def _request(self, method, url, body=None):
+        up = urlparse(url)
+        path = up.path + ('?' + up.query if up.query else '')
+        headers = self.get_remote_connection_headers(up, keep_alive=True)
+        if body and method not in ('POST', 'PUT'):
+            body = None
+        for attempt in (1, 2):
+            _send_state.failed = False
+            try:
+                resp = self._pool.urlopen(
+                        method, path, body=body, headers=headers,
+                        retries=urllib3.Retry(connect=1, read=False, redirect=0),
+                        preload_content=True)
+                break
+            except ProtocolError:
+                if attempt == 2 or not _send_state.failed:
+                    raise
+                # next attempt gets a new connection, this one is discarded
+        status = resp.status
+        data = resp.data.decode('utf-8')
+        if 300 <= status < 304:
+            location = resp.headers.get('location')
+            if not location:
+                raise WebDriverException("Redirect %d from %s %s without a Location"
+                                         % (status, method, url))
+            return self._request('GET', location)
+        if 399 < status <= 500:
+            return {'status': status, 'value': data}
+        if resp.headers.get('content-type', '').startswith('image/png'):
+            return {'status': ErrorCode.SUCCESS, 'value': data}
+        try:
+            ret = json.loads(data.strip())
+        except ValueError:
+            return {'status': ErrorCode.SUCCESS if 199 < status < 300
+                    else ErrorCode.UNKNOWN_ERROR,
+                    'value': data.strip()}
+        if 'value' not in ret:
+            ret['value'] = None
+        return ret
+
+#eof
@@ -0,0 +1,85 @@
+# -*- coding: UTF-8 -*-
+""" Block requests the tests do not need, through Chromium's DevTools
+
+    Enable in the site config::
+
+        browser:
+            block_urls:
+                - '*google-analytics.com*'
+                - '*/fonts/*'
+            block_resource_types: [image, font, media]
+
+    `Network.setBlockedURLs` only matches URL patterns, so resource types
+    are mapped to the usual file extensions of each.
+"""
+
+from __future__ import absolute_import
+import logging
+
+
+class URLBlocker(object):
+    """Installs blocked URL patterns on every window of a browser
+
+        Blocked requests show up in the 'browser.network' log as
+        `ERR_BLOCKED_BY_CLIENT` errors; these are counted, rather than
+        logged as errors.
+    """
+    logger = logging.getLogger(__name__ + '.URLBlocker')
+
+    type_extensions = {
+        'image': ('png', 'jpg', 'jpeg', 'gif', 'webp', 'svg', 'ico', 'bmp'),
+        'font': ('woff', 'woff2', 'ttf', 'otf', 'eot'),
+        'media': ('mp4', 'webm', 'ogg', 'mp3', 'wav', 'm4a'),
+        'stylesheet': ('css',),
+        }
+    blocked_marker = 'ERR_BLOCKED_BY_CLIENT'
+
+    def __init__(self, urls=(), resource_types=()):
+        self.patterns = list(urls)
+        for rtype in resource_types:
+            try:
+                exts = self.type_extensions[rtype.lower()]
+            except KeyError:
+                raise ValueError("Unknown resource type to block: %s" % rtype)
+            for ext in exts:
+                self.patterns += ['*.%s' % ext, '*.%s?*' % ext]
+        self._installed = set()
+        self._unsupported = False
+        self.num_blocked = 0
+        self.total_blocked = 0
+
+    def install(self, browser):
+        """Block patterns on current window of `browser`
+        """
+        for cmd, params in (('Network.enable', {}),
+                            ('Network.setBlockedURLs', {'urls': self.patterns})):
+            browser.execute('send_command', {'cmd': cmd, 'params': params})
+        self._installed.add((browser.session_id, browser.current_window_handle))
+
+    def ensure(self, browser):
+        """Install on current window, unless already done
+        """
+        if self._unsupported:
+            return
+        try:
+            if (browser.session_id, browser.current_window_handle) not in self._installed:
+                self.install(browser)
+        except Exception as e:
+            self.logger.warning("Cannot block URLs on this browser: %s", e)
+            self._unsupported = True
+
+    def start_page(self):
+        self.num_blocked = 0
+
+    def consume(self, rec):
+        """Count `rec` if it is about a blocked request
+
+            :return: True if consumed
+        """
+        if rec.name == 'browser.network' and self.blocked_marker in rec.getMessage():
+            self.num_blocked += 1
+            self.total_blocked += 1
+            return True
+        return False
+
+#eof
@@ -0,0 +1,118 @@
+#!/bin/env python
+# -*- coding: UTF-8 -*-
+"""
+    Benchmark of pagelem locators: XPath vs. compiled (CSS/ID) ones
+
+    Attaches to a browser launched by `behave-run-browser`, fills the
+    current page with a large synthetic DOM and measures, *inside* the
+    browser, the time each locator strategy takes to evaluate.
+
+    Usage::
+
+        behave-run-browser -c config.yaml about:blank &
+        python bench_locators.py -s dbg-browser.session -n 20000
+"""
+from __future__ import print_function
+from __future__ import absolute_import
+import argparse
+import json
+import logging
+from selenium.webdriver.common.by import By
+from behave_manners.dpo_validator import ExistingRemote
+from behave_manners.pagelems.lookups import compile_locator
+
+
+build_dom_js = '''
+    let n = arguments[0];
+    let root = document.createElement('div');
+    root.setAttribute('id', 'bench-root');
+    for (let i = 0; i < n; i++) {
+        let row = document.createElement('div');
+        row.setAttribute('class', 'row r' + (i % 10));
+        let cell = document.createElement('span');
+        cell.setAttribute('class', 'cell');
+        cell.setAttribute('data-idx', '' + i);
+        cell.appendChild(document.createTextNode('cell ' + i));
+        row.appendChild(cell);
+        root.appendChild(row);
+    }
+    let last = document.createElement('div');
+    last.setAttribute('id', 'target');
+    root.appendChild(last);
+    document.body.appendChild(root);
+'''
+
+time_js = '''
+    let xpath = arguments[0], by = arguments[1], value = arguments[2];
+    let reps = arguments[3];
+    let t0 = performance.now();
+    let nx = 0;
+    for (let r = 0; r < reps; r++) {
+        let res = document.evaluate(xpath, document, null,
+                                    XPathResult.ORDERED_NODE_SNAPSHOT_TYPE, null);
+        nx = res.snapshotLength;
+    }
+    let t1 = performance.now();
+    let nn = 0;
+    for (let r = 0; r < reps; r++) {
+        if (by == 'id') {
+            nn = document.getElementById(value) ? 1 : 0;
+        } else {
+            nn = document.querySelectorAll(value).length;
+        }
+    }
+    let t2 = performance.now();
+    return [(t1 - t0) / reps, (t2 - t1) / reps, nx, nn];
+'''
+
+sample_xpaths = [
+    "//*[@id='target']",
+    "//div[@id='bench-root']",
+    "//div[@class='row r3']",
+    "//div[contains(@class,'r7')]/span",
+    "//span[@class='cell'][@data-idx='500']",
+    "//div[@id='bench-root']//span[starts-with(@data-idx,'99')]",
+    ]
+
+
+def cmdline_main():
+    parser = argparse.ArgumentParser(description='Compare locator strategies in browser')
+    parser.add_argument('-s', '--session-file', default='dbg-browser.session',
+                        help="Path to file with saved Remote session")
+    parser.add_argument('-n', '--num-rows', type=int, default=10000,
+                        help="Size of synthetic DOM")
+    parser.add_argument('-r', '--repeat', type=int, default=20,
+                        help="Evaluations per locator")
+    parser.add_argument('xpath', nargs='*', help="XPath locators to try")
+
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+
+    with open(args.session_file, 'rt') as fp:
+        sdata = json.load(fp)
+    driver = ExistingRemote(command_executor=sdata['url'],
+                            session_id=sdata['session'],
+                            saved_capabilities=sdata.get('capabilities', {}),
+                            saved_w3c=sdata.get('w3c', None))
+
+    driver.execute_script(build_dom_js, args.num_rows)
+
+    print("%-60s %10s %10s %8s" % ('locator', 'xpath ms', 'native ms', 'speedup'))
+    for xpath in args.xpath or sample_xpaths:
+        loc = compile_locator(xpath)
+        if not loc.native:
+            print("%-60s %10s" % (xpath, '(no native equivalent)'))
+            continue
+        by = 'id' if loc.by == By.ID else 'css'
+        tx, tn, nx, nn = driver.execute_script(time_js, xpath, by, loc.value, args.repeat)
+        if nx != nn:
+            print("%-60s results differ: %d vs %d" % (xpath, nx, nn))
+            continue
+        print("%-60s %10.3f %10.3f %7.1fx" % (xpath, tx, tn, tx / max(tn, 0.001)))
+        print("    %s" % loc.value)
+
+
+if __name__ == '__main__':
+    cmdline_main()
+
+#eof
@@ -24,6 +24,10 @@ except Exception as e:
     print("Could not get version: %s" % e)
     version = '0.5'
 
+packages = ["behave_manners", "behave_manners.pagelems", "behave_manners.steplib"]
+if sys.version_info >= (3, 7):
+    packages.append("behave_manners.aio")   # asyncio front-end, Python 3.7+ only
+
 setup(
     name='behave-manners',
     version=version,
@@ -35,12 +39,14 @@ setup(
     author_email="xrg@pefnos.com",
     url="http://github.com/xrg/behave_manners",
     provides = ["behave_manners"],
-    packages = ["behave_manners", "behave_manners.pagelems", "behave_manners.steplib"],
+    packages = packages,
     entry_points={
         'console_scripts': [
             'behave-test-sitelems=behave_manners.pagelems.main:cmdline_main',
             'behave-run-browser=behave_manners.dpo_run_browser:cmdline_main',
-            'behave-validate-remote=behave_manners.dpo_validator:cmdline_main'
+            'behave-validate-remote=behave_manners.dpo_validator:cmdline_main',
+            'behave-timings-report=behave_manners.timings:cmdline_main',
+            'behave-parallel=behave_manners.parallel:cmdline_main',
             ]
     },
     install_requires=[
@@ -55,6 +61,7 @@ setup(
         # 'docs': ["sphinx >= 1.6", "sphinx_bootstrap_theme >= 0.6"],
         'develop': [
         ],
+        'images': ["Pillow"],     # highlights drawn over screenshots
     },
     license="BSD-2-Clause",
     classifiers=[
@@ -0,0 +1,9 @@
+# -*- coding: UTF-8 -*-
+
+import sys
+
+collect_ignore = []
+if sys.version_info < (3, 7):
+    collect_ignore.append('test_aio.py')     # asyncio front-end needs 3.7
+
+#eof
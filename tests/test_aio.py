@@ -0,0 +1,205 @@
+# -*- coding: UTF-8 -*-
+""" Tests of asyncio front-end, against a stand-in WebDriver server
+"""
+
+import asyncio
+import json
+import pytest
+from selenium.webdriver.remote.command import Command
+from behave_manners.aio import AsyncSession, AsyncComponentProxy
+
+ELEMENT_KEY = 'element-6066-11e4-a52e-4f735466cecf'
+
+
+class StandInWebDriver(object):
+    """Serves a few W3C WebDriver commands, over keep-alive connections
+    """
+    def __init__(self, close_idle=False):
+        self.close_idle = close_idle
+        self.num_connections = 0
+        self.num_sessions = 0
+        self.urls = {}
+
+    def handle(self, method, path, body):
+        parts = path.strip('/').split('/')
+        if method == 'POST' and parts == ['session']:
+            self.num_sessions += 1
+            sid = 's%d' % self.num_sessions
+            return 200, {'sessionId': sid, 'capabilities': {'browserName': 'fake'}}
+        sid = parts[1]
+        cmd = parts[2:]
+        if cmd == ['url']:
+            if method == 'POST':
+                self.urls[sid] = body['url']
+                return 200, None
+            return 200, self.urls.get(sid)
+        elif cmd == ['title']:
+            return 200, 'Title of %s' % self.urls.get(sid)
+        elif cmd == ['elements']:
+            return 200, [{ELEMENT_KEY: 'e1'}, {ELEMENT_KEY: 'e2'}]
+        elif len(cmd) == 3 and cmd[0] == 'element' and cmd[2] == 'text':
+            return 200, '%s of %s' % (cmd[1], self.urls.get(sid))
+        elif method == 'DELETE' and not cmd:
+            return 200, None
+        return 404, {'error': 'unknown command', 'message': path}
+
+    async def serve(self, reader, writer):
+        self.num_connections += 1
+        while True:
+            try:
+                line = await reader.readuntil(b'\r\n')
+            except asyncio.IncompleteReadError:
+                break
+            method, path, _v = line.decode().split()
+            clen = 0
+            while True:
+                hline = await reader.readuntil(b'\r\n')
+                if hline == b'\r\n':
+                    break
+                k, v = hline.decode().split(':', 1)
+                if k.lower() == 'content-length':
+                    clen = int(v)
+            body = await reader.readexactly(clen) if clen else b''
+            status, value = self.handle(method, path, json.loads(body or b'null'))
+            data = json.dumps({'value': value}).encode()
+            writer.write(b'HTTP/1.1 %d X\r\nContent-Type: application/json\r\n'
+                         b'Content-Length: %d\r\n\r\n' % (status, len(data)) + data)
+            await writer.drain()
+            if self.close_idle:
+                break       # as if idle timeout expired
+        writer.close()
+
+
+class TestAsyncSession(object):
+
+    def test_two_sessions(self):
+        fake = StandInWebDriver()
+
+        async def _session(url, page):
+            sess = await AsyncSession.start(url)
+            await sess.get(page)
+            texts = await sess.run(lambda b: [e.text for e in b.find_elements_by_xpath('//p')])
+            await sess.quit()
+            return texts
+
+        async def _main():
+            server = await asyncio.start_server(fake.serve, '127.0.0.1', 0)
+            url = 'http://127.0.0.1:%d' % server.sockets[0].getsockname()[1]
+            try:
+                return await asyncio.gather(_session(url, 'http://a/'),
+                                            _session(url, 'http://b/'))
+            finally:
+                server.close()
+
+        res = asyncio.run(_main())
+        assert sorted(res) == [['e1 of http://a/', 'e2 of http://a/'],
+                               ['e1 of http://b/', 'e2 of http://b/']]
+        assert fake.num_sessions == 2
+        assert fake.num_connections == 2   # one persistent connection each
+
+    def test_execute(self):
+        fake = StandInWebDriver(close_idle=True)
+
+        async def _main():
+            server = await asyncio.start_server(fake.serve, '127.0.0.1', 0)
+            url = 'http://127.0.0.1:%d' % server.sockets[0].getsockname()[1]
+            try:
+                sess = await AsyncSession.start(url)
+                await sess.get('http://a/')
+                title = await sess.title()
+                elems = await sess.execute(Command.FIND_ELEMENTS,
+                                           {'using': 'xpath', 'value': '//p'})
+                with pytest.raises(RuntimeError):
+                    sess.browser.title      # blocking, from the loop
+                await sess.quit()
+                return title, [e.id for e in elems]
+            finally:
+                server.close()
+
+        title, ids = asyncio.run(_main())
+        assert title == 'Title of http://a/'
+        assert ids == ['e1', 'e2']
+        assert fake.num_connections == 5    # reconnected after each close
+
+
+class DroppedWriter(object):
+    """Writer of a connection the server has closed, with no EOF seen yet
+    """
+    def write(self, data):
+        pass
+
+    async def drain(self):
+        raise ConnectionResetError("reset by peer")
+
+    def close(self):
+        pass
+
+
+class TestHTTPClient(object):
+
+    def _client(self, response):
+        from behave_manners.aio.client import HTTPClient
+        client = HTTPClient('http://127.0.0.1:1/')
+        writes = []
+
+        class _Writer(DroppedWriter):
+            def write(self, data):
+                writes.append(data)
+
+            async def drain(self):
+                pass
+
+        async def _connect():
+            client._reader = asyncio.StreamReader()
+            client._reader.feed_data(response)
+            client._writer = _Writer()
+        client._connect = _connect
+        return client, writes
+
+    def test_retry_unsent(self):
+        client, writes = self._client(b'HTTP/1.1 200 OK\r\nContent-Length: 2\r\n\r\n{}')
+
+        async def _main():
+            client._reader = asyncio.StreamReader()
+            client._writer = DroppedWriter()
+            return await client.request('GET', '/status')
+
+        assert asyncio.run(_main()) == (200, '', '{}')
+        assert len(writes) == 1
+
+    def test_no_retry_sent(self):
+        from selenium.common.exceptions import WebDriverException
+        client, writes = self._client(b'HTTP/1.1 200 OK\r\n')   # then dropped
+
+        async def _main():
+            await client._connect()
+            client._reader.feed_eof()
+            return await client.request('POST', '/session/s1/url', '{}')
+
+        with pytest.raises(WebDriverException):
+            asyncio.run(_main())
+        assert len(writes) == 1
+
+
+class DummyProxy(object):
+    title = 'dummy'
+
+    def __getitem__(self, name):
+        return name.upper()
+
+    def items(self):
+        return iter([('a', 1), ('b', 2)])
+
+
+class TestAsyncProxy(object):
+
+    def test_await(self):
+        async def _main():
+            comp = AsyncComponentProxy(DummyProxy())
+            ret = [await comp['x'], await comp.title]
+            ret.append([n async for n, _c in comp.items()])
+            return ret
+
+        assert asyncio.run(_main()) == ['X', 'dummy', ['a', 'b']]
+
+#eof
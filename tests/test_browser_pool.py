@@ -0,0 +1,130 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import absolute_import, print_function
+from behave_manners.browser_pool import BrowserPool
+
+
+class DummySwitch(object):
+    def __init__(self, browser):
+        self.browser = browser
+
+    def window(self, handle):
+        self.browser.current = handle
+
+    @property
+    def alert(self):
+        from selenium.common.exceptions import NoAlertPresentException
+        raise NoAlertPresentException()
+
+
+class DummyExecutor(object):
+    def __init__(self, send_command=True):
+        self._commands = {'send_command': ('POST', '/send_command'),
+                          'send_command_and_get_result': ('POST', '/send_command_and_get_result')} \
+            if send_command else {}
+
+
+class DummyBrowser(object):
+    def __init__(self, send_command=True):
+        self.command_executor = DummyExecutor(send_command)
+        self.commands = []
+        self.window_handles = ['main']
+        self.history = {'main': []}
+        self.current = 'main'
+        self.switch_to = DummySwitch(self)
+        self.healthy = True
+        self.quitted = False
+        self.url = None
+
+    def execute_script(self, body, *args):
+        if not self.healthy:
+            raise RuntimeError("dead")
+        return 1
+
+    def execute(self, command, params):
+        if command == 'send_command_and_get_result':
+            assert params['cmd'] == 'Page.getNavigationHistory'
+            return {'value': {'entries': [{'url': u} for u in self.history[self.current]]}}
+        self.commands.append((params['cmd'], params['params']))
+
+    def close(self):
+        self.window_handles.remove(self.current)
+
+    def delete_all_cookies(self):
+        pass
+
+    def get(self, url):
+        self.url = url
+
+    def quit(self):
+        self.quitted = True
+
+
+class TestBrowserPool(object):
+
+    def test_recycle(self):
+        launched = []
+
+        def _launch():
+            launched.append(DummyBrowser())
+            return launched[-1]
+
+        pool = BrowserPool(_launch, size=1)
+        pool.fill()
+        b1 = pool.acquire()
+        pool.release(b1)
+        assert b1.url == 'about:blank'
+        assert b1.commands == [('Network.clearBrowserCookies', {})]
+        b2 = pool.acquire()
+        assert b2 is b1
+        assert pool.uses(b2) == 2
+
+        b2.healthy = False
+        pool.release(b2)      # fails to reset
+        assert b2.quitted
+        b3 = pool.acquire()
+        assert b3 is not b1
+        pool.release(b3)
+        pool.close()
+        assert all(b.quitted for b in launched)
+        assert pool.num_hits == 3 and pool.num_discarded == 1
+
+    def test_reset_origins(self):
+        pool = BrowserPool(DummyBrowser, size=1)
+        b1 = pool.acquire()
+        b1.window_handles.append('popup')
+        b1.history = {'main': ['about:blank', 'http://site.test/a', 'http://site.test/b',
+                               'https://user@auth.test:8443/login'],
+                      'popup': ['http://other.test/', 'data:text/html,x']}
+        pool.release(b1)
+        assert b1.window_handles == ['main']
+        assert b1.current == 'main'
+        cleared = [(cmd, params) for cmd, params in b1.commands
+                   if cmd == 'Storage.clearDataForOrigin']
+        assert cleared == [
+            ('Storage.clearDataForOrigin', {'origin': 'http://other.test', 'storageTypes': 'all'}),
+            ('Storage.clearDataForOrigin', {'origin': 'http://site.test', 'storageTypes': 'all'}),
+            ('Storage.clearDataForOrigin', {'origin': 'https://auth.test:8443',
+                                            'storageTypes': 'all'}),
+            ]
+        assert pool.acquire() is b1
+        pool.close()
+
+    def test_reset_attached(self):
+        browser = DummyBrowser(send_command=False)
+        browser.window_handles.append('popup')
+        BrowserPool.reset_browser(browser)
+        assert browser.window_handles == ['main']
+        assert browser.commands == []       # current origin only
+        assert browser.url == 'about:blank'
+
+    def test_no_full_reset(self):
+        pool = BrowserPool(lambda: DummyBrowser(send_command=False), size=1)
+        b1 = pool.acquire()
+        pool.release(b1)
+        assert b1.quitted
+        b2 = pool.acquire()
+        assert b2 is not b1
+        pool.close()
+
+#eof
@@ -0,0 +1,140 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import absolute_import, print_function
+import pytest
+from selenium.common.exceptions import StaleElementReferenceException
+from behave_manners.pagelems import dom_components
+from behave_manners.pagelems.dom_components import ComponentProxy
+from behave_manners.pagelems.dom_descriptors import AttrGetter
+from behave_manners.pagelems.actions import Action
+from behave_manners.pagelems.base_parsers import DOMScope
+
+
+class DummyElem(object):
+    def __init__(self, name, children=None):
+        self.name = name
+        self.children = children or {}
+        self.stale = False
+        self.lookups = 0
+        self.clicks = 0
+
+    def find_element_by_xpath(self, xpath):
+        self.lookups += 1
+        return self.children[xpath]
+
+    def get_attribute(self, attr):
+        if self.stale:
+            raise StaleElementReferenceException()
+        return '%s.%s' % (self.name, attr)
+
+
+class Click(Action):
+    def act_on_descriptor(self, descr, elem):
+        elem.clicks += 1
+        if elem.stale:
+            raise StaleElementReferenceException()
+
+
+def _component(remote):
+    comp = ComponentProxy.__new__(ComponentProxy)
+    comp._remote = remote
+    comp._parent = None
+    comp._subelems = {}
+    comp._scope = DOMScope['.root']()
+    comp._ComponentProxy__descrs = {'title': AttrGetter('title', 'span')}
+    return comp
+
+
+class TestMemoizedElements(object):
+
+    def test_memoized(self):
+        span1, span2 = DummyElem('span1'), DummyElem('span2')
+        div = DummyElem('div', {'span': span1})
+        comp = _component(div)
+        assert comp.title == 'span1.title'
+        assert comp.title == 'span1.title'
+        assert div.lookups == 1
+
+        # component re-resolved to a new element: memo is not used
+        comp._remote = DummyElem('div2', {'span': span2})
+        assert comp.title == 'span2.title'
+
+    def test_stale_retry(self):
+        span1, span2 = DummyElem('span1'), DummyElem('span2')
+        div = DummyElem('div', {'span': span1})
+        comp = _component(div)
+        assert comp.title == 'span1.title'
+        span1.stale = True
+        div.children['span'] = span2
+        assert comp.title == 'span2.title'      # read retried once
+        assert div.lookups == 2
+
+    def test_no_setter_retry(self):
+        span1 = DummyElem('span1')
+        div = DummyElem('div', {'span': span1})
+        comp = _component(div)
+        comp.title
+        span1.stale = True
+        with pytest.raises(StaleElementReferenceException):
+            comp.title = Click()
+        assert span1.clicks == 1       # not repeated
+        assert div.lookups == 2        # looked up afresh, not memoized
+
+
+class DummyTemplate(object):
+    def __init__(self, names=None):
+        if names is not None:
+            # name of element, as computed from its attributes
+            self._this_fn = lambda n, elem, scope, name: names[elem]
+
+
+class TestRecoverByPath(object):
+    """Recovery of a component, after the DOM has been re-rendered
+    """
+
+    def _component(self, name, locator, pagetmpl):
+        comp = _component(DummyElem('old'))
+        comp._name = name
+        comp._locator = locator
+        comp._pagetmpl = pagetmpl
+        parent = _component(DummyElem('table'))
+        parent._locator = None
+        comp._parent = parent
+        return comp
+
+    def _rerender(self, monkeypatch, new_elem):
+        calls = []
+
+        def _locate(remote, steps, absolute=False):
+            calls.append(steps)
+            return new_elem
+        monkeypatch.setattr(dom_components, 'locate_chain', _locate)
+        return calls
+
+    def test_by_id(self, monkeypatch):
+        new = DummyElem('new')
+        self._rerender(monkeypatch, new)
+        comp = self._component('row', (False, [[None, 'row-3']]), DummyTemplate())
+        assert comp._recover_by_path()
+        assert comp._remote is new
+
+    def test_positional_refused(self, monkeypatch):
+        calls = self._rerender(monkeypatch, DummyElem('shifted'))
+        comp = self._component('[2]', (False, [['tr', 2]]), DummyTemplate())
+        assert not comp._recover_by_path()
+        assert comp._remote.name == 'old'
+        assert calls == []
+
+    def test_named(self, monkeypatch):
+        shifted, same = DummyElem('shifted'), DummyElem('same')
+        names = {shifted: 'bob', same: 'alice'}
+        self._rerender(monkeypatch, shifted)
+        comp = self._component('alice', (False, [['tr', 2]]), DummyTemplate(names))
+        assert not comp._recover_by_path()       # rows shifted, another one there
+        assert comp._remote.name == 'old'
+
+        self._rerender(monkeypatch, same)
+        assert comp._recover_by_path()
+        assert comp._remote is same
+
+#eof
@@ -0,0 +1,75 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import absolute_import, print_function
+import os
+import threading
+import hashlib
+import pytest
+from behave_manners.downloads import DownloadManager
+from behave_manners.pagelems.exceptions import Timeout
+
+
+@pytest.fixture(params=[True, False], ids=['watch', 'poll'])
+def manager(request, tmpdir):
+    tmpdir.join('old.txt').write('old')
+    dman = DownloadManager(str(tmpdir), engine='chrome', watch=request.param)
+    dman.poll_interval = 0.05
+    yield dman
+    dman.close()
+
+
+class TestDownloadManager(object):
+
+    def test_look_for(self, manager, tmpdir):
+        tmpdir.join('new.csv').write('a,b')
+        tmpdir.mkdir('subdir')
+        assert [p for p, _f in manager.look_for('*')] == ['new.csv']
+        manager.reset()
+        assert list(manager.look_for('*')) == []
+
+    def test_wait_partial(self, manager, tmpdir):
+        partial = tmpdir.join('data.csv.crdownload')
+        partial.write('a,b')
+
+        def _finish():
+            partial.rename(tmpdir.join('data.csv'))
+
+        timer = threading.Timer(0.2, _finish)
+        timer.start()
+        try:
+            path, fullpath = manager.wait_for('*', timeout=5.0)
+        finally:
+            timer.join()
+        assert path == 'data.csv'
+        assert os.path.isfile(fullpath)
+
+        with pytest.raises(Timeout):
+            manager.wait_for('*', timeout=0.2)
+
+    def test_expect(self, manager, tmpdir):
+        partial = tmpdir.join('export.data.crdownload')
+        content = b'x' * 5000
+        partial.write_binary(content[:1000])
+
+        def _finish():
+            with partial.open('ab') as fp:
+                fp.write(content[1000:])
+            partial.rename(tmpdir.join('export.data'))
+
+        timer = threading.Timer(0.2, _finish)
+        timer.start()
+        try:
+            path, _fullpath, dig = manager.expect(
+                '*.data', size=len(content),
+                digest=hashlib.sha256(content).hexdigest(), timeout=5.0)
+        finally:
+            timer.join()
+        assert path == 'export.data'
+        assert dig.size == len(content)
+
+    def test_expect_mismatch(self, manager, tmpdir):
+        tmpdir.join('short.data').write_binary(b'abc')
+        with pytest.raises(AssertionError):
+            manager.expect('*.data', size=4, timeout=1.0)
+
+#eof
@@ -0,0 +1,43 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import absolute_import, print_function
+import os
+from behave_manners.fast_launch import ProfileTemplate
+
+
+class TestProfileTemplate(object):
+
+    def test_cold_then_warm(self, tmpdir):
+        template = str(tmpdir.join('tmpl'))
+        ptempl = ProfileTemplate(template, base_dir=str(tmpdir.join('work')))
+        assert not ptempl.warm
+        quitted = []
+
+        class BlankBrowser(object):
+            def __init__(self, pdir):
+                for fname in ('prefs', 'Cookies'):
+                    with open(os.path.join(pdir, fname), 'wt') as fp:
+                        fp.write('warm')
+                os.symlink('host-123', os.path.join(pdir, 'SingletonLock'))
+
+            def quit(self):
+                quitted.append(self)
+
+        ptempl.prepare(lambda: BlankBrowser(ptempl.new_profile()))
+        assert len(quitted) == 1
+        assert sorted(os.listdir(template)) == ['prefs']
+
+        pdir = ptempl.new_profile()
+        assert ptempl.warm
+        with open(os.path.join(pdir, 'prefs'), 'rt') as fp:
+            assert fp.read() == 'warm'
+        with open(os.path.join(pdir, 'prefs'), 'wt') as fp:
+            fp.write('used')
+        ptempl.prepare(lambda: BlankBrowser(ptempl.new_profile()))
+        ptempl.close()
+        assert len(quitted) == 1
+        assert not os.path.exists(pdir)
+        with open(os.path.join(template, 'prefs'), 'rt') as fp:
+            assert fp.read() == 'warm'
+
+#eof
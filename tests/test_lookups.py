@@ -0,0 +1,117 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import absolute_import, print_function
+from selenium.webdriver.common.by import By
+from selenium.webdriver.remote.webdriver import WebDriver, WebElement
+from behave_manners.pagelems.lookups import ImplicitWait, find_elements, \
+                                            absence_expected, restore_wait, \
+                                            compile_locator, origin_chain, \
+                                            _set_origin
+
+
+class DummyDriver(object):
+    def __init__(self, elements=None):
+        self.commands = []
+        self.elements = elements or {}
+
+    def implicitly_wait(self, value):
+        self.commands.append(('wait', value))
+
+    def find_elements_by_xpath(self, xpath):
+        self.commands.append(('find', xpath))
+        return self.elements.get(xpath, [])
+
+
+class TestImplicitWait(object):
+
+    def test_unregistered(self):
+        driver = DummyDriver()
+        assert find_elements(driver, '//div', optional=True) == []
+        assert driver.commands == [('find', '//div')]
+
+    def test_batched_toggles(self):
+        driver = DummyDriver({'//b': ['b']})
+        iw = ImplicitWait.register(driver, 5.0)
+        find_elements(driver, '//a', optional=True)
+        find_elements(driver, '//a2', optional=True)
+        assert find_elements(driver, '//b') == ['b']
+        assert driver.commands == [('wait', 0), ('find', '//a'), ('find', '//a2'),
+                                   ('wait', 5.0), ('find', '//b')]
+        assert iw.num_skipped == 2
+        assert iw.seconds_saved == 10.0
+
+    def test_absence_expected(self):
+        driver = DummyDriver()
+        ImplicitWait.register(driver, 1.0)
+        with absence_expected(driver):
+            find_elements(driver, '//a')
+        restore_wait(driver)
+        restore_wait(driver)
+        assert driver.commands == [('wait', 0), ('find', '//a'), ('wait', 1.0)]
+
+    def test_unregister(self):
+        driver = DummyDriver()
+        ImplicitWait.register(driver, 1.0)
+        assert ImplicitWait.register(driver, 0) is None
+        assert ImplicitWait.get(driver) is None
+
+
+class TestLocatorCompiler(object):
+
+    def test_id(self):
+        loc = compile_locator("//*[@id='main']")
+        assert (loc.by, loc.value, loc.absolute) == (By.ID, 'main', True)
+
+    def test_css_child(self):
+        loc = compile_locator("div[@class='a']/span[not(@hidden)]")
+        assert loc.by == By.CSS_SELECTOR
+        assert loc.value == ':scope > div[class="a"] > span:not([hidden])'
+
+    def test_css_descendant(self):
+        loc = compile_locator(".//input[@name='q'][contains(@class,'big')]")
+        assert loc.value == 'input[name="q"][class*="big"]'
+        loc = compile_locator(".//div/*[@id='x']")
+        assert loc.value == ':scope div > #x'
+
+    def test_css_boolean(self):
+        loc = compile_locator("a[boolean(contains(@class,'x') and not(contains(@class,'y')))]")
+        assert loc.value == ':scope > a[class*="x"]:not([class*="y"])'
+
+    def test_css_quoting(self):
+        loc = compile_locator('span[@title=\'say "hi"\']')
+        assert loc.value == ':scope > span[title="say \\"hi\\""]'
+
+    def test_not_exact(self):
+        for xpath in ("div[1]", "div[text()='x']", "div[@a='1' or @a='2']",
+                      "following-sibling::div", "a[contains(@href,'')]",
+                      "div[@x=concat('a', '\"', 'b')]", "(div)[2]", "DIV"):
+            loc = compile_locator(xpath)
+            assert not loc.native, xpath
+            assert loc.value == xpath
+
+
+class TestOriginChain(object):
+
+    class _Driver(WebDriver):
+        def __init__(self):
+            pass
+
+    def test_chain(self):
+        driver = self._Driver()
+        a, b, c = [WebElement(driver, i) for i in 'abc']
+        _set_origin(driver, '//form', [a])
+        _set_origin(a, 'div', [None, b])
+        _set_origin(b, ('x',), [c])
+        assert origin_chain(c, a) == (False, [['div', 1], [None, 'x']])
+        assert origin_chain(c, b) == (False, [[None, 'x']])
+        assert origin_chain(a, a) == (False, [])
+        assert origin_chain(c, driver) == (False, [['//form', 0], ['div', 1], [None, 'x']])
+
+    def test_absolute(self):
+        driver = self._Driver()
+        a, b = WebElement(driver, 'a'), WebElement(driver, 'b')
+        _set_origin(driver, ('x',), [b])
+        assert origin_chain(b, a) == (True, [[None, 'x']])
+        assert origin_chain(a, b) is None
+
+# eof
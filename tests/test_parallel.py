@@ -0,0 +1,56 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import absolute_import, print_function
+from behave_manners.parallel import WorkUnit, balance, merge_json, merge_junit
+
+
+class TestBalance(object):
+
+    def test_longest_first(self):
+        units = [WorkUnit(k, [k]) for k in 'abcde']
+        durations = {'a': 10.0, 'b': 6.0, 'c': 4.0, 'd': 2.0}
+        shards = balance(units, 2, durations)
+        loads = sorted(sum(u.duration for u in s) for s in shards)
+        # 'e' has no history, counts as average (5.5)
+        assert loads == [13.5, 14.0]
+
+    def test_few_units(self):
+        units = [WorkUnit('a', ['a'])]
+        assert len(balance(units, 4, {})) == 1
+
+
+class TestMergeJunit(object):
+
+    def test_same_feature(self, tmpdir):
+        cases = ['<testcase classname="f" name="one" time="1.0"/>'
+                 '<testcase classname="f" name="two" time="0"><skipped/></testcase>',
+                 '<testcase classname="f" name="one" time="0"><skipped/></testcase>'
+                 '<testcase classname="f" name="two" time="2.0"><failure/></testcase>']
+        for w, body in enumerate(cases):
+            tmpdir.mkdir('w%d' % w).join('TESTS-f.xml').write(
+                '<testsuite name="f" tests="2">%s</testsuite>' % body)
+        merge_junit([str(tmpdir.join('w0')), str(tmpdir.join('w1'))],
+                    str(tmpdir.join('out')))
+        out = tmpdir.join('out', 'TESTS-f.xml').read()
+        assert 'tests="2"' in out and 'failures="1"' in out
+        assert 'skipped="0"' in out and 'time="3.000000"' in out
+
+class TestMergeJson(object):
+
+    def test_feature_status(self):
+        results = [
+            {'location': 'f.feature:1', 'status': 'passed',
+             'elements': [{'type': 'scenario', 'name': 'one', 'status': 'passed'},
+                          {'type': 'scenario', 'name': 'two', 'status': 'skipped'}]},
+            {'location': 'f.feature:1', 'status': 'failed',
+             'elements': [{'type': 'scenario', 'name': 'one', 'status': 'skipped'},
+                          {'type': 'scenario', 'name': 'two', 'status': 'failed'}]},
+            {'location': 'g.feature:1', 'status': 'skipped',
+             'elements': [{'type': 'scenario', 'name': 'three', 'status': 'skipped'}]},
+            ]
+        merged = dict((f['location'], f) for f in merge_json(results))
+        assert [e['name'] for e in merged['f.feature:1']['elements']] == ['one', 'two']
+        assert merged['f.feature:1']['status'] == 'failed'
+        assert merged['g.feature:1']['status'] == 'skipped'
+
+#eof
@@ -1,6 +1,7 @@
 # -*- coding: UTF-8 -*-
 
 from __future__ import absolute_import, print_function
+import time
 import pytest
 from behave_manners.pagelems.base_parsers import HTMLParseError, DOMScope
 import behave_manners.pagelems.scopes
@@ -42,6 +43,126 @@ class TestPEScopes(object):
             driver.called_scripts[0]
 
 
+class DummyAsyncDriver(DummyDriver):
+    def __init__(self, result=None):
+        super(DummyAsyncDriver, self).__init__()
+        self.result = result
+        self.script_timeout = None
+        self.running_timeouts = []
+
+    def set_script_timeout(self, value):
+        self.script_timeout = value
+
+    def execute_async_script(self, script, *args):
+        self.called_scripts.append(script)
+        self.running_timeouts.append(self.script_timeout)
+        return self.result
+
+
+class TestWaitAsync(object):
+
+    def test_ready(self):
+        driver = DummyAsyncDriver()
+        scope = DOMScope['page'](DOMScope['.root']())
+        scope.wait_all('short', webdriver=driver)
+        assert len(driver.called_scripts) == 1
+        assert "return 'jQuery';" in driver.called_scripts[0]
+        assert driver.running_timeouts[0] >= 5
+        assert driver.script_timeout == 30      # restored after the wait
+
+    def test_timeout(self):
+        driver = DummyAsyncDriver({'reason': 'jQuery'})
+        scope = DOMScope['page'](DOMScope['.root']())
+        with pytest.raises(behave_manners.pagelems.scopes.Timeout) as e:
+            scope.wait_all(0.1, webdriver=driver)
+        assert e.value.args[0].endswith('waiting for jQuery')
+
+    def test_learned_budget_extended(self, tmpdir):
+        from behave_manners.timings import TimingStore
+
+        class SlowDriver(DummyAsyncDriver):
+            def execute_async_script(self, script, *args):
+                self.called_scripts.append(script)
+                self.running_timeouts.append(self.script_timeout)
+                if len(self.called_scripts) == 1:
+                    return {'reason': 'jQuery'}     # timed out under budget
+                return None
+
+        store = TimingStore(str(tmpdir.join('timings.json')), min_samples=1)
+        store.record('index', 'short', 0.01)
+        root = DOMScope['.root'](site_config={'timeouts': {'short': 5}})
+        root.timing_store = store
+        root.timing_page = 'index'
+        scope = DOMScope['page'](root)
+        assert scope.resolve_timeout('short') == 0.5
+        driver = SlowDriver()
+        scope.wait_all('short', webdriver=driver)
+        assert len(driver.called_scripts) == 2
+        assert driver.running_timeouts[1] > 4
+        assert driver.script_timeout == 30
+        assert len(store._data['index']['short']) == 2
+
+    def test_learned_budget_timeout(self, tmpdir):
+        from behave_manners.timings import TimingStore
+
+        class NeverReadyDriver(DummyAsyncDriver):
+            def execute_async_script(self, script, tleft_ms):
+                self.called_scripts.append(script)
+                time.sleep(tleft_ms / 1000.0)
+                return {'reason': 'jQuery'}
+
+        store = TimingStore(str(tmpdir.join('timings.json')), min_samples=1, grace=0.2)
+        store.record('index', 'short', 0.01)
+        root = DOMScope['.root'](site_config={'timeouts': {'short': 5}})
+        root.timing_store = store
+        root.timing_page = 'index'
+        scope = DOMScope['page'](root)
+        assert scope._resolve_budget('short') == (0.5, 0.7)
+        t0 = time.time()
+        with pytest.raises(behave_manners.pagelems.scopes.Timeout):
+            scope.wait_all('short', webdriver=NeverReadyDriver())
+        assert time.time() - t0 < 2.0       # not the configured 5sec
+        samples = store._data['index']['short']
+        assert len(samples) == 2 and samples[1] > 0.6
+        assert scope.resolve_timeout('short') > 0.5
+
+    def test_poll_mode(self):
+        driver = DummyAsyncDriver()
+        scope = DOMScope['page'](DOMScope['.root'](site_config={'wait_mode': 'poll'}))
+        scope.wait_all('short', webdriver=driver)
+        assert driver.script_timeout is None
+        assert len(driver.called_scripts) == 1
+
+
+class TestNetworkIdle(object):
+
+    def test_condition(self):
+        from behave_manners.pagelems.scopes import NetworkIdle
+        driver = DummyDriver()
+        driver.session_id = 'sess-1'
+        net = NetworkIdle(0.25)
+        root = DOMScope['.root']()
+        net.register(root)
+        net.register(root)
+        scope = DOMScope['wait.base'](root)
+        scope.isready_all(driver)
+        assert driver.called_scripts[0].endswith(net.condition)
+        assert driver.called_scripts[0].count('__manners_net.quiet') == 1
+
+        net.ensure(driver)
+        assert '})(250);' in driver.called_scripts[1]
+
+        # installed once per browser session
+        net.install(driver)
+        net.install(driver)
+        assert len(driver.called_scripts) == 3
+        assert '})(250);' in driver.called_scripts[2]
+
+        # other sites' scopes are not affected
+        DOMScope['wait.base'](DOMScope['.root']()).isready_all(driver)
+        assert '__manners_net' not in driver.called_scripts[-1]
+
+
 class Scope1(DOMScope):
     _name = 'scope1'
 
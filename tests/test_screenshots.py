@@ -0,0 +1,59 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import absolute_import, print_function
+import base64
+from behave_manners import screenshots
+from behave_manners.screenshots import ShotWriter, Camera
+
+
+class DummyShotDriver(object):
+    def __init__(self):
+        self.scripts = []
+
+    def execute_script(self, body, *args):
+        self.scripts.append(body)
+        if 'getBoundingClientRect' in body:
+            return [[{'x': 10, 'y': 10, 'width': 100, 'height': 20}
+                     for e in args[0]], 1]
+        elif 'createElement' in body:
+            return ['hl'] * len(args[0])
+
+    def get_screenshot_as_base64(self):
+        return base64.b64encode(b'frame').decode('ascii')
+
+
+class DummyContext(object):
+    def __init__(self):
+        self.browser = DummyShotDriver()
+
+
+class TestShotWriter(object):
+
+    def test_write_dedup(self, tmpdir):
+        writer = ShotWriter(maxsize=2)
+        frame1 = base64.b64encode(b'frame-1').decode('ascii')
+        frame2 = base64.b64encode(b'frame-2').decode('ascii')
+        for i, data in enumerate([frame1, frame1, frame2, frame1]):
+            writer.put(str(tmpdir.join('shot%d.png' % i)), data)
+        writer.close()
+
+        assert sorted(f.basename for f in tmpdir.listdir()) == \
+            ['shot0.png', 'shot1.png', 'shot2.png', 'shot3.png']
+        assert tmpdir.join('shot1.png').read_binary() == b'frame-1'
+        assert tmpdir.join('shot2.png').read_binary() == b'frame-2'
+        assert (writer.num_written, writer.num_dups) == (3, 1)
+
+
+class TestHighlightShot(object):
+
+    def test_many_elems_one_shot(self, tmpdir, monkeypatch):
+        monkeypatch.setattr(screenshots, 'Image', None)
+        camera = Camera(str(tmpdir), async_write=False)
+        context = DummyContext()
+        camera.highlight_shot(context, ['e1', None, 'e2', 'e3'], 'missing-elems')
+
+        # rects, inject highlights, remove them
+        assert len(context.browser.scripts) == 3
+        assert len(tmpdir.listdir()) == 1
+
+#eof
@@ -0,0 +1,96 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import absolute_import, print_function
+import json
+import subprocess
+import pytest
+from behave_manners.pagelems.scripts import Script
+from behave_manners.pagelems.dom_descriptors import _text_js
+
+
+class DummyDriver(object):
+    def __init__(self):
+        self.scripts = []
+        self.commands = []
+        self.defined = set()
+
+    def execute(self, cmd, params):
+        self.commands.append((cmd, params['cmd']))
+
+    def execute_script(self, script, *args):
+        self.scripts.append(script)
+        if script.startswith('let f = '):
+            sid = script.split('"')[1]
+            if sid not in self.defined:
+                return {'__manners_unpinned': True}
+            return args
+        elif script.startswith('(window.__manners_fns'):
+            self.defined.add(script.split('"')[1])
+        return args
+
+
+class TestScript(object):
+
+    def test_registry(self):
+        assert Script.get('return 1;') is Script.get('return 1;')
+        assert Script.get('return 1;') is not Script.get('return 2;')
+
+    def test_plain(self):
+        driver = DummyDriver()
+        assert Script.get('return arguments;').run(driver, 1, 2) == (1, 2)
+        assert driver.scripts == ['return arguments;']
+        assert driver.commands == []
+
+    def test_pinned(self):
+        driver = DummyDriver()
+        Script.pin(driver)
+        scr = Script.get('return [arguments[0]];')
+        assert scr.run(driver, 'a') == ('a',)
+        assert driver.commands == [('send_command', 'Page.addScriptToEvaluateOnNewDocument')]
+        assert scr.run(driver, 'b') == ('b',)
+        assert driver.scripts[-1] == scr._stub
+        assert len(driver.commands) == 1
+
+        # a page loaded before install lacks the function: redefine there
+        driver.defined.clear()
+        assert scr.run(driver, 'c') == ('c',)
+        assert driver.scripts[-2:][0] == scr._stub
+        assert driver.scripts[-1].startswith('(window.__manners_fns')
+        Script.unpin(driver)
+
+
+class NodeDriver(object):
+    """Runs scripts under node, with `innerText` of a fake element as it
+        would be rendered by the browser
+    """
+    def execute_script(self, script, elem, xpath):
+        src = 'console.log(JSON.stringify((function() {\n%s\n}).apply(null, %s)));' \
+              % (script, json.dumps([elem, xpath]))
+        try:
+            out = subprocess.check_output(['node', '-e', src])
+        except OSError:
+            pytest.skip("node is needed to run scripts")
+        return json.loads(out.decode('utf-8'))
+
+
+class TestTextScript(object):
+    """Text read by script must equal the `.text` of WebDriver
+    """
+    # markup: (innerText, WebElement.text)
+    samples = {
+        '<span>a&nbsp;b</span>': (u'a\u00a0b', u'a b'),
+        '<div> one<br>two </div>': (u'one\ntwo\n', u'one\ntwo'),
+        '<pre>  x\n    y</pre>': (u'  x\n    y', u'x\n    y'),
+        }
+
+    def test_normalize(self):
+        driver = NodeDriver()
+        for markup, (inner, text) in self.samples.items():
+            ret = _text_js.run(driver, {'innerText': inner}, None)
+            assert ret == [text], markup
+
+    def test_no_text_content(self):
+        ret = _text_js.run(NodeDriver(), {'textContent': 'hidden'}, None)
+        assert ret == ['']
+
+# eof
@@ -0,0 +1,48 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import absolute_import, print_function
+import re
+import fnmatch
+import pytest
+from behave_manners.pagelems.loaders import BaseLoader
+from behave_manners.pagelems.site_collection import DSiteCollection
+
+
+class CountingRe(object):
+    def __init__(self, pattern):
+        self._re = re.compile(fnmatch.translate(pattern))
+        self.count = 0
+
+    def match(self, url):
+        self.count += 1
+        return self._re.match(url)
+
+
+class TestUrlCache(object):
+
+    def _site(self):
+        site = DSiteCollection(BaseLoader())
+        site.file_dir.update({'a.html': 'page-a', 'b.html': 'page-b'})
+        site.url_dir['Page A'] = '/a'
+        site.urls += [('/a', CountingRe('/a'), 'a.html'),
+                      ('/b*', CountingRe('/b*'), 'b.html')]
+        return site
+
+    def test_cached(self):
+        site = self._site()
+        assert site.get_by_url('/a') == ('page-a', 'Page A', ())
+        assert site.get_by_url('/a') == ('page-a', 'Page A', ())
+        assert site.urls[0][1].count == 1
+        for i in range(2):
+            with pytest.raises(KeyError):
+                site.get_by_url('/c')
+        assert site.urls[1][1].count == 1   # misses are cached too
+
+    def test_bounded(self):
+        site = self._site()
+        site.url_cache_size = 2
+        for url in ('/b1', '/b2', '/b3', '/b1'):
+            site.get_by_url(url)
+        assert list(site._url_cache) == ['/b3', '/b1']
+
+#eof
@@ -0,0 +1,38 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import absolute_import, print_function
+from behave_manners.step_utils import session_state
+
+
+class DummySite(object):
+    def __init__(self):
+        self.states = {}
+
+    def restore_session_state(self, context, name):
+        return name in self.states
+
+    def save_session_state(self, context, name):
+        self.states[name] = True
+
+
+class DummyContext(object):
+    def __init__(self):
+        self.site = DummySite()
+        self.logins = []
+
+
+class TestSessionState(object):
+
+    def test_runs_once(self):
+        @session_state('login-{user}')
+        def login(context, user):
+            context.logins.append(user)
+
+        context = DummyContext()
+        login(context, 'alice')
+        login(context, user='alice')
+        login(context, 'bob')
+        assert context.logins == ['alice', 'bob']
+        assert sorted(context.site.states) == ['login-alice', 'login-bob']
+
+#eof
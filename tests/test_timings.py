@@ -0,0 +1,31 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import absolute_import, print_function
+import os
+from behave_manners.timings import TimingStore, percentile
+
+
+class TestTimingStore(object):
+
+    def test_percentile(self):
+        assert percentile([], 95) is None
+        assert percentile([3, 1, 2], 50) == 2
+        assert percentile(list(range(101)), 95) == 95
+
+    def test_budget(self, tmpdir):
+        fname = str(tmpdir.join('out', 'timings.json'))
+        store = TimingStore(fname, min_samples=3, factor=2.0, min_budget=0.5)
+        store.record('index', 'medium', 1.0)
+        store.record('index', 'medium', 1.5)
+        assert store.budget('index', 'medium', 10.0) == 10.0   # too few samples
+        store.record('index', 'medium', 2.0)
+        assert store.budget('index', 'medium', 10.0) == 4.0
+        assert store.budget('index', 'medium', 3.0) == 3.0     # bounded
+        assert store.budget('other', 'medium', 10.0) == 10.0
+        store.save()
+        assert os.path.exists(fname)
+
+        store2 = TimingStore(fname, min_samples=3)
+        assert store2.report() == [('index', 'medium', 3, 1.5, 2.0, 2.0)]
+
+#eof
@@ -0,0 +1,153 @@
+# -*- coding: UTF-8 -*-
+""" Tests of the pooled WebDriver transport, against a stand-in driver
+"""
+
+import os
+import json
+import errno
+import socket
+import threading
+import pytest
+from six.moves import socketserver, BaseHTTPServer
+from urllib3.connection import HTTPConnection
+from urllib3.exceptions import ProtocolError
+from selenium.common.exceptions import WebDriverException
+from behave_manners.transport import PooledConnection, CommandStats, close_pools
+
+
+class StandInHandler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    drop_next = False       # close next connection without a response
+
+    def _reply(self, value, status=200):
+        data = json.dumps({'value': value}).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def do_GET(self):
+        if StandInHandler.drop_next:
+            StandInHandler.drop_next = False
+            self.close_connection = True
+            return
+        if self.path.endswith('/redirect'):
+            self.send_response(302)
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+        elif self.path.endswith('/title'):
+            self._reply('Title of %s' % self.path.split('/')[2])
+        else:
+            self._reply({'error': 'unknown command', 'message': self.path}, 404)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers['Content-Length']))
+        self._reply(None)
+
+    def log_message(self, *args):
+        pass
+
+
+class TCPServer(socketserver.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+    def __init__(self):
+        BaseHTTPServer.HTTPServer.__init__(self, ('127.0.0.1', 0), StandInHandler)
+        self.num_connections = 0
+
+    def get_request(self):
+        self.num_connections += 1
+        return BaseHTTPServer.HTTPServer.get_request(self)
+
+
+class UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def get_request(self):
+        sock, _addr = socketserver.UnixStreamServer.get_request(self)
+        return sock, ('local', 0)
+
+
+def _serve(server):
+    thr = threading.Thread(target=server.serve_forever)
+    thr.daemon = True
+    thr.start()
+
+
+class TestPooledConnection(object):
+
+    def test_keep_alive(self):
+        server = TCPServer()
+        _serve(server)
+        url = 'http://127.0.0.1:%d' % server.server_address[1]
+        stats = CommandStats()
+        try:
+            conns = [PooledConnection(url, stats=stats) for _i in range(2)]
+            for _i in range(5):
+                for conn in conns:
+                    ret = conn.execute('getTitle', {'sessionId': 's1'})
+                    assert ret['value'] == 'Title of s1'
+            assert server.num_connections == 1
+        finally:
+            server.shutdown()
+            close_pools()
+        rows = stats.summary()
+        assert [r[:2] for r in rows] == [('getTitle', 10)]
+
+    def test_dropped_connection(self):
+        server = TCPServer()
+        _serve(server)
+        url = 'http://127.0.0.1:%d' % server.server_address[1]
+        try:
+            conn = PooledConnection(url)
+            assert conn.execute('getTitle', {'sessionId': 's1'})['value'] == 'Title of s1'
+            # received, but no response: may have been executed, not sent again
+            StandInHandler.drop_next = True
+            with pytest.raises(ProtocolError):
+                conn.execute('getTitle', {'sessionId': 's1'})
+            assert conn.execute('getTitle', {'sessionId': 's1'})['value'] == 'Title of s1'
+            with pytest.raises(WebDriverException):
+                conn._request('GET', url + '/redirect')
+        finally:
+            StandInHandler.drop_next = False
+            server.shutdown()
+            close_pools()
+
+    def test_unsent_retried(self, monkeypatch):
+        server = TCPServer()
+        _serve(server)
+        url = 'http://127.0.0.1:%d' % server.server_address[1]
+        orig_request = HTTPConnection.request
+        failures = []
+
+        def _request(conn, *args, **kwargs):
+            if not failures:
+                failures.append(conn)
+                conn.close()
+                raise socket.error(errno.EPIPE, 'Broken pipe')
+            return orig_request(conn, *args, **kwargs)
+
+        monkeypatch.setattr(HTTPConnection, 'request', _request)
+        try:
+            conn = PooledConnection(url)
+            assert conn.execute('getTitle', {'sessionId': 's1'})['value'] == 'Title of s1'
+            assert len(failures) == 1
+        finally:
+            server.shutdown()
+            close_pools()
+
+    def test_unix_socket(self, tmpdir):
+        path = str(tmpdir.join('driver.sock'))
+        server = UnixServer(path, StandInHandler)
+        _serve(server)
+        try:
+            conn = PooledConnection('http://localhost:9515', unix_socket=path)
+            ret = conn.execute('getTitle', {'sessionId': 's2'})
+            assert ret['value'] == 'Title of s2'
+        finally:
+            server.shutdown()
+            close_pools()
+            os.unlink(path)
+
+#eof
@@ -0,0 +1,49 @@
+# -*- coding: UTF-8 -*-
+
+from __future__ import absolute_import, print_function
+import logging
+import pytest
+from behave_manners.url_blocking import URLBlocker
+
+
+class DummyBrowser(object):
+    session_id = 's1'
+    current_window_handle = 'w1'
+
+    def __init__(self):
+        self.commands = []
+
+    def execute(self, command, params):
+        self.commands.append(params['cmd'])
+
+
+class TestURLBlocker(object):
+
+    def test_patterns(self):
+        blocker = URLBlocker(['*analytics*'], ['font'])
+        assert blocker.patterns[0] == '*analytics*'
+        assert '*.woff2' in blocker.patterns
+        with pytest.raises(ValueError):
+            URLBlocker([], ['nonsense'])
+
+    def test_install_once(self):
+        blocker = URLBlocker(['*analytics*'])
+        browser = DummyBrowser()
+        blocker.ensure(browser)
+        blocker.ensure(browser)
+        assert browser.commands == ['Network.enable', 'Network.setBlockedURLs']
+        browser.current_window_handle = 'w2'
+        blocker.ensure(browser)
+        assert len(browser.commands) == 4
+
+    def test_count(self):
+        blocker = URLBlocker(['*analytics*'])
+        rec = logging.LogRecord('browser.network', logging.ERROR, __file__, 0,
+                                'http://x/a.js - Failed to load resource: '
+                                'net::ERR_BLOCKED_BY_CLIENT', (), None)
+        assert blocker.consume(rec)
+        rec.name = 'browser.console-api'
+        assert not blocker.consume(rec)
+        assert blocker.num_blocked == 1
+
+#eof